@@ -0,0 +1,50 @@
+"""
+Offline benchmark suite (pytest-benchmark), run with
+
+    poetry run pytest benchmarks --benchmark-autosave --benchmark-compare
+"""
+import itertools
+
+import pytest
+
+from config import set_config
+from src import blockhash, rpc
+from tests.factories import account_info, flash_loan_config, reserve_bytes
+from tests.fake_rpc import FakeRpcServer, Validator
+
+
+def pytest_configure(config):
+    # offline, VALIDATOR / FLASH_LOAN_PROGRAM are not needed
+    set_config(flash_loan_config())
+
+
+@pytest.fixture
+def rpc_stub():
+    """
+    Validator stand-in serving reserve accounts, blockhashes and transaction
+    endpoints. Every transaction is reported as finalized right away
+    """
+    accounts = {}
+    slots = itertools.count(1)
+
+    def account(key):
+        if key not in accounts:
+            accounts[key] = account_info(reserve_bytes())["value"]
+        return accounts[key]
+
+    handlers = dict(
+        getAccountInfo=lambda key, *_: {
+            "context": {"slot": next(slots)},
+            "value": account(key),
+        },
+        getMultipleAccounts=lambda keys, *_: {
+            "context": {"slot": next(slots)},
+            "value": [account(key) for key in keys],
+        },
+        **Validator(block_height=1, last_valid_block_height=10**9).handlers(),
+    )
+    with FakeRpcServer(handlers) as server:
+        rpc.configure(endpoint=server.url)
+        yield server
+        blockhash.close()
+        rpc.configure()
@@ -0,0 +1,73 @@
+import pytest
+from solana.publickey import PublicKey
+
+from src.helpers import fetch_reserves
+from src.layout import RESERVE_LAYOUT
+from src.reserve import Reserve
+from tests.factories import reserve_bytes
+
+
+def decode_with_layout(data: bytes):
+    reserve = RESERVE_LAYOUT.parse(data)
+    return (
+        reserve["liquidity"]["available_amount"],
+        reserve["config"]["fees"]["flash_loan_fee_wad"],
+        reserve["config"]["fees"]["texture_fee_percentage"],
+        PublicKey(reserve["liquidity"]["supply_pubkey"]),
+        PublicKey(reserve["lending_market"]),
+        PublicKey(reserve["config"]["fee_receiver"]),
+    )
+
+
+def decode_with_view(data: bytes):
+    reserve = Reserve(data)
+    return (
+        reserve.liquidity_available_amount,
+        reserve.flash_loan_fee_wad,
+        reserve.texture_fee_percentage,
+        PublicKey(reserve.liquidity_supply_pubkey),
+        PublicKey(reserve.lending_market),
+        PublicKey(reserve.fee_receiver),
+    )
+
+
+@pytest.mark.benchmark(group="reserve decode")
+def test_reserve_layout_parse(benchmark):
+    data = reserve_bytes()
+
+    reserve = benchmark(RESERVE_LAYOUT.parse, data)
+
+    assert reserve["liquidity"]["available_amount"] == 10**12
+
+
+@pytest.mark.benchmark(group="reserve decode")
+def test_reserve_view(benchmark):
+    data = reserve_bytes()
+
+    reserve = benchmark(Reserve, data)
+
+    assert reserve.liquidity_available_amount == 10**12
+
+
+@pytest.mark.benchmark(group="quote fields")
+def test_quote_fields_with_layout(benchmark):
+    """
+    What a fee quote and a flash loan read: available amount, fee fields
+    and the supply / market / fee receiver pubkeys
+    """
+    data = reserve_bytes()
+
+    assert benchmark(decode_with_layout, data) == decode_with_view(data)
+
+
+@pytest.mark.benchmark(group="quote fields")
+def test_quote_fields_with_view(benchmark):
+    benchmark(decode_with_view, reserve_bytes())
+
+
+def test_fetch_reserves(benchmark, rpc_stub):
+    keys = [PublicKey(bytes([i]) * 32) for i in range(1, 201)]
+
+    reserves = benchmark(fetch_reserves, keys)
+
+    assert all(reserves.values())
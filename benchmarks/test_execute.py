@@ -0,0 +1,45 @@
+from solana.keypair import Keypair
+
+from src.executor import FlashLoanExecutor
+from src.policy import FireAndForgetPolicy
+from tests.factories import flash_loan_bundle
+
+
+def test_execute_end_to_end(benchmark, rpc_stub):
+    """
+    Build, sign, send and wait for the (immediate) confirmation
+    """
+    executor = FlashLoanExecutor()
+    authority = Keypair()
+
+    def execute():
+        return flash_loan_bundle(executor, authority.public_key).execute(
+            fee_payer=authority.public_key, signers=[authority]
+        )
+
+    benchmark.extra_info["unit"] = "flash loan"
+    resp = benchmark.pedantic(execute, rounds=20)
+
+    assert "result" in resp
+
+
+def test_execute_fire_and_forget(benchmark, rpc_stub):
+    """
+    Time until execute() hands back a SendHandle
+    """
+    executor = FlashLoanExecutor(policy=FireAndForgetPolicy(rebroadcast_interval=1))
+    authority = Keypair()
+    handles = []
+
+    def execute():
+        handles.append(
+            flash_loan_bundle(executor, authority.public_key).execute(
+                fee_payer=authority.public_key, signers=[authority]
+            )
+        )
+
+    benchmark.pedantic(execute, rounds=20)
+
+    for handle in handles:
+        handle.result(10)
+    executor.policy.close()
@@ -0,0 +1,105 @@
+import pytest
+from solana.keypair import Keypair
+from solana.transaction import Transaction
+
+from src.entities import FlashBorrowParams, FlashRepayParams
+from src.executor import BaseFlashLoanExecutor
+from src.template import FlashLoanTemplate
+
+
+@pytest.fixture
+def accounts():
+    supply, native_account, reserve, market, fee_receiver = (
+        Keypair().public_key for _ in range(5)
+    )
+    authority = Keypair()
+    borrow = FlashBorrowParams(
+        source_liquidity=supply,
+        destination_liquidity=native_account,
+        reserve=reserve,
+        lending_market=market,
+        program_id=BaseFlashLoanExecutor.MAIN_PROGRAM_ID,
+    )
+    repay = FlashRepayParams(
+        source_liquidity=native_account,
+        destination_liquidity=supply,
+        reserve=reserve,
+        reserve_liquidity_fee_receiver=fee_receiver,
+        lending_market=market,
+        user_transfer_authority=authority.public_key,
+    )
+    return borrow, repay, authority
+
+
+def test_borrow_as_account_keys(benchmark, accounts):
+    borrow, _, _ = accounts
+
+    assert len(benchmark(borrow.as_account_keys)) == 7
+
+
+def test_repay_as_account_keys(benchmark, accounts):
+    _, repay, _ = accounts
+
+    benchmark(repay.as_account_keys)
+
+
+def test_append_instruction(benchmark, accounts):
+    borrow, repay, _ = accounts
+    executor = BaseFlashLoanExecutor()
+
+    def append():
+        executor._append_instruction("FlashBorrow", borrow, dict(amount=100))
+        executor._append_instruction("FlashRepay", repay, dict(amount=100))
+        executor.reset()
+
+    benchmark(append)
+
+
+def test_transaction_serialize(benchmark, accounts):
+    borrow, repay, authority = accounts
+    executor = BaseFlashLoanExecutor()
+    executor._append_instruction("FlashBorrow", borrow, dict(amount=100))
+    executor._append_instruction("FlashRepay", repay, dict(amount=100))
+    transaction = executor._build_transaction(authority.public_key, [authority])
+    transaction.recent_blockhash = str(Keypair().public_key)
+
+    def sign_and_serialize():
+        transaction.sign(authority)
+        return transaction.serialize()
+
+    raw = benchmark(sign_and_serialize)
+
+    assert len(Transaction.deserialize(raw).instructions) == 2
+
+
+@pytest.mark.benchmark(group="borrow/repay pair")
+def test_pair_with_executor_builder(benchmark, accounts):
+    borrow, repay, authority = accounts
+    executor = BaseFlashLoanExecutor()
+
+    def build():
+        executor.flash_borrow(
+            source_liquidity=borrow.source_liquidity,
+            destination_liquidity=borrow.destination_liquidity,
+            reserve=borrow.reserve,
+            lending_market=borrow.lending_market,
+            amount=100000000,
+        ).flash_repay(
+            source_liquidity=repay.source_liquidity,
+            destination_liquidity=repay.destination_liquidity,
+            reserve=repay.reserve,
+            reserve_liquidity_fee_receiver=repay.reserve_liquidity_fee_receiver,
+            lending_market=repay.lending_market,
+            user_transfer_authority=authority.public_key,
+            amount=100000000,
+        ).reset()
+
+    benchmark(build)
+
+
+@pytest.mark.benchmark(group="borrow/repay pair")
+def test_pair_with_template(benchmark, accounts):
+    borrow, repay, _ = accounts
+    template = FlashLoanTemplate(borrow, repay)
+
+    assert len(benchmark(template.instructions, 100000000)) == 2
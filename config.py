@@ -1,19 +1,22 @@
 import os
+import threading
+from typing import Optional
 
 from betterconf import Config, field
-from betterconf.config import EnvironmentProvider
-from dotenv import load_dotenv
+from betterconf.caster import to_float, to_int, to_list
+from betterconf.config import EnvironmentProvider, parse_objects
 from solana.publickey import PublicKey
 
-load_dotenv()
-
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 CREDS_DIR = os.path.join(ROOT_DIR, '.creds')
 
 
 class PublicKeyProvider(EnvironmentProvider):
-    def get(self, name: str) -> PublicKey:
+    def get(self, name: str) -> Optional[PublicKey]:
         val = super().get(name)
+        if val is None:
+            # betterconf raises VariableNotFoundError for it
+            return None
         try:
             val = int(val)
         except ValueError:
@@ -24,8 +27,64 @@ class PublicKeyProvider(EnvironmentProvider):
 
 class FlashLoanConfig(Config):
     validator = field('VALIDATOR', provider=EnvironmentProvider())
+    validators = field('VALIDATORS', default=[], caster=to_list)
     reserve = field('RESERVE', provider=PublicKeyProvider())
     program_id = field('FLASH_LOAN_PROGRAM', provider=PublicKeyProvider())
+    lending_markets = field('LENDING_MARKETS', default=[], caster=to_list)
+    ws_validator = field('WS_VALIDATOR', default=None)
+    rpc_pool_size = field('RPC_POOL_SIZE', default=10, caster=to_int)
+    rpc_timeout = field('RPC_TIMEOUT', default=10.0, caster=to_float)
+    rpc_rate_limit = field('RPC_RATE_LIMIT', default=None, caster=to_float)
+
+    def __init__(self, **values):
+        """
+        Fields missing from `values` are read from the environment. Explicit
+        values are set on this instance only: betterconf overrides aren't
+        used, so the environment can't replace them and they don't leak into
+        later configs
+        """
+        fields = {info.name_to_set: info.obj for info in parse_objects(type(self))}
+        unknown = set(values) - set(fields)
+        if unknown:
+            raise TypeError(f'Unknown config fields: {", ".join(sorted(unknown))}')
+
+        for name, obj in fields.items():
+            setattr(self, name, values[name] if name in values else obj.value)
+
+
+_config: Optional[FlashLoanConfig] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> FlashLoanConfig:
+    """
+    Process-wide config, read from the environment (and .env) on first use
+    """
+    global _config
+
+    with _config_lock:
+        if _config is None:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _config = FlashLoanConfig()
+        return _config
+
+
+def set_config(config: Optional[FlashLoanConfig]):
+    """
+    Use an explicit config instead of the environment, e.g.
+    set_config(FlashLoanConfig(validator=..., reserve=..., program_id=...)).
+    None makes the next get_config() read the environment again
+    """
+    global _config
+
+    with _config_lock:
+        _config = config
 
 
-cfg = FlashLoanConfig()
+def __getattr__(name: str):
+    # `from config import cfg` keeps working, it just builds the config then
+    if name == 'cfg':
+        return get_config()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -3,15 +3,14 @@ import logging
 from solana.keypair import Keypair
 from solana.publickey import PublicKey
 
-from config import cfg
+from config import get_config
 from src.executor import FlashLoanExecutor
 from src.helpers import Account, Wallet, available_liquidity, calculate_flash_loan_fees
-from src.layout import RESERVE_LAYOUT
-
-logging.getLogger().setLevel(logging.INFO)
+from src.reserve import Reserve
 
 
 def start_flash_borrow_repay():
+    cfg = get_config()
     logging.info(f"Solana cluster: {cfg.validator}")
     logging.info(f"Flash loan program id: {cfg.program_id}")
     logging.info(f"Flash loan reserve: {cfg.reserve}")
@@ -19,10 +18,10 @@ def start_flash_borrow_repay():
     reserve = cfg.reserve
 
     # Get account information for Reserve to read info about accounts and fees
-    reserve_acc = Account(public_key=reserve).get_info(RESERVE_LAYOUT)
-    reserve_source_liquidity = PublicKey(reserve_acc["liquidity"]["supply_pubkey"])
-    lending_market = PublicKey(reserve_acc["lending_market"])
-    reserve_liquidity_fee_receiver = PublicKey(reserve_acc["config"]["fee_receiver"])
+    reserve_acc = Account(public_key=reserve).get_info(Reserve)
+    reserve_source_liquidity = PublicKey(reserve_acc.liquidity_supply_pubkey)
+    lending_market = PublicKey(reserve_acc.lending_market)
+    reserve_liquidity_fee_receiver = PublicKey(reserve_acc.fee_receiver)
 
     # All token amounts in this SDK are in lamports
     flash_loan_amount = 100000000  # 0.1 SOL
@@ -31,13 +30,16 @@ def start_flash_borrow_repay():
     # We need to return borrow amount + fee at the end of the flash loan transaction.
     # So its worth to make sure that we have enough money to pay fees.
     # Get the fees amount via calculate_flash_loan_fees() call.
-    flash_loan_fee, texture_fee = calculate_flash_loan_fees(reserve, flash_loan_amount)
+    # Passing the already fetched reserve saves an RPC round-trip.
+    flash_loan_fee, texture_fee = calculate_flash_loan_fees(
+        reserve, flash_loan_amount, reserve_acc=reserve_acc
+    )
     logging.info(
         f"Fee to borrow {flash_loan_amount} lamports "
         f"will be: {flash_loan_fee} lamports"
     )
 
-    available_amount = available_liquidity(reserve)
+    available_amount = available_liquidity(reserve, reserve_acc=reserve_acc)
     logging.info(f"Available liquidity: {available_amount}")
 
     # Create transfer authority address. Also it will be fee payer of transaction
@@ -87,4 +89,5 @@ def start_flash_borrow_repay():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     start_flash_borrow_repay()
@@ -1,7 +1,102 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
 from solana.publickey import PublicKey
 
+from config import FlashLoanConfig, get_config
+
+ProgramAddress = Tuple[PublicKey, int]
+
+
+class ProgramAddressCache:
+    """
+    Bounded LRU memo of PublicKey.find_program_address results keyed by
+    (seeds, program_id), so the bump seed search runs once per address
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, ProgramAddress]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(seeds: Iterable[bytes], program_id: PublicKey) -> tuple:
+        return tuple(bytes(seed) for seed in seeds), program_id
+
+    def find_program_address(
+        self, seeds: List[bytes], program_id: PublicKey
+    ) -> ProgramAddress:
+        key = self._key(seeds, program_id)
+        with self._lock:
+            found = self._entries.get(key)
+            if found is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return found
+            self.misses += 1
+
+        found = PublicKey.find_program_address(list(key[0]), program_id)
+        self._store(key, found)
+        return found
+
+    def preload(self, seeds: List[bytes], program_id: PublicKey):
+        """
+        Derive an address ahead of time without counting it as a miss
+        """
+        key = self._key(seeds, program_id)
+        if key not in self._entries:
+            self._store(key, PublicKey.find_program_address(list(key[0]), program_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def _store(self, key: tuple, found: ProgramAddress):
+        with self._lock:
+            self._entries[key] = found
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+pda_cache = ProgramAddressCache()
+
+
+def find_program_address(seeds: List[bytes], program_id: PublicKey) -> ProgramAddress:
+    return pda_cache.find_program_address(seeds, program_id)
+
 
 def find_lending_market_authority(
     lending_market: PublicKey, program_id: PublicKey
 ) -> PublicKey:
-    return PublicKey.find_program_address([bytes(lending_market)], program_id)[0]
+    return find_program_address([bytes(lending_market)], program_id)[0]
+
+
+def preload_lending_market_authorities(
+    lending_markets: Optional[Iterable[PublicKey]] = None,
+    program_id: Optional[PublicKey] = None,
+    config: Optional[FlashLoanConfig] = None,
+):
+    """
+    Derive lending market authorities ahead of the first borrow
+    :param lending_markets: markets from the LENDING_MARKETS env variable by default
+    :param program_id: cfg.program_id by default
+    :param config: explicit config, the process-wide get_config() by default
+    :return:
+    """
+    if lending_markets is None or program_id is None:
+        config = config or get_config()
+    if lending_markets is None:
+        lending_markets = config.lending_markets
+    if program_id is None:
+        program_id = config.program_id
+
+    for lending_market in lending_markets:
+        pda_cache.preload([bytes(PublicKey(lending_market))], program_id)
@@ -0,0 +1,81 @@
+from typing import Awaitable, List, Optional
+
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Finalized
+from solana.rpc.types import RPCResponse, TxOpts
+from solana.transaction import Transaction
+
+from config import FlashLoanConfig, get_config
+from src import metrics
+from src.executor import BaseFlashLoanExecutor
+
+
+class AsyncFlashLoanExecutor(BaseFlashLoanExecutor):
+    """
+    Asyncio flavour of FlashLoanExecutor.
+
+    execute() takes the pending instructions off the builder as soon as it is
+    called and returns an awaitable, so the same executor (and the same
+    AsyncClient) can keep many borrow/repay bundles in flight, e.g. with
+    asyncio.gather
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncClient] = None,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        super().__init__(config)
+        self.__own_client = client is None
+        self.__client = client or AsyncClient((config or get_config()).validator)
+
+    def execute(
+        self, fee_payer: PublicKey, signers: List[Keypair]
+    ) -> Awaitable[RPCResponse]:
+        transaction = self._build_transaction(fee_payer, signers)
+
+        return self.__send(transaction, signers)
+
+    async def __send(self, transaction: Transaction, signers: List[Keypair]):
+        with metrics.stage("blockhash_fetch"):
+            blockhash_resp = await self.__client.get_latest_blockhash(Finalized)
+        transaction.recent_blockhash = self.__client.parse_recent_blockhash(
+            blockhash_resp
+        )
+        last_valid_block_height = blockhash_resp["result"]["value"][
+            "lastValidBlockHeight"
+        ]
+
+        with metrics.stage("signing"):
+            transaction.sign(*set(signers))
+            raw_transaction = transaction.serialize()
+
+        with metrics.stage("send"):
+            resp = await self.__client.send_raw_transaction(
+                raw_transaction,
+                opts=TxOpts(skip_confirmation=True, preflight_commitment=Finalized),
+            )
+
+        with metrics.stage("confirmation"):
+            await self.__client.confirm_transaction(
+                resp["result"],
+                Finalized,
+                last_valid_block_height=last_valid_block_height,
+            )
+
+        return resp
+
+    async def close(self):
+        """
+        Close the underlying http session if it was created by this executor
+        """
+        if self.__own_client:
+            await self.__client.close()
+
+    async def __aenter__(self) -> "AsyncFlashLoanExecutor":
+        return self
+
+    async def __aexit__(self, _exc_type, _exc, _tb):
+        await self.close()
@@ -0,0 +1,21 @@
+import random
+
+
+def jittered_backoff(
+    attempt: int,
+    base: float = 0.5,
+    factor: float = 2,
+    maximum: float = 30,
+    jitter: float = 0.2,
+) -> float:
+    """
+    Delay before retry number `attempt` (0-based): base * factor ** attempt,
+    capped at maximum and spread by +/- jitter (a fraction of the delay), so
+    clients retrying together do not hit the node at the same moment
+    """
+    try:
+        delay = min(base * factor**attempt, maximum)
+    except OverflowError:
+        # far past the cap
+        delay = maximum
+    return delay * (1 + random.uniform(-jitter, jitter))
@@ -0,0 +1,135 @@
+import os
+import queue
+import threading
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from solana.keypair import Keypair
+from solana.transaction import Transaction
+
+from src import metrics
+from src.message import VersionedTransaction
+
+AnyTransaction = Union[Transaction, VersionedTransaction]
+
+_DONE = object()
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of one transaction of execute_many(), `result` is whatever the
+    execution policy returned
+    """
+
+    index: int
+    signature: Optional[str] = None
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def sign_and_serialize(
+    transaction: AnyTransaction, signers: Sequence[Keypair]
+) -> Tuple[AnyTransaction, bytes]:
+    """
+    Module level, so it also runs on a process pool. The signed transaction
+    is returned too, since a process pool signs a copy
+    """
+    with metrics.stage("signing"):
+        transaction.sign(*signers)
+        return transaction, transaction.serialize()
+
+
+def run(
+    transactions: Sequence[Optional[AnyTransaction]],
+    signers: Sequence[Keypair],
+    submit: Callable[[AnyTransaction, bytes], Future],
+    results: List[BatchResult],
+    sign_pool: Optional[Executor] = None,
+    send_workers: int = 4,
+    queue_size: int = 64,
+):
+    """
+    Sign and serialize the transactions on `sign_pool` and stream them to
+    `send_workers` threads through a bounded queue. The senders only submit
+    (see ExecutionPolicy.submit), confirmations are awaited once everything
+    is sent. Outcomes are stored in `results`, at the index of their
+    transaction (None entries are skipped)
+    """
+    own_pool = sign_pool is None
+    if own_pool:
+        sign_pool = ThreadPoolExecutor(
+            max_workers=min(32, os.cpu_count() or 1), thread_name_prefix="sign"
+        )
+    ready: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    submitted: List[Tuple[int, Future]] = []
+
+    def sender():
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                return
+            index, transaction, raw = item
+            result = results[index]
+            result.signature = str(transaction.signature())
+            try:
+                submitted.append((index, submit(transaction, raw)))
+            except Exception as exc:
+                result.error = exc
+
+    threads = [
+        threading.Thread(target=sender, name="batch-send", daemon=True)
+        for _ in range(send_workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    pending = {}
+
+    def drain(return_when):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            index = pending.pop(future)
+            try:
+                transaction, raw = future.result()
+            except Exception as exc:
+                results[index].error = exc
+            else:
+                # blocks while the senders are behind
+                ready.put((index, transaction, raw))
+
+    try:
+        # at most `queue_size` transactions are being signed, so signing
+        # can't run ahead of sending by more than two queues
+        for index, transaction in enumerate(transactions):
+            if transaction is None:
+                continue
+            if len(pending) >= queue_size:
+                drain(FIRST_COMPLETED)
+            pending[sign_pool.submit(sign_and_serialize, transaction, signers)] = index
+        drain(ALL_COMPLETED)
+    finally:
+        for _ in threads:
+            ready.put(_DONE)
+        for thread in threads:
+            thread.join()
+        if own_pool:
+            sign_pool.shutdown()
+
+    for index, future in submitted:
+        try:
+            results[index].result = future.result()
+        except Exception as exc:
+            results[index].error = exc
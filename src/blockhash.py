@@ -0,0 +1,175 @@
+import atexit
+import logging
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional
+
+from solana.rpc.commitment import Commitment, Finalized
+from solana.rpc.core import RPCException
+
+from src import metrics
+
+if TYPE_CHECKING:
+    from solana.rpc.api import Client
+
+logger = logging.getLogger(__name__)
+
+
+class RecentBlockhash(NamedTuple):
+    blockhash: str
+    last_valid_block_height: int
+    fetched_at: float
+
+
+class BlockhashProvider:
+    """
+    Keeps a recent blockhash fresh in the background.
+
+    get() returns the cached blockhash and only fetches inline when there is
+    none yet or it is older than max_age (e.g. the refresh thread could not
+    reach the validator). The first get() starts the refresh thread, which
+    fetches a new blockhash every refresh_interval seconds.
+    """
+
+    def __init__(
+        self,
+        client: Optional["Client"] = None,
+        commitment: Commitment = Finalized,
+        refresh_interval: float = 2,
+        max_age: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._client = client
+        self.commitment = commitment
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.clock = clock
+
+        self._current: Optional[RecentBlockhash] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def client(self) -> "Client":
+        # imported here, the HTTP stack is only loaded once a request is made
+        from src import rpc
+
+        return self._client or rpc.get_client()
+
+    def refresh(self) -> RecentBlockhash:
+        """
+        Fetch a new blockhash right away
+        """
+        with metrics.stage("blockhash_fetch"):
+            resp = self.client.get_latest_blockhash(self.commitment)
+        if resp.get("error"):
+            raise RPCException(resp["error"])
+
+        value = resp["result"]["value"]
+        current = RecentBlockhash(
+            blockhash=value["blockhash"],
+            last_valid_block_height=value["lastValidBlockHeight"],
+            fetched_at=self.clock(),
+        )
+        with self._lock:
+            self._current = current
+        return current
+
+    def get(self) -> RecentBlockhash:
+        """
+        :return: cached blockhash with its last valid block height
+        """
+        self.start()
+        current = self._current
+        if current is None or self.clock() - current.fetched_at > self.max_age:
+            current = self.refresh()
+        return current
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="blockhash-provider", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._current = None
+        self._stopped.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning(f"Blockhash refresh failed: {exc!r}")
+
+
+_provider: Optional[BlockhashProvider] = None
+# providers of other clients, stopped and dropped once the client is garbage
+# collected (they only hold a proxy of it)
+_client_providers: "weakref.WeakKeyDictionary[Client, BlockhashProvider]" = (
+    weakref.WeakKeyDictionary()
+)
+_provider_lock = threading.Lock()
+
+
+def get_provider(client: Optional["Client"] = None) -> BlockhashProvider:
+    """
+    Process-wide provider on the shared RPC client
+    :param client: another client (e.g. of an explicit config), it gets a
+        provider of its own
+    """
+    global _provider
+
+    if client is not None:
+        from src import rpc
+
+        if rpc.is_shared(client):
+            client = None
+
+    with _provider_lock:
+        if client is not None:
+            provider = _client_providers.get(client)
+            if provider is None:
+                provider = _client_providers[client] = BlockhashProvider(
+                    weakref.proxy(client)
+                )
+                weakref.finalize(client, provider.stop)
+            return provider
+        if _provider is None:
+            _provider = BlockhashProvider()
+        return _provider
+
+
+def close():
+    """
+    Stop the process-wide providers, the next get_provider() starts a new one
+    """
+    global _provider
+
+    with _provider_lock:
+        providers = [_provider, *list(_client_providers.values())]
+        _provider = None
+        _client_providers.clear()
+    for provider in providers:
+        if provider is not None:
+            provider.stop()
+
+
+atexit.register(close)
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from solana.publickey import PublicKey
+
+from config import FlashLoanConfig
+from src.helpers import Account, fetch_multiple_accounts
+from src.reserve import Reserve
+
+
+@dataclass
+class CachedReserve:
+    data: Reserve
+    slot: int
+    fetched_at: float
+
+
+class ReserveCache:
+    """
+    Bounded LRU cache of decoded reserves keyed by reserve pubkey.
+
+    An entry is dropped when it is older than `ttl` seconds, or when it was
+    read more than `max_slot_age` slots before the `current_slot` given to
+    get()/fetch()
+    """
+
+    def __init__(
+        self,
+        max_size: int = 128,
+        ttl: Optional[float] = None,
+        max_slot_age: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        """
+        :param config: explicit config misses are fetched with, the
+            process-wide get_config() by default
+        """
+        if max_size < 1:
+            raise ValueError("max_size should be positive")
+
+        self.config = config
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_slot_age = max_slot_age
+        self._clock = clock
+        self._entries: "OrderedDict[PublicKey, CachedReserve]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, reserve: PublicKey) -> bool:
+        return reserve in self._entries
+
+    def _is_stale(self, entry: CachedReserve, current_slot: Optional[int]) -> bool:
+        if self.ttl is not None and self._clock() - entry.fetched_at > self.ttl:
+            return True
+        if (
+            self.max_slot_age is not None
+            and current_slot is not None
+            and current_slot - entry.slot > self.max_slot_age
+        ):
+            return True
+        return False
+
+    def get(
+        self, reserve: PublicKey, current_slot: Optional[int] = None
+    ) -> Optional[CachedReserve]:
+        """
+        Cached entry for the reserve, None if it is missing or stale
+        """
+        with self._lock:
+            entry = self._entries.get(reserve)
+            if entry is None:
+                return None
+            if self._is_stale(entry, current_slot):
+                del self._entries[reserve]
+                return None
+            self._entries.move_to_end(reserve)
+            return entry
+
+    def put(
+        self, reserve: PublicKey, data: Reserve, slot: int, age: float = 0
+    ) -> CachedReserve:
+        """
+        Store a decoded reserve read at `slot`. A state older than the cached
+        one is ignored, so late responses can't roll the cache back
+        :param age: seconds since the data was fetched, e.g. for a snapshot
+        """
+        with self._lock:
+            entry = self._entries.get(reserve)
+            if entry is None or entry.slot <= slot:
+                entry = CachedReserve(
+                    data=data, slot=slot, fetched_at=self._clock() - age
+                )
+                self._entries[reserve] = entry
+            self._entries.move_to_end(reserve)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return entry
+
+    def fetch(self, reserve: PublicKey, current_slot: Optional[int] = None) -> Reserve:
+        """
+        Decoded reserve from the cache, fetched from the chain on a miss
+        """
+        entry = self.get(reserve, current_slot)
+        if entry is None:
+            data, slot = Account(
+                public_key=reserve, config=self.config
+            ).get_info_with_slot(Reserve)
+            entry = self.put(reserve, data, slot)
+        return entry.data
+
+    def fetch_many(
+        self, reserves: Sequence[PublicKey], current_slot: Optional[int] = None
+    ) -> Dict[PublicKey, Optional[Reserve]]:
+        """
+        Decoded reserves from the cache, all misses are fetched together with
+        getMultipleAccounts. Missing accounts are mapped to None
+        """
+        result = {}
+        misses = []
+        for reserve in reserves:
+            entry = self.get(reserve, current_slot)
+            if entry is None:
+                misses.append(reserve)
+            else:
+                result[reserve] = entry.data
+
+        for reserve, (data, slot) in fetch_multiple_accounts(
+            misses, self.config
+        ).items():
+            result[reserve] = (
+                self.put(reserve, Reserve(data), slot).data
+                if data is not None
+                else None
+            )
+
+        return result
+
+    def items(self) -> List[Tuple[PublicKey, CachedReserve]]:
+        """
+        Copy of all entries, least recently used first
+        """
+        with self._lock:
+            return list(self._entries.items())
+
+    def invalidate(self, reserve: Optional[PublicKey] = None):
+        """
+        Drop one reserve, or everything when reserve is omitted
+        """
+        with self._lock:
+            if reserve is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(reserve, None)
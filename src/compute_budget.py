@@ -0,0 +1,37 @@
+import struct
+
+from solana.publickey import PublicKey
+from solana.transaction import TransactionInstruction
+
+COMPUTE_BUDGET_PROGRAM_ID = PublicKey("ComputeBudget111111111111111111111111111111")
+
+# ComputeBudgetInstruction variants
+SET_COMPUTE_UNIT_LIMIT = 2
+SET_COMPUTE_UNIT_PRICE = 3
+
+# max compute units a transaction may request
+MAX_COMPUTE_UNIT_LIMIT = 1_400_000
+
+
+def set_compute_unit_limit(units: int) -> TransactionInstruction:
+    """
+    :param units: compute units the transaction may consume
+    """
+    if not 0 < units <= MAX_COMPUTE_UNIT_LIMIT:
+        raise ValueError(f"Compute unit limit must be in 1..{MAX_COMPUTE_UNIT_LIMIT}")
+    return TransactionInstruction(
+        keys=[],
+        program_id=COMPUTE_BUDGET_PROGRAM_ID,
+        data=struct.pack("<BI", SET_COMPUTE_UNIT_LIMIT, units),
+    )
+
+
+def set_compute_unit_price(micro_lamports: int) -> TransactionInstruction:
+    """
+    :param micro_lamports: priority fee per compute unit
+    """
+    return TransactionInstruction(
+        keys=[],
+        program_id=COMPUTE_BUDGET_PROGRAM_ID,
+        data=struct.pack("<BQ", SET_COMPUTE_UNIT_PRICE, micro_lamports),
+    )
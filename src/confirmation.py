@@ -0,0 +1,292 @@
+import logging
+import threading
+import weakref
+from concurrent.futures import Future, TimeoutError
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from solana.rpc.commitment import COMMITMENT_RANKS, Commitment, Finalized
+from solana.rpc.core import RPCException
+
+from src.backoff import jittered_backoff
+
+if TYPE_CHECKING:
+    from solana.rpc.api import Client
+
+logger = logging.getLogger(__name__)
+
+# getSignatureStatuses limit
+MAX_SIGNATURE_STATUSES = 256
+# idle polls counted for the backoff, the delay is at max_interval long before
+MAX_BACKOFF_ATTEMPT = 32
+
+
+class TransactionExpiredError(Exception):
+    """
+    The transaction was not seen before its blockhash expired
+    """
+
+
+class TransactionFailedError(Exception):
+    def __init__(self, signature: str, err):
+        super().__init__(f"Transaction {signature} failed: {err}")
+        self.signature = signature
+        self.err = err
+
+
+@dataclass
+class _Pending:
+    signature: str
+    commitment: Commitment
+    last_valid_block_height: Optional[int]
+    future: Future = field(default_factory=Future)
+
+
+class ConfirmationTracker:
+    """
+    Confirms many signatures with a few RPC calls.
+
+    A background thread polls every pending signature in batched
+    getSignatureStatuses calls (up to 256 signatures each) and resolves the
+    futures returned by track() once a signature reaches its commitment.
+    Signatures that were never seen are failed with TransactionExpiredError
+    once the block height passes their last valid block height. The poll
+    interval grows with jittered exponential backoff while nothing changes
+    and drops back when a signature resolves or a new one is tracked.
+    """
+
+    def __init__(
+        self,
+        client: Optional["Client"] = None,
+        min_interval: float = 0.4,
+        max_interval: float = 4,
+        jitter: float = 0.2,
+    ):
+        self._client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.rpc_calls = 0
+
+        self._pending: Dict[str, List[_Pending]] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    @property
+    def client(self) -> "Client":
+        from src import rpc
+
+        return self._client or rpc.get_client()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(waiters) for waiters in self._pending.values())
+
+    def track(
+        self,
+        signature: str,
+        commitment: Commitment = Finalized,
+        last_valid_block_height: Optional[int] = None,
+    ) -> Future:
+        """
+        :param signature: base58 transaction signature
+        :param commitment: processed, confirmed or finalized
+        :param last_valid_block_height: stop waiting once the chain passes it
+        :return: future resolved with the signature status, cancelling it
+            stops polling for it
+        """
+        pending = _Pending(signature, commitment, last_valid_block_height)
+        pending.future.add_done_callback(
+            lambda future: future.cancelled() and self._discard(pending)
+        )
+        with self._cond:
+            self._pending.setdefault(signature, []).append(pending)
+            self._stopped = False
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="confirmation-tracker", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return pending.future
+
+    def wait(
+        self,
+        signature: str,
+        commitment: Commitment = Finalized,
+        last_valid_block_height: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """
+        Block until the signature reaches the commitment, see track()
+        :raise concurrent.futures.TimeoutError: not confirmed within timeout,
+            the signature is no longer polled then
+        """
+        future = self.track(signature, commitment, last_valid_block_height)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def poll(self) -> int:
+        """
+        Check every pending signature once
+        :return: number of resolved futures
+        """
+        with self._cond:
+            pending = {sig: list(waiters) for sig, waiters in self._pending.items()}
+        if not pending:
+            return 0
+
+        block_height = None
+        if any(
+            p.last_valid_block_height is not None
+            for waiters in pending.values()
+            for p in waiters
+        ):
+            # read before the statuses, so a signature landing in between
+            # is never reported as expired
+            block_height = self._call(self.client.get_block_height)
+
+        signatures = list(pending)
+        statuses = []
+        for i in range(0, len(signatures), MAX_SIGNATURE_STATUSES):
+            chunk = signatures[i : i + MAX_SIGNATURE_STATUSES]
+            statuses.extend(
+                self._call(self.client.get_signature_statuses, chunk)["value"]
+            )
+
+        resolved = 0
+        for signature, status in zip(signatures, statuses):
+            for waiter in pending[signature]:
+                if self._resolve(waiter, status, block_height):
+                    resolved += 1
+                    self._discard(waiter)
+        return resolved
+
+    def _discard(self, waiter: _Pending):
+        with self._cond:
+            waiters = self._pending.get(waiter.signature, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self._pending.pop(waiter.signature, None)
+
+    def _call(self, method, *args):
+        self.rpc_calls += 1
+        resp = method(*args)
+        if resp.get("error"):
+            raise RPCException(resp["error"])
+        return resp["result"]
+
+    @staticmethod
+    def _resolve(waiter: _Pending, status: Optional[dict], block_height) -> bool:
+        if waiter.future.done():
+            # cancelled by the caller
+            return True
+        if status is not None:
+            if status.get("err"):
+                waiter.future.set_exception(
+                    TransactionFailedError(waiter.signature, status["err"])
+                )
+                return True
+            reached = status.get("confirmationStatus")
+            if reached is not None and (
+                COMMITMENT_RANKS[reached] >= COMMITMENT_RANKS[waiter.commitment]
+            ):
+                waiter.future.set_result(status)
+                return True
+            return False
+
+        if (
+            block_height is not None
+            and waiter.last_valid_block_height is not None
+            and block_height > waiter.last_valid_block_height
+        ):
+            waiter.future.set_exception(
+                TransactionExpiredError(
+                    f"{waiter.signature} has expired: block height exceeded"
+                )
+            )
+            return True
+        return False
+
+    def _run(self):
+        attempt = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    self._thread = None
+                    return
+                before = self.pending
+
+            try:
+                resolved = self.poll()
+            except Exception as exc:
+                logger.warning(f"Signature status poll failed: {exc!r}")
+                resolved = 0
+
+            with self._cond:
+                if resolved or self.pending > before - resolved:
+                    attempt = 0
+                else:
+                    attempt = min(attempt + 1, MAX_BACKOFF_ATTEMPT)
+                try:
+                    delay = jittered_backoff(
+                        attempt,
+                        base=self.min_interval,
+                        maximum=self.max_interval,
+                        jitter=self.jitter,
+                    )
+                except Exception as exc:
+                    logger.warning(f"Signature status backoff failed: {exc!r}")
+                    delay = self.max_interval
+                # woken up early by track() or stop()
+                self._cond.wait(delay)
+
+
+_tracker: Optional[ConfirmationTracker] = None
+# trackers of other clients, stopped and dropped once the client is garbage
+# collected (they only hold a proxy of it)
+_client_trackers: "weakref.WeakKeyDictionary[Client, ConfirmationTracker]" = (
+    weakref.WeakKeyDictionary()
+)
+_tracker_lock = threading.Lock()
+
+
+def get_tracker(client: Optional["Client"] = None) -> ConfirmationTracker:
+    """
+    Process-wide tracker on the shared RPC client
+    :param client: another client (e.g. of an explicit config), it gets a
+        tracker of its own
+    """
+    global _tracker
+
+    if client is not None:
+        from src import rpc
+
+        if rpc.is_shared(client):
+            client = None
+
+    with _tracker_lock:
+        if client is not None:
+            tracker = _client_trackers.get(client)
+            if tracker is None:
+                tracker = _client_trackers[client] = ConfirmationTracker(
+                    weakref.proxy(client)
+                )
+                weakref.finalize(client, tracker.stop)
+            return tracker
+        if _tracker is None:
+            _tracker = ConfirmationTracker()
+        return _tracker
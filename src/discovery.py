@@ -0,0 +1,209 @@
+import threading
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set
+
+from solana.publickey import PublicKey
+from solana.rpc.core import RPCException
+from solana.rpc.types import DataSliceOpts, MemcmpOpts
+from solana.utils.helpers import decode_byte_string
+
+from config import FlashLoanConfig, get_config
+from src import metrics
+from src.reserve import PUBKEY_SIZE, Reserve
+
+if TYPE_CHECKING:
+    from solana.rpc.api import Client
+
+# RESERVE_LAYOUT offsets of lending_market and liquidity.mint_pubkey, the two
+# are adjacent so one data slice returns both
+LENDING_MARKET_OFFSET = 16
+MINT_OFFSET = 48
+KEYS_SLICE = DataSliceOpts(offset=LENDING_MARKET_OFFSET, length=2 * PUBKEY_SIZE)
+
+
+class ReserveKeys(NamedTuple):
+    reserve: PublicKey
+    lending_market: PublicKey
+    mint: PublicKey
+
+
+def find_reserves(
+    lending_market: Optional[PublicKey] = None,
+    mint: Optional[PublicKey] = None,
+    program_id: Optional[PublicKey] = None,
+    client: Optional["Client"] = None,
+    config: Optional[FlashLoanConfig] = None,
+) -> List[ReserveKeys]:
+    """
+    Reserves of the flash loan program with one getProgramAccounts call. The
+    validator filters them by size, lending market and mint and returns only
+    the 64 bytes holding the two keys
+    :param lending_market: only reserves of this market
+    :param mint: only reserves of this token
+    :param program_id: cfg.program_id by default
+    :param config: explicit config, the process-wide get_config() by default
+    """
+    filters = [
+        MemcmpOpts(offset=offset, bytes=str(key))
+        for offset, key in (
+            (LENDING_MARKET_OFFSET, lending_market),
+            (MINT_OFFSET, mint),
+        )
+        if key is not None
+    ]
+    from src import rpc
+
+    client = client or rpc.get_client(config)
+    with metrics.stage("program_accounts_fetch"):
+        resp = client.get_program_accounts(
+            program_id or (config or get_config()).program_id,
+            encoding="base64",
+            data_slice=KEYS_SLICE,
+            data_size=Reserve.SIZE,
+            memcmp_opts=filters or None,
+        )
+    if resp.get("error"):
+        raise RPCException(resp["error"])
+
+    reserves = []
+    for item in resp["result"]:
+        data = decode_byte_string(item["account"]["data"][0])
+        reserves.append(
+            ReserveKeys(
+                reserve=PublicKey(item["pubkey"]),
+                lending_market=PublicKey(data[:PUBKEY_SIZE]),
+                mint=PublicKey(data[PUBKEY_SIZE : 2 * PUBKEY_SIZE]),
+            )
+        )
+    return reserves
+
+
+class ReserveIndex:
+    """
+    mint -> reserves and lending market -> reserves index of the flash loan
+    program.
+
+    refresh() loads every reserve (or the reserves of one market) in one
+    scan. Lookups of a mint that is not indexed yet scan only the reserves
+    of that mint, once
+    """
+
+    def __init__(
+        self,
+        program_id: Optional[PublicKey] = None,
+        client: Optional["Client"] = None,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        self.program_id = program_id
+        self.config = config
+        self._client = client
+        self._reserves: Dict[PublicKey, ReserveKeys] = {}
+        self._by_mint: Dict[PublicKey, Set[PublicKey]] = defaultdict(set)
+        self._by_market: Dict[PublicKey, Set[PublicKey]] = defaultdict(set)
+        # mints and markets whose reserves are all indexed
+        self._complete_mints: Set[PublicKey] = set()
+        self._complete_markets: Set[PublicKey] = set()
+        self._complete = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._reserves)
+
+    def __contains__(self, reserve: PublicKey) -> bool:
+        return reserve in self._reserves
+
+    def get(self, reserve: PublicKey) -> Optional[ReserveKeys]:
+        return self._reserves.get(reserve)
+
+    def refresh(self, lending_market: Optional[PublicKey] = None) -> int:
+        """
+        Rescan all reserves, or the reserves of one lending market
+        :return: number of reserves found
+        """
+        found = self._find(lending_market=lending_market)
+        with self._lock:
+            stale = (
+                set(self._reserves)
+                if lending_market is None
+                else set(self._by_market.get(lending_market, ()))
+            )
+            for reserve in stale - {keys.reserve for keys in found}:
+                self._remove(reserve)
+            for keys in found:
+                self._add(keys)
+            if lending_market is None:
+                self._complete = True
+            else:
+                self._complete_markets.add(lending_market)
+        return len(found)
+
+    def add(self, keys: ReserveKeys):
+        with self._lock:
+            self._add(keys)
+
+    def by_mint(
+        self, mint: PublicKey, lending_market: Optional[PublicKey] = None
+    ) -> List[PublicKey]:
+        """
+        Reserves lending `mint`, optionally only those of one lending market
+        """
+        if not (self._complete or mint in self._complete_mints):
+            found = self._find(mint=mint)
+            with self._lock:
+                for keys in found:
+                    self._add(keys)
+                self._complete_mints.add(mint)
+
+        reserves = self._by_mint.get(mint, ())
+        if lending_market is not None:
+            reserves = [
+                r
+                for r in reserves
+                if self._reserves[r].lending_market == lending_market
+            ]
+        return sorted(reserves, key=bytes)
+
+    def by_market(self, lending_market: PublicKey) -> List[PublicKey]:
+        """
+        Reserves of a lending market
+        """
+        if not (self._complete or lending_market in self._complete_markets):
+            self.refresh(lending_market)
+        return sorted(self._by_market.get(lending_market, ()), key=bytes)
+
+    def resolve(
+        self, mint: PublicKey, lending_market: Optional[PublicKey] = None
+    ) -> PublicKey:
+        """
+        The reserve to flash borrow `mint` from
+        :raise LookupError: no reserve, or several and no lending_market to
+            choose between them
+        """
+        reserves = self.by_mint(mint, lending_market)
+        if not reserves:
+            raise LookupError(f"No reserve for mint {mint}")
+        if len(reserves) > 1:
+            raise LookupError(
+                f"{len(reserves)} reserves for mint {mint}, pass lending_market"
+            )
+        return reserves[0]
+
+    def _find(self, **filters) -> List[ReserveKeys]:
+        return find_reserves(
+            program_id=self.program_id,
+            client=self._client,
+            config=self.config,
+            **filters,
+        )
+
+    def _add(self, keys: ReserveKeys):
+        self._remove(keys.reserve)
+        self._reserves[keys.reserve] = keys
+        self._by_mint[keys.mint].add(keys.reserve)
+        self._by_market[keys.lending_market].add(keys.reserve)
+
+    def _remove(self, reserve: PublicKey):
+        keys = self._reserves.pop(reserve, None)
+        if keys is not None:
+            self._by_mint[keys.mint].discard(reserve)
+            self._by_market[keys.lending_market].discard(reserve)
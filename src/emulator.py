@@ -0,0 +1,284 @@
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from solana import sysvar
+from solana.publickey import PublicKey
+from solana.transaction import AccountMeta, Transaction, TransactionInstruction
+from spl.token import constants as spl_constants
+
+from config import FlashLoanConfig, get_config
+from src.address import find_lending_market_authority
+from src.fees import BorrowTooSmallError, FeeEngine
+from src.layout import CONTRACT_LAYOUT
+from src.message import VersionedTransaction
+from src.reserve import Reserve
+
+FLASH_BORROW = CONTRACT_LAYOUT.enum.FlashBorrow.index
+FLASH_REPAY = CONTRACT_LAYOUT.enum.FlashRepay.index
+
+_AMOUNT = struct.Struct("<Q")
+
+# (writable, signer) flags the program expects, in FlashBorrowParams /
+# FlashRepayParams account order
+BORROW_FLAGS = [
+    (True, False),
+    (True, False),
+    (True, False),
+    (False, False),
+    (False, False),
+    (False, False),
+    (False, False),
+]
+REPAY_FLAGS = [
+    (True, False),
+    (True, False),
+    (True, False),
+    (True, False),
+    (False, False),
+    (False, True),
+    (False, False),
+    (False, False),
+]
+
+
+@dataclass
+class EmulationResult:
+    ok: bool
+    errors: List[str] = field(default_factory=list)
+    # token balances after the transaction, only valid when ok
+    balances: Dict[PublicKey, int] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+@dataclass
+class _Borrow:
+    index: int
+    reserve: PublicKey
+    amount: int
+
+
+class FlashLoanEmulator:
+    """
+    Offline check of FlashBorrow/FlashRepay bundles against in-memory
+    reserve state and token balances.
+
+    Instructions run in order and the first failing one aborts the
+    transaction, like on chain. Every borrow needs a later repay of the same
+    reserve and amount, at most available liquidity can be borrowed, and the
+    repay source must hold the amount plus the flash loan fee, which goes to
+    the reserve fee receiver. Account order and writable / signer flags are
+    checked against FlashBorrowParams / FlashRepayParams. Instructions of
+    other programs are skipped, their token transfers are not modelled.
+    """
+
+    def __init__(
+        self,
+        reserves: Dict[PublicKey, Reserve],
+        balances: Optional[Dict[PublicKey, int]] = None,
+        program_id: Optional[PublicKey] = None,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        """
+        :param reserves: decoded reserves the bundles may use
+        :param balances: token account balances, missing accounts hold 0 and
+            reserve supplies hold their available liquidity
+        :param program_id: cfg.program_id by default
+        :param config: explicit config, the process-wide get_config() by default
+        """
+        self.reserves = reserves
+        self.program_id = program_id or (config or get_config()).program_id
+        self.balances = {
+            PublicKey(
+                reserve.liquidity_supply_pubkey
+            ): reserve.liquidity_available_amount
+            for reserve in reserves.values()
+        }
+        self.balances.update(balances or {})
+
+    def emulate(
+        self,
+        transaction: Union[
+            Transaction, VersionedTransaction, Sequence[TransactionInstruction]
+        ],
+        signers: Optional[Iterable[PublicKey]] = None,
+    ) -> EmulationResult:
+        """
+        :param transaction: transaction or instructions to check, state is
+            not changed
+        :param signers: keys that will sign, when given every account
+            flagged as a signer must be one of them
+        """
+        instructions = getattr(transaction, "instructions", transaction)
+        signers = None if signers is None else set(signers)
+        balances = dict(self.balances)
+        available = {
+            key: reserve.liquidity_available_amount
+            for key, reserve in self.reserves.items()
+        }
+        borrows: List[_Borrow] = []
+
+        for index, instruction in enumerate(instructions):
+            if instruction.program_id != self.program_id:
+                continue
+            errors = self._check_signers(instruction.keys, signers)
+            tag = instruction.data[:1]
+            if tag == bytes([FLASH_BORROW]):
+                errors += self._borrow(index, instruction, balances, available, borrows)
+            elif tag == bytes([FLASH_REPAY]):
+                errors += self._repay(instruction, balances, available, borrows)
+            else:
+                errors.append(f"unsupported instruction {_name(instruction.data)}")
+            if errors:
+                return EmulationResult(
+                    False, [f"instruction {index}: {error}" for error in errors]
+                )
+
+        errors = [
+            f"instruction {borrow.index}: FlashBorrow of {borrow.amount} "
+            f"is never repaid"
+            for borrow in borrows
+        ]
+        if errors:
+            return EmulationResult(False, errors)
+        return EmulationResult(True, balances=balances)
+
+    def _borrow(self, index, instruction, balances, available, borrows) -> List[str]:
+        errors = _check_accounts(instruction.keys, BORROW_FLAGS)
+        amount = _amount(instruction.data)
+        if errors or amount is None:
+            return errors or ["malformed FlashBorrow data"]
+
+        source, destination, reserve_key, market, authority = (
+            meta.pubkey for meta in instruction.keys[:5]
+        )
+        errors = self._check_reserve(reserve_key, market, supply=source)
+        if authority != find_lending_market_authority(market, self.program_id):
+            errors.append("wrong lending market authority")
+        errors += _check_programs(instruction.keys[5:])
+        if amount == 0:
+            errors.append("FlashBorrow amount is zero")
+        if reserve_key in available and amount > available[reserve_key]:
+            errors.append(
+                f"FlashBorrow of {amount} exceeds available liquidity "
+                f"{available[reserve_key]}"
+            )
+        if any(borrow.reserve == reserve_key for borrow in borrows):
+            errors.append("reserve is already flash borrowed")
+        if errors:
+            return errors
+
+        available[reserve_key] -= amount
+        balances[source] = balances.get(source, 0) - amount
+        balances[destination] = balances.get(destination, 0) + amount
+        borrows.append(_Borrow(index, reserve_key, amount))
+        return []
+
+    def _repay(self, instruction, balances, available, borrows) -> List[str]:
+        errors = _check_accounts(instruction.keys, REPAY_FLAGS)
+        amount = _amount(instruction.data)
+        if errors or amount is None:
+            return errors or ["malformed FlashRepay data"]
+
+        source, destination, fee_receiver, reserve_key, market = (
+            meta.pubkey for meta in instruction.keys[:5]
+        )
+        errors = self._check_reserve(reserve_key, market, supply=destination)
+        errors += _check_programs(instruction.keys[6:])
+        if errors:
+            return errors
+
+        reserve = self.reserves[reserve_key]
+        if PublicKey(reserve.fee_receiver) != fee_receiver:
+            errors.append("wrong reserve fee receiver")
+
+        borrow = next((b for b in borrows if b.reserve == reserve_key), None)
+        if borrow is None:
+            errors.append("FlashRepay without a preceding FlashBorrow")
+        elif borrow.amount != amount:
+            errors.append(
+                f"FlashRepay amount {amount} doesn't match "
+                f"FlashBorrow amount {borrow.amount}"
+            )
+
+        try:
+            borrow_fee, _ = FeeEngine.from_reserve(reserve).fees(amount)
+        except BorrowTooSmallError as exc:
+            errors.append(str(exc))
+            borrow_fee = 0
+        if balances.get(source, 0) < amount + borrow_fee:
+            errors.append(
+                f"repay source holds {balances.get(source, 0)}, "
+                f"needs {amount + borrow_fee} (amount + fee)"
+            )
+        if errors:
+            return errors
+
+        borrows.remove(borrow)
+        available[reserve_key] += amount
+        balances[source] -= amount + borrow_fee
+        balances[destination] = balances.get(destination, 0) + amount
+        balances[fee_receiver] = balances.get(fee_receiver, 0) + borrow_fee
+        return []
+
+    def _check_reserve(
+        self, reserve_key: PublicKey, market: PublicKey, supply: PublicKey
+    ) -> List[str]:
+        reserve = self.reserves.get(reserve_key)
+        if reserve is None:
+            return [f"unknown reserve {reserve_key}"]
+        errors = []
+        if PublicKey(reserve.lending_market) != market:
+            errors.append("reserve belongs to another lending market")
+        if PublicKey(reserve.liquidity_supply_pubkey) != supply:
+            errors.append("wrong reserve liquidity supply")
+        return errors
+
+    @staticmethod
+    def _check_signers(
+        keys: Sequence[AccountMeta], signers: Optional[set]
+    ) -> List[str]:
+        if signers is None:
+            return []
+        return [
+            f"missing signature of {meta.pubkey}"
+            for meta in keys
+            if meta.is_signer and meta.pubkey not in signers
+        ]
+
+
+def _check_accounts(keys: Sequence[AccountMeta], flags) -> List[str]:
+    if len(keys) != len(flags):
+        return [f"expected {len(flags)} accounts, got {len(keys)}"]
+    errors = []
+    for position, (meta, (writable, signer)) in enumerate(zip(keys, flags)):
+        if writable and not meta.is_writable:
+            errors.append(f"account {position} ({meta.pubkey}) must be writable")
+        if signer and not meta.is_signer:
+            errors.append(f"account {position} ({meta.pubkey}) must sign")
+    return errors
+
+
+def _check_programs(keys: Sequence[AccountMeta]) -> List[str]:
+    instructions_sysvar, token_program = (meta.pubkey for meta in keys)
+    errors = []
+    if instructions_sysvar != sysvar.SYSVAR_INSTRUCTIONS_PUBKEY:
+        errors.append("wrong instructions sysvar")
+    if token_program != spl_constants.TOKEN_PROGRAM_ID:
+        errors.append("wrong token program")
+    return errors
+
+
+def _amount(data: bytes) -> Optional[int]:
+    if len(data) != 1 + _AMOUNT.size:
+        return None
+    return _AMOUNT.unpack_from(data, 1)[0]
+
+
+def _name(data: bytes) -> str:
+    try:
+        return type(CONTRACT_LAYOUT.parse(data)).__name__
+    except Exception:
+        return "with unknown data"
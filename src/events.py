@@ -0,0 +1,58 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+Payload = Dict[str, Any]
+
+
+class _JsonPayload:
+    """
+    Serialized only if a handler actually formats the record
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Payload):
+        self.payload = payload
+
+    def __str__(self) -> str:
+        return json.dumps(self.payload, sort_keys=True, default=str)
+
+
+class EventLog:
+    """
+    Structured, lazily evaluated events on top of a logger.
+
+    Payload factories are only called when the event would be handled, i.e.
+    the log is enabled and the logger accepts `level`. The payload dict is
+    attached to the record as `event` / `payload` extras for structured
+    handlers, and rendered as JSON for plain ones. disable() turns every
+    emit() into a no-op regardless of the logging configuration.
+    """
+
+    def __init__(self, logger: logging.Logger, level: int = logging.DEBUG):
+        self.logger = logger
+        self.level = level
+        self.enabled = True
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def is_enabled(self) -> bool:
+        return self.enabled and self.logger.isEnabledFor(self.level)
+
+    def emit(self, event: str, payload: Optional[Callable[[], Payload]] = None):
+        if not self.enabled or not self.logger.isEnabledFor(self.level):
+            return
+
+        data = payload() if payload is not None else {}
+        self.logger.log(
+            self.level,
+            "%s %s",
+            event,
+            _JsonPayload(data),
+            extra={"event": event, "payload": data},
+        )
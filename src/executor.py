@@ -1,30 +1,60 @@
-import json
 import logging
 from abc import ABC
-from typing import List
+from concurrent.futures import Executor
+from typing import Iterable, List, Optional, Sequence, Union
 
 import borsh_construct
 from solana.keypair import Keypair
 from solana.publickey import PublicKey
-from solana.rpc.api import Client
-from solana.rpc.commitment import Finalized
-from solana.rpc.types import TxOpts
 from solana.transaction import Transaction, TransactionInstruction
 
-from config import cfg
+from config import FlashLoanConfig, get_config
+from src import batch, blockhash, compute_budget, metrics
+from src.batch import BatchResult
+from src.blockhash import BlockhashProvider
 from src.entities import AccountKeysStructure, FlashBorrowParams, FlashRepayParams
+from src.events import EventLog
 from src.layout import CONTRACT_LAYOUT
+from src.message import (
+    AddressLookupTable,
+    Message,
+    VersionedTransaction,
+    compile_message,
+)
+from src.policy import ExecutionPolicy, SafePolicy
+from src.template import FlashLoanTemplate
 
-logging.getLogger().setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
 
+# executor.events.disable() turns all executor logging into a no-op
+events = EventLog(logger)
 
-class FlashLoanExecutor(ABC):
+
+class _ConfiguredProgramId:
+    """
+    program_id of the executor's config (the process-wide one by default),
+    read on access instead of at import. Subclasses may still assign a
+    plain PublicKey
+    """
+
+    def __get__(self, instance, owner) -> PublicKey:
+        config = getattr(instance, "config", None) or get_config()
+        return config.program_id
+
+
+class BaseFlashLoanExecutor(ABC):
     CONTRACT_LAYOUT: borsh_construct.Enum = CONTRACT_LAYOUT
-    MAIN_PROGRAM_ID: PublicKey = cfg.program_id
+    MAIN_PROGRAM_ID: PublicKey = _ConfiguredProgramId()
+    EVENTS: EventLog = events
 
-    def __init__(self):
-        self.__client = Client(cfg.validator)
+    def __init__(self, config: Optional[FlashLoanConfig] = None):
+        """
+        :param config: explicit config, the process-wide get_config() by default
+        """
+        self.config = config
         self.__instructions = []
+        self.__compute_budget: List[TransactionInstruction] = []
+        self.__lookup_tables: List[AddressLookupTable] = []
 
     def _append_instruction(
         self,
@@ -34,54 +64,151 @@ class FlashLoanExecutor(ABC):
     ):
         instruction = getattr(self.CONTRACT_LAYOUT.enum, instruction_name)
 
-        logging.info(f"Append instruction {instruction_name}")
-        logging.info(
-            (
-                f"Account Keys: \n {acc_keys.as_account_keys()} \n"
-                f"Data: \n {json.dumps(data, sort_keys=True, indent=4, default=str)}"
-            )
+        self.EVENTS.emit(
+            "append_instruction",
+            lambda: {
+                "instruction": instruction_name,
+                "accounts": acc_keys.as_dict(),
+                "data": data,
+            },
         )
 
-        data = self.CONTRACT_LAYOUT.build(instruction(**data))
-
-        self.__instructions.append(
-            TransactionInstruction(
-                keys=acc_keys.as_account_keys(),
-                program_id=self.MAIN_PROGRAM_ID,
-                data=data,
+        with metrics.stage("instruction_build"):
+            self.__instructions.append(
+                TransactionInstruction(
+                    keys=acc_keys.as_account_keys(),
+                    program_id=self.MAIN_PROGRAM_ID,
+                    data=self.CONTRACT_LAYOUT.build(instruction(**data)),
+                )
             )
+
+    def estimate(self, fee_payer: PublicKey) -> Message:
+        """
+        Compile the pending instructions without sending anything, e.g. to
+        check message.transaction_size() / message.account_count
+        """
+        return compile_message(
+            fee_payer,
+            self.__compute_budget + self.__instructions,
+            self.__lookup_tables,
+            version=0 if self.__lookup_tables else None,
         )
 
-    def execute(self, fee_payer: PublicKey, signers: List[Keypair]):
+    def _build_transaction(
+        self, fee_payer: PublicKey, signers: List[Keypair]
+    ) -> Union[Transaction, VersionedTransaction]:
+        """
+        Take the pending instructions as a transaction and reset the builder,
+        so the executor can be reused while the transaction is in flight.
+        Callers put them back with _restore_instructions() if sending fails
+        :raise TransactionTooLargeError: the transaction can't be sent, the
+            instructions stay pending
+        """
         if not self.__instructions:
             raise ValueError("Executor has no instructions")
 
-        logging.info(
-            (
-                f"Execute transaction with:\n"
-                f"Fee Payer: {fee_payer}\n"
-                f"Signers: {[sig.public_key for sig in signers]}\n"
-            )
-        )
-
-        transaction = Transaction(
-            fee_payer=fee_payer,
-            instructions=self.__instructions,
+        self.EVENTS.emit(
+            "execute",
+            lambda: {
+                "fee_payer": fee_payer,
+                "signers": [signer.public_key for signer in signers],
+                "instructions": len(self.__instructions),
+            },
         )
 
-        resp = self.__client.send_transaction(
-            transaction,
-            *set(signers),
-            opts=TxOpts(skip_confirmation=False, preflight_commitment=Finalized),
-        )
+        self.estimate(fee_payer).check_size()
+        instructions = self.__compute_budget + self.__instructions
+        if self.__lookup_tables:
+            transaction = VersionedTransaction(
+                fee_payer, instructions, self.__lookup_tables
+            )
+        else:
+            transaction = Transaction(fee_payer=fee_payer, instructions=instructions)
 
         self.reset()
 
-        return resp
+        return transaction
+
+    def _restore_instructions(self, instructions: Sequence[TransactionInstruction]):
+        """
+        Put instructions taken by _build_transaction() back in front of the
+        pending ones
+        """
+        self.__instructions = list(instructions) + self.__instructions
+
+    @property
+    def instructions(self) -> List[TransactionInstruction]:
+        """
+        Copy of the pending instructions
+        """
+        return list(self.__instructions)
 
     def reset(self):
+        """
+        Drop the pending instructions, compute budget and lookup tables are kept
+        """
         self.__instructions = []
 
+    def add_instructions(self, *instructions: TransactionInstruction):
+        """
+        Append arbitrary instructions, e.g. swaps between flash_borrow and
+        flash_repay
+        :param instructions:
+        :return:
+        """
+        self.EVENTS.emit(
+            "append_instruction",
+            lambda: {
+                "instructions": [
+                    str(instruction.program_id) for instruction in instructions
+                ]
+            },
+        )
+        self.__instructions.extend(instructions)
+
+        return self
+
+    def set_compute_budget(
+        self, units: Optional[int] = None, micro_lamports: Optional[int] = None
+    ):
+        """
+        Prepend compute budget instructions to every transaction
+        :param units: compute unit limit
+        :param micro_lamports: priority fee per compute unit
+        :return:
+        """
+        self.__compute_budget = []
+        if units is not None:
+            self.__compute_budget.append(compute_budget.set_compute_unit_limit(units))
+        if micro_lamports is not None:
+            self.__compute_budget.append(
+                compute_budget.set_compute_unit_price(micro_lamports)
+            )
+
+        return self
+
+    def use_lookup_tables(self, *lookup_tables: AddressLookupTable):
+        """
+        Build v0 transactions loading accounts from the lookup tables, no
+        tables switches back to legacy transactions
+        :param lookup_tables:
+        :return:
+        """
+        self.__lookup_tables = list(lookup_tables)
+
+        return self
+
+    def flash_loan(self, template: FlashLoanTemplate, amount: int):
+        """
+        Append FlashBorrow and FlashRepay instructions from a precompiled template
+        :param template:
+        :param amount:
+        :return:
+        """
+        self.__instructions.extend(template.instructions(amount))
+
+        return self
+
     def flash_borrow(
         self,
         source_liquidity: PublicKey,
@@ -150,3 +277,128 @@ class FlashLoanExecutor(ABC):
         )
 
         return self
+
+
+class FlashLoanExecutor(BaseFlashLoanExecutor):
+    def __init__(
+        self,
+        blockhash_provider: Optional[BlockhashProvider] = None,
+        policy: Optional[ExecutionPolicy] = None,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        """
+        :param blockhash_provider: source of recent blockhashes, the shared
+            background provider by default
+        :param policy: how transactions are sent, SafePolicy() by default
+        :param config: explicit config, the process-wide get_config() by default.
+            The RPC client (validator, pool, rate limit) is built from it too
+        """
+        from src import rpc
+
+        super().__init__(config)
+        self.__client = rpc.get_client(config)
+        self.__blockhash_provider = blockhash_provider or blockhash.get_provider(
+            self.__client
+        )
+        self.policy = policy or SafePolicy()
+
+    def execute(self, fee_payer: PublicKey, signers: List[Keypair]):
+        """
+        Sign and send the pending instructions as one transaction. They are
+        cleared once the policy accepted it and stay pending when the
+        blockhash fetch, signing or the policy raises
+        :return: whatever the execution policy returns, the RPC response for
+            SafePolicy, a SendHandle for FireAndForgetPolicy
+        """
+        instructions = self.instructions
+        transaction = self._build_transaction(fee_payer, signers)
+
+        try:
+            recent_blockhash = self.__blockhash_provider.get()
+            transaction.recent_blockhash = recent_blockhash.blockhash
+
+            with metrics.stage("signing"):
+                transaction.sign(*set(signers))
+                raw_transaction = transaction.serialize()
+
+            return self.policy.send(
+                self.__client,
+                transaction,
+                raw_transaction,
+                recent_blockhash.last_valid_block_height,
+            )
+        except Exception:
+            self._restore_instructions(instructions)
+            raise
+
+    def execute_many(
+        self,
+        bundles: Iterable[Sequence[TransactionInstruction]],
+        fee_payer: PublicKey,
+        signers: List[Keypair],
+        sign_pool: Optional[Executor] = None,
+        send_workers: int = 4,
+        queue_size: int = 64,
+    ) -> List[BatchResult]:
+        """
+        Execute independent bundles, one transaction each. Transactions are
+        signed in parallel on `sign_pool` (a thread pool sized to the CPU
+        count by default) and handed to `send_workers` sending threads
+        through a bounded queue, so a slow RPC node throttles signing instead
+        of piling up signed transactions
+        :param bundles: instructions of every transaction, e.g.
+            template.instructions(amount) with swaps in between
+        :param fee_payer:
+        :param signers:
+        :param sign_pool: any concurrent.futures.Executor
+        :param send_workers: transactions being sent at once, confirmations
+            are tracked in the background (see ExecutionPolicy.submit)
+        :param queue_size: signed transactions waiting to be sent at most
+        :return: per transaction results in the order of the bundles, a
+            bundle that fails to build, sign, send or confirm has its `error`
+            set
+        :raise ValueError: the executor has pending instructions, execute()
+            or reset() them first
+        """
+        if self.instructions:
+            raise ValueError(
+                "Executor has pending instructions, execute() or reset() them "
+                "before execute_many()"
+            )
+        transactions, results = [], []
+        for index, bundle in enumerate(bundles):
+            results.append(BatchResult(index))
+            try:
+                transactions.append(
+                    self.add_instructions(*bundle)._build_transaction(
+                        fee_payer, signers
+                    )
+                )
+            except Exception as exc:
+                self.reset()
+                results[index].error = exc
+                transactions.append(None)
+
+        if not any(transactions):
+            return results
+
+        recent_blockhash = self.__blockhash_provider.get()
+        for transaction in transactions:
+            if transaction is not None:
+                transaction.recent_blockhash = recent_blockhash.blockhash
+
+        batch.run(
+            transactions,
+            list(set(signers)),
+            lambda transaction, raw: self.policy.submit(
+                self.__client,
+                transaction,
+                raw,
+                recent_blockhash.last_valid_block_height,
+            ),
+            results,
+            sign_pool=sign_pool,
+            send_workers=send_workers,
+            queue_size=queue_size,
+        )
+        return results
@@ -0,0 +1,183 @@
+import sys
+from dataclasses import dataclass
+from math import gcd
+from typing import List, Sequence, Tuple
+
+from src.reserve import Reserve
+
+WAD = 10**18
+HALF_WAD = WAD // 2
+U64_MAX = 2**64 - 1
+
+
+class BorrowTooSmallError(Exception):
+    def __init__(self, amount: int):
+        super().__init__("Borrow amount is too small to receive liquidity after fees")
+        self.amount = amount
+
+
+@dataclass(frozen=True)
+class BulkFees:
+    """
+    Fees for many amounts. Entries the program would reject as too small
+    have valid=False and zero fees
+    """
+
+    borrow_fees: Sequence[int]
+    texture_fees: Sequence[int]
+    valid: Sequence[bool]
+
+
+class FeeEngine:
+    """
+    Flash loan fees with the program's exact WAD arithmetic.
+
+    The borrow fee is amount * flash_loan_fee_wad (in WADs), at least 2
+    (1 without a Texture fee) and rounded half up. The Texture fee is
+    texture_fee_percentage of the unrounded borrow fee, rounded half up and
+    at least 1. Amounts whose fee would eat the whole loan are rejected.
+    """
+
+    __slots__ = (
+        "flash_loan_fee_wad",
+        "texture_fee_percentage",
+        "minimum_fee",
+        "_borrow_ratio",
+        "_texture_ratio",
+    )
+
+    def __init__(self, flash_loan_fee_wad: int, texture_fee_percentage: int):
+        self.flash_loan_fee_wad = flash_loan_fee_wad
+        self.texture_fee_percentage = texture_fee_percentage
+        self.minimum_fee = 2 if texture_fee_percentage > 0 else 1
+        # fee / WAD and fee * pct / (100 * WAD) as reduced fractions, which keep
+        # the numbers small enough for uint64 arrays
+        self._borrow_ratio = _reduce(flash_loan_fee_wad, WAD)
+        self._texture_ratio = _reduce(
+            flash_loan_fee_wad * texture_fee_percentage, 100 * WAD
+        )
+
+    @classmethod
+    def from_reserve(cls, reserve_acc: Reserve) -> "FeeEngine":
+        return cls(reserve_acc.flash_loan_fee_wad, reserve_acc.texture_fee_percentage)
+
+    def fees(self, amount: int) -> Tuple[int, int]:
+        """
+        :param amount: amount to borrow in the smallest token units
+        :return: (flash loan fee, texture fee)
+        :raise BorrowTooSmallError: the fee is not lower than the amount
+        """
+        if self.flash_loan_fee_wad <= 0 or amount <= 0:
+            return 0, 0
+
+        borrow_fee_wads = max(amount * self.flash_loan_fee_wad, self.minimum_fee * WAD)
+        if borrow_fee_wads >= amount * WAD:
+            raise BorrowTooSmallError(amount)
+        borrow_fee = (borrow_fee_wads + HALF_WAD) // WAD
+
+        if self.texture_fee_percentage <= 0:
+            return borrow_fee, 0
+        texture_fee_wads = borrow_fee_wads * self.texture_fee_percentage // 100
+        texture_fee = max((texture_fee_wads + HALF_WAD) // WAD, 1)
+        return borrow_fee, texture_fee
+
+    def bulk(self, amounts: Sequence[int]) -> BulkFees:
+        """
+        Fees for every amount, with numpy arrays when numpy is installed
+        and the amounts are a numpy array
+        """
+        # numpy is optional and never imported here: a numpy array can only
+        # be passed in once the caller has imported it
+        np = sys.modules.get("numpy")
+        if np is not None and isinstance(amounts, np.ndarray):
+            return self._bulk_numpy(np, amounts)
+
+        borrow_fees: List[int] = []
+        texture_fees: List[int] = []
+        valid: List[bool] = []
+        for amount in amounts:
+            try:
+                borrow_fee, texture_fee = self.fees(int(amount))
+            except BorrowTooSmallError:
+                borrow_fee, texture_fee, ok = 0, 0, False
+            else:
+                ok = True
+            borrow_fees.append(borrow_fee)
+            texture_fees.append(texture_fee)
+            valid.append(ok)
+        return BulkFees(borrow_fees, texture_fees, valid)
+
+    def _bulk_numpy(self, np, amounts) -> BulkFees:
+        amounts = amounts.astype(np.uint64)
+        size = len(amounts)
+        if self.flash_loan_fee_wad <= 0 or size == 0:
+            zeros = np.zeros(size, dtype=np.uint64)
+            return BulkFees(zeros, zeros.copy(), np.ones(size, dtype=bool))
+
+        (b_num, b_den), (t_num, t_den) = self._borrow_ratio, self._texture_ratio
+        largest = int(amounts.max())
+        if (
+            2 * largest * max(b_num, t_num) + max(b_den, t_den) > U64_MAX
+            or 2 * max(b_den, t_den) > U64_MAX
+        ):
+            # the exact python path can't overflow
+            fees = self.bulk([int(amount) for amount in amounts])
+            return BulkFees(
+                np.array(fees.borrow_fees, dtype=np.uint64),
+                np.array(fees.texture_fees, dtype=np.uint64),
+                np.array(fees.valid, dtype=bool),
+            )
+
+        # round(amount * num / den) == (2 * amount * num + den) // (2 * den)
+        borrow_fees = (2 * amounts * np.uint64(b_num) + np.uint64(b_den)) // np.uint64(
+            2 * b_den
+        )
+        texture_fees = (2 * amounts * np.uint64(t_num) + np.uint64(t_den)) // np.uint64(
+            2 * t_den
+        )
+
+        # amount * fee < minimum * WAD  <=>  amount * b_num < minimum * b_den
+        below_minimum = amounts * np.uint64(b_num) < np.uint64(self.minimum_fee * b_den)
+        minimum_borrow_fee, minimum_texture_fee = self._minimum_fees()
+        borrow_fees[below_minimum] = minimum_borrow_fee
+        texture_fees[below_minimum] = minimum_texture_fee
+
+        if self.texture_fee_percentage > 0:
+            texture_fees = np.maximum(texture_fees, np.uint64(1))
+        else:
+            texture_fees[:] = 0
+
+        valid = (amounts > 0) & (
+            np.where(below_minimum, amounts > self.minimum_fee, b_num < b_den)
+        )
+        borrow_fees[~valid] = 0
+        texture_fees[~valid] = 0
+        # a zero amount is not an error, it just costs nothing
+        valid |= amounts == 0
+        return BulkFees(borrow_fees, texture_fees, valid)
+
+    def _minimum_fees(self) -> Tuple[int, int]:
+        if self.texture_fee_percentage <= 0:
+            return self.minimum_fee, 0
+        texture_fee_wads = self.minimum_fee * WAD * self.texture_fee_percentage // 100
+        return self.minimum_fee, max((texture_fee_wads + HALF_WAD) // WAD, 1)
+
+
+def _reduce(numerator: int, denominator: int) -> Tuple[int, int]:
+    divisor = gcd(numerator, denominator) or 1
+    return numerator // divisor, denominator // divisor
+
+
+def flash_loan_fees(reserve_acc: Reserve, amount: int) -> Tuple[int, int]:
+    """
+    :return: (flash loan fee, texture fee) for one amount
+    :raise BorrowTooSmallError: the fee is not lower than the amount
+    """
+    return FeeEngine.from_reserve(reserve_acc).fees(amount)
+
+
+def bulk_flash_loan_fees(reserve_acc: Reserve, amounts: Sequence[int]) -> BulkFees:
+    """
+    :return: fees for every amount, see FeeEngine.bulk()
+    """
+    return FeeEngine.from_reserve(reserve_acc).bulk(amounts)
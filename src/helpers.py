@@ -1,49 +1,73 @@
-import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import spl.token.instructions as spl_token
 from borsh_construct import CStruct
 from solana import system_program
 from solana.keypair import Keypair
 from solana.publickey import PublicKey
-from solana.rpc.api import Client
 from solana.rpc.commitment import Finalized
+from solana.rpc.core import RPCException
 from solana.rpc.types import RPCResponse, TxOpts
 from solana.transaction import Transaction
 from solana.utils.helpers import decode_byte_string
 from spl.token import constants as spl_constants
-from spl.token.client import Token
 
-from config import cfg
-from src import utils
-from src.layout import RESERVE_LAYOUT
+from config import FlashLoanConfig, get_config
+from src import blockhash, fees, metrics, utils
+from src.blockhash import BlockhashProvider
+from src.events import EventLog
+from src.reserve import Reserve
 
 logger = logging.getLogger(__name__)
+events = EventLog(logger)
+
+# getMultipleAccounts limit
+MAX_MULTIPLE_ACCOUNTS = 100
 
 
 class Account:
-    def __init__(self, public_key: PublicKey = None, keypair: Keypair = None):
-        self.validator = cfg.validator
-        self.client = Client(self.validator)
+    def __init__(
+        self,
+        public_key: PublicKey = None,
+        keypair: Keypair = None,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        """
+        :param config: explicit config, the process-wide get_config() by default
+        """
+        from src import rpc
+
+        self.config = config
+        self.client = rpc.get_client(config)
         self.public_key = public_key or keypair.public_key
         self.keypair = keypair
 
+    @property
+    def validator(self) -> str:
+        return (self.config or get_config()).validator
+
     def get_info(self, schema, is_anchor: bool = False):
         """
         Get account info from solana and parse by current schema
         """
-        logger.debug(f"Get Account info for key: {self.public_key}")
+        return self.get_info_with_slot(schema, is_anchor)[0]
 
-        client = Client(cfg.validator)
-        resp = client.get_account_info(self.public_key)
+    def get_info_with_slot(self, schema, is_anchor: bool = False) -> Tuple[Any, int]:
+        """
+        Same as get_info, but also returns the slot the account was read at
+        """
+        with metrics.stage("account_fetch"):
+            resp = self.client.get_account_info(self.public_key)
 
         data = self.__parse_account_data(resp, schema, is_anchor)
 
-        logger.debug(
-            f"Parsed account data:\n {json.dumps(data, indent=4, default=str)}"
+        events.emit(
+            "get_account_info", lambda: {"account": self.public_key, "data": data}
         )
 
-        return data
+        return data, resp["result"]["context"]["slot"]
 
     def __parse_account_data(self, resp: RPCResponse, schema: CStruct, is_anchor: bool):
         try:
@@ -58,12 +82,26 @@ class Account:
 
 
 class Wallet:
-    def __init__(self, public_key: PublicKey = None, keypair: Keypair = None):
-        self.validator = cfg.validator
-        self.client = Client(self.validator)
+    def __init__(
+        self,
+        public_key: PublicKey = None,
+        keypair: Keypair = None,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        """
+        :param config: explicit config, the process-wide get_config() by default
+        """
+        from src import rpc
+
+        self.config = config
+        self.client = rpc.get_client(config)
         self.public_key = public_key or keypair.public_key
         self.keypair = keypair
 
+    @property
+    def validator(self) -> str:
+        return (self.config or get_config()).validator
+
     @utils.wait_transaction_finalized
     def __air_drop(self, sol_amount: int):
         """
@@ -78,16 +116,24 @@ class Wallet:
         return self.__air_drop(amount)
 
     def create_native_spl_token_account(
-        self, payer: Keypair, source_transfer_wallet: Keypair, amount: int
+        self,
+        payer: Keypair,
+        source_transfer_wallet: Keypair,
+        amount: int,
+        blockhash_provider: Optional[BlockhashProvider] = None,
     ):
-        client = Client(cfg.validator)
+        from spl.token.client import Token
+
+        provider = blockhash_provider or blockhash.get_provider(self.client)
         tnx = Transaction(fee_payer=payer.public_key)
         tnx.add(
             system_program.create_account(
                 system_program.CreateAccountParams(
                     from_pubkey=payer.public_key,
                     new_account_pubkey=self.keypair.public_key,
-                    lamports=Token.get_min_balance_rent_for_exempt_for_account(client),
+                    lamports=Token.get_min_balance_rent_for_exempt_for_account(
+                        self.client
+                    ),
                     space=spl_constants.ACCOUNT_LEN,
                     program_id=spl_constants.TOKEN_PROGRAM_ID,
                 )
@@ -112,43 +158,115 @@ class Wallet:
                 )
             )
         )
-        return client.send_transaction(
+        return self.client.send_transaction(
             tnx,
             payer,
             source_transfer_wallet,
             self.keypair,
             opts=TxOpts(skip_confirmation=False, preflight_commitment=Finalized),
+            recent_blockhash=provider.get().blockhash,
         )
 
 
-def available_liquidity(reserve: PublicKey) -> int:
-    reserve_acc = Account(public_key=reserve).get_info(RESERVE_LAYOUT)
-    return reserve_acc["liquidity"]["available_amount"]
-
-
-def calculate_flash_loan_fees(reserve: PublicKey, amount: int) -> any:
-    reserve_acc = Account(public_key=reserve).get_info(RESERVE_LAYOUT)
-    flash_loan_fee_wad = reserve_acc["config"]["fees"]["flash_loan_fee_wad"] / (
-        10**18
-    )
-    texture_fee_percentage = (
-        reserve_acc["config"]["fees"]["texture_fee_percentage"] / 100
-    )
-    if flash_loan_fee_wad > 0 and amount > 0:
-        need_to_assess_texture_fee = texture_fee_percentage > 0
-        minimum_fee = 2 if need_to_assess_texture_fee else 1
-        borrow_fee_amount = amount * flash_loan_fee_wad
-        borrow_fee = max(borrow_fee_amount, minimum_fee)
-        if borrow_fee >= amount:
-            raise Exception(
-                "Borrow amount is too small to receive liquidity after fees"
-            )
-        if need_to_assess_texture_fee:
-            texture_fee_amount = borrow_fee * texture_fee_percentage
-            texture_fee = max(texture_fee_amount, 1)
-        else:
-            texture_fee = 0
+def fetch_multiple_accounts(
+    keys: Sequence[PublicKey], config: Optional[FlashLoanConfig] = None
+) -> Dict[PublicKey, Tuple[Optional[bytes], int]]:
+    """
+    Fetch raw account data with getMultipleAccounts. Keys are split into
+    chunks of MAX_MULTIPLE_ACCOUNTS, chunks are requested concurrently
+    :param keys:
+    :param config: explicit config, the process-wide get_config() by default
+    :return: key -> (account data or None if the account does not exist, slot)
+    """
+    keys = list(dict.fromkeys(keys))
+    chunks = [
+        keys[i : i + MAX_MULTIPLE_ACCOUNTS]
+        for i in range(0, len(keys), MAX_MULTIPLE_ACCOUNTS)
+    ]
+    if not chunks:
+        return {}
+
+    from src import rpc
+
+    client = rpc.get_client(config)
+
+    def fetch_chunk(chunk: List[PublicKey]):
+        with metrics.stage("multiple_accounts_fetch"):
+            resp = client.get_multiple_accounts(chunk, encoding="base64")
+        if resp.get("error"):
+            raise RPCException(resp["error"])
+        slot = resp["result"]["context"]["slot"]
+        return [
+            (key, (decode_byte_string(value["data"][0]) if value else None, slot))
+            for key, value in zip(chunk, resp["result"]["value"])
+        ]
+
+    with ThreadPoolExecutor(max_workers=min(len(chunks), client.pool_size)) as pool:
+        return {
+            key: result
+            for chunk_result in pool.map(fetch_chunk, chunks)
+            for key, result in chunk_result
+        }
+
+
+def fetch_reserves(
+    keys: Sequence[PublicKey],
+    strict: bool = False,
+    config: Optional[FlashLoanConfig] = None,
+) -> Dict[PublicKey, Optional[Reserve]]:
+    """
+    Fetch and decode many reserves in a few getMultipleAccounts calls
+    :param keys:
+    :param strict: raise ValueError if some of the accounts do not exist
+    :param config: explicit config, the process-wide get_config() by default
+    :return: reserve key -> decoded reserve, None for missing accounts
+    """
+    reserves = {
+        key: Reserve(data) if data is not None else None
+        for key, (data, _) in fetch_multiple_accounts(keys, config).items()
+    }
+
+    missing = [str(key) for key, reserve in reserves.items() if reserve is None]
+    if missing:
+        logger.warning(f"Reserve accounts not found: {missing}")
+        if strict:
+            raise ValueError(f"Reserve accounts not found: {missing}")
+
+    return reserves
+
+
+def available_liquidity(
+    reserve: PublicKey,
+    reserve_acc: Reserve = None,
+    config: Optional[FlashLoanConfig] = None,
+) -> int:
+    """
+    :param reserve:
+    :param reserve_acc: already decoded reserve (e.g. from ReserveCache),
+        fetched from the chain when omitted
+    :param config: explicit config, the process-wide get_config() by default
+    :return:
+    """
+    if reserve_acc is None:
+        reserve_acc = Account(public_key=reserve, config=config).get_info(Reserve)
+    return reserve_acc.liquidity_available_amount
 
-        return int(borrow_fee), int(texture_fee)
 
-    return 0, 0
+def calculate_flash_loan_fees(
+    reserve: PublicKey,
+    amount: int,
+    reserve_acc: Reserve = None,
+    config: Optional[FlashLoanConfig] = None,
+) -> any:
+    """
+    :param reserve:
+    :param amount:
+    :param reserve_acc: already decoded reserve (e.g. from ReserveCache),
+        fetched from the chain when omitted
+    :param config: explicit config, the process-wide get_config() by default
+    :return: (flash loan fee, texture fee)
+    """
+    if reserve_acc is None:
+        reserve_acc = Account(public_key=reserve, config=config).get_info(Reserve)
+    with metrics.stage("fee_calculation"):
+        return fees.flash_loan_fees(reserve_acc, amount)
@@ -0,0 +1,280 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+from solana.transaction import TransactionInstruction
+from solders.hash import Hash
+from solders.signature import Signature
+
+# max serialized transaction size
+PACKET_DATA_SIZE = 1232
+# accounts a transaction may lock
+MAX_TRANSACTION_ACCOUNTS = 64
+
+SIGNATURE_SIZE = 64
+PUBKEY_SIZE = 32
+VERSION_PREFIX = 0x80
+
+
+class TransactionTooLargeError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AddressLookupTable:
+    """
+    On-chain address lookup table: its account key and the addresses it holds
+    """
+
+    key: PublicKey
+    addresses: Sequence[PublicKey]
+
+
+@dataclass(frozen=True)
+class CompiledInstruction:
+    program_id_index: int
+    accounts: Tuple[int, ...]
+    data: bytes
+
+
+@dataclass(frozen=True)
+class MessageLookup:
+    table: PublicKey
+    writable_indexes: Tuple[int, ...]
+    readonly_indexes: Tuple[int, ...]
+
+
+@dataclass
+class Message:
+    """
+    Compiled legacy (version=None) or v0 message
+    """
+
+    num_required_signatures: int
+    num_readonly_signed: int
+    num_readonly_unsigned: int
+    static_keys: List[PublicKey]
+    instructions: List[CompiledInstruction]
+    lookups: List[MessageLookup] = field(default_factory=list)
+    version: Optional[int] = None
+
+    @property
+    def account_count(self) -> int:
+        return len(self.static_keys) + sum(
+            len(lookup.writable_indexes) + len(lookup.readonly_indexes)
+            for lookup in self.lookups
+        )
+
+    @property
+    def signers(self) -> List[PublicKey]:
+        return self.static_keys[: self.num_required_signatures]
+
+    def serialize(self, recent_blockhash: bytes) -> bytes:
+        out = bytearray()
+        if self.version is not None:
+            out.append(VERSION_PREFIX | self.version)
+        out += bytes(
+            [
+                self.num_required_signatures,
+                self.num_readonly_signed,
+                self.num_readonly_unsigned,
+            ]
+        )
+        out += encode_length(len(self.static_keys))
+        for key in self.static_keys:
+            out += bytes(key)
+        out += recent_blockhash
+        out += encode_length(len(self.instructions))
+        for instruction in self.instructions:
+            out.append(instruction.program_id_index)
+            out += encode_length(len(instruction.accounts)) + bytes(
+                instruction.accounts
+            )
+            out += encode_length(len(instruction.data)) + instruction.data
+        if self.version is not None:
+            out += encode_length(len(self.lookups))
+            for lookup in self.lookups:
+                out += bytes(lookup.table)
+                out += encode_length(len(lookup.writable_indexes))
+                out += bytes(lookup.writable_indexes)
+                out += encode_length(len(lookup.readonly_indexes))
+                out += bytes(lookup.readonly_indexes)
+        return bytes(out)
+
+    def transaction_size(self) -> int:
+        """
+        Size of the signed transaction in bytes
+        """
+        signatures = self.num_required_signatures
+        message = self.serialize(bytes(PUBKEY_SIZE))
+        return (
+            len(encode_length(signatures)) + signatures * SIGNATURE_SIZE + len(message)
+        )
+
+    def check_size(self):
+        """
+        :raise TransactionTooLargeError: over the packet size or account limit
+        """
+        size = self.transaction_size()
+        if size > PACKET_DATA_SIZE:
+            raise TransactionTooLargeError(
+                f"Transaction is {size} bytes, the limit is {PACKET_DATA_SIZE}"
+            )
+        if self.account_count > MAX_TRANSACTION_ACCOUNTS:
+            raise TransactionTooLargeError(
+                f"Transaction locks {self.account_count} accounts, "
+                f"the limit is {MAX_TRANSACTION_ACCOUNTS}"
+            )
+
+
+def encode_length(value: int) -> bytes:
+    """
+    compact-u16 ("shortvec") length prefix
+    """
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def compile_message(
+    payer: PublicKey,
+    instructions: Sequence[TransactionInstruction],
+    lookup_tables: Sequence[AddressLookupTable] = (),
+    version: Optional[int] = None,
+) -> Message:
+    """
+    Compile instructions into a message. With version=0, non-signer accounts
+    found in `lookup_tables` (except invoked programs) are loaded from them
+    instead of being listed in the message
+    """
+    if version is None and lookup_tables:
+        raise ValueError("Lookup tables need a versioned (v0) message")
+
+    # key -> [is_signer, is_writable], in order of first use
+    metas: Dict[PublicKey, List[bool]] = {payer: [True, True]}
+    programs = set()
+    for instruction in instructions:
+        for meta in instruction.keys:
+            flags = metas.setdefault(meta.pubkey, [False, False])
+            flags[0] |= meta.is_signer
+            flags[1] |= meta.is_writable
+        metas.setdefault(instruction.program_id, [False, False])
+        programs.add(instruction.program_id)
+
+    table_index: Dict[PublicKey, Tuple[int, int]] = {}
+    if version is not None:
+        for t, table in enumerate(lookup_tables):
+            for i, address in enumerate(table.addresses):
+                table_index.setdefault(address, (t, i))
+
+    static = {
+        k: v for k, v in metas.items() if v[0] or k in programs or k not in table_index
+    }
+    groups = [
+        [k for k, (s, w) in static.items() if s and w],
+        [k for k, (s, w) in static.items() if s and not w],
+        [k for k, (s, w) in static.items() if not s and w],
+        [k for k, (s, w) in static.items() if not s and not w],
+    ]
+    static_keys = [key for group in groups for key in group]
+
+    # loaded addresses follow the static keys: writable ones of every table,
+    # then readonly ones
+    writable: List[List[Tuple[int, PublicKey]]] = [[] for _ in lookup_tables]
+    readonly: List[List[Tuple[int, PublicKey]]] = [[] for _ in lookup_tables]
+    for key, (_, is_writable) in metas.items():
+        if key in static:
+            continue
+        t, i = table_index[key]
+        (writable if is_writable else readonly)[t].append((i, key))
+
+    loaded = [key for entries in writable for _, key in entries] + [
+        key for entries in readonly for _, key in entries
+    ]
+    index = {key: i for i, key in enumerate(static_keys + loaded)}
+    if len(index) > 256:
+        raise TransactionTooLargeError(f"Transaction references {len(index)} accounts")
+
+    lookups = [
+        MessageLookup(
+            table=table.key,
+            writable_indexes=tuple(i for i, _ in writable[t]),
+            readonly_indexes=tuple(i for i, _ in readonly[t]),
+        )
+        for t, table in enumerate(lookup_tables)
+        if writable[t] or readonly[t]
+    ]
+
+    return Message(
+        num_required_signatures=len(groups[0]) + len(groups[1]),
+        num_readonly_signed=len(groups[1]),
+        num_readonly_unsigned=len(groups[3]),
+        static_keys=static_keys,
+        instructions=[
+            CompiledInstruction(
+                program_id_index=index[instruction.program_id],
+                accounts=tuple(index[meta.pubkey] for meta in instruction.keys),
+                data=bytes(instruction.data),
+            )
+            for instruction in instructions
+        ],
+        lookups=lookups,
+        version=version,
+    )
+
+
+class VersionedTransaction:
+    """
+    v0 transaction, built and signed like solana.transaction.Transaction
+    """
+
+    def __init__(
+        self,
+        fee_payer: PublicKey,
+        instructions: Sequence[TransactionInstruction],
+        lookup_tables: Sequence[AddressLookupTable] = (),
+        recent_blockhash: Optional[str] = None,
+    ):
+        self.fee_payer = fee_payer
+        self.instructions = list(instructions)
+        self.lookup_tables = list(lookup_tables)
+        self.recent_blockhash = recent_blockhash
+        self.message = compile_message(
+            fee_payer, self.instructions, self.lookup_tables, version=0
+        )
+        self.signatures: List[Optional[Signature]] = [None] * len(self.message.signers)
+
+    def serialize_message(self) -> bytes:
+        if self.recent_blockhash is None:
+            raise ValueError("Transaction recent_blockhash required")
+        return self.message.serialize(bytes(Hash.from_string(self.recent_blockhash)))
+
+    def sign(self, *signers: Keypair):
+        """
+        :raise ValueError: a required signer is missing or an extra one given
+        """
+        keys = {signer.public_key: signer for signer in signers}
+        required = self.message.signers
+        if set(keys) != set(required):
+            raise ValueError("Signers don't match the transaction signers")
+
+        message = self.serialize_message()
+        self.signatures = [keys[key].sign(message) for key in required]
+
+    def signature(self) -> Signature:
+        return self.signatures[0]
+
+    def serialize(self) -> bytes:
+        if any(signature is None for signature in self.signatures):
+            raise AttributeError("Transaction has not been signed")
+        out = bytearray(encode_length(len(self.signatures)))
+        for signature in self.signatures:
+            out += bytes(signature)
+        return bytes(out) + self.serialize_message()
@@ -0,0 +1,210 @@
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+STAGE_DURATION = "stage_duration_seconds"
+STAGE_ERRORS = "stage_errors_total"
+
+
+class Metrics(abc.ABC):
+    """
+    Metrics sink. Implement observe() and increment() to plug the SDK into
+    your own metrics system, see set_metrics()
+    """
+
+    @abc.abstractmethod
+    def observe(self, name: str, value: float, **labels: str):
+        """
+        Record a histogram sample
+        """
+
+    @abc.abstractmethod
+    def increment(self, name: str, value: float = 1, **labels: str):
+        """
+        Increase a counter
+        """
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """
+        Observe the duration of the block in seconds
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """
+        Time one flash loan stage, failures are also counted per stage
+        """
+        try:
+            with self.timer(STAGE_DURATION, stage=stage):
+                yield
+        except Exception:
+            self.increment(STAGE_ERRORS, stage=stage)
+            raise
+
+
+class NullMetrics(Metrics):
+    def observe(self, name: str, value: float, **labels: str):
+        pass
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        pass
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        result, total = [], 0
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class InMemoryMetrics(Metrics):
+    """
+    Thread-safe in-process histograms and counters with Prometheus text export
+    """
+
+    DEFAULT_BUCKETS = (
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        30,
+        60,
+    )
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        return self.histograms.get((name, _labels(labels)))
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self.counters.get((name, _labels(labels)), 0)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def to_prometheus(self, prefix: str = "flash_loan_") -> str:
+        """
+        Render everything in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        typed = set()
+        for (name, labels), histogram in histograms:
+            metric = prefix + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for le, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                bucket_labels = _format_labels(labels, ("le", repr(float(le))))
+                lines.append(f"{metric}_bucket{bucket_labels} {count}")
+            inf_labels = _format_labels(labels, ("le", "+Inf"))
+            lines.append(f"{metric}_bucket{inf_labels} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            metric = prefix + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+_metrics: Metrics = InMemoryMetrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def set_metrics(metrics: Metrics):
+    """
+    Replace the process-wide metrics sink, e.g. with NullMetrics() to turn
+    instrumentation off
+    """
+    global _metrics
+    _metrics = metrics
+
+
+def stage(name: str):
+    """
+    Time a flash loan stage with the current metrics sink
+    """
+    return _metrics.stage(name)
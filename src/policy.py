@@ -0,0 +1,317 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Sequence, Set
+
+from solana.rpc.commitment import Commitment, Confirmed, Finalized
+from solana.rpc.types import TxOpts
+from solana.transaction import Transaction
+
+from config import FlashLoanConfig, get_config
+from src import confirmation, metrics
+
+if TYPE_CHECKING:
+    from solana.rpc.api import Client
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutionPolicy(ABC):
+    """
+    Decides how FlashLoanExecutor sends a signed transaction and what
+    execute() returns
+    """
+
+    @abstractmethod
+    def send(
+        self,
+        client: "Client",
+        transaction: Transaction,
+        raw_transaction: bytes,
+        last_valid_block_height: int,
+    ):
+        """
+        :param client: executor RPC client
+        :param transaction: signed transaction
+        :param raw_transaction: serialized transaction
+        :param last_valid_block_height: last block height of the blockhash
+        """
+
+    def submit(
+        self,
+        client: "Client",
+        transaction: Transaction,
+        raw_transaction: bytes,
+        last_valid_block_height: int,
+    ) -> Future:
+        """
+        Send without blocking until confirmation, used by execute_many(). The
+        future resolves with what send() returns; by default send() runs
+        right away and the future is already done
+        """
+        future = Future()
+        try:
+            future.set_result(
+                self.send(client, transaction, raw_transaction, last_valid_block_height)
+            )
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+class SafePolicy(ExecutionPolicy):
+    """
+    Default policy: simulate at `commitment`, send once and block until the
+    transaction reaches `commitment`. execute() returns the RPC response
+    """
+
+    def __init__(self, commitment: Commitment = Finalized):
+        self.commitment = commitment
+
+    def send(
+        self,
+        client: "Client",
+        transaction: Transaction,
+        raw_transaction: bytes,
+        last_valid_block_height: int,
+    ):
+        resp = self._send(client, raw_transaction)
+
+        with metrics.stage("confirmation"):
+            confirmation.get_tracker(client).wait(
+                resp["result"],
+                self.commitment,
+                last_valid_block_height=last_valid_block_height,
+            )
+
+        return resp
+
+    def submit(
+        self,
+        client: "Client",
+        transaction: Transaction,
+        raw_transaction: bytes,
+        last_valid_block_height: int,
+    ) -> Future:
+        """
+        Send once and hand the signature to the confirmation tracker, the
+        future resolves with the RPC response once the transaction reaches
+        `commitment`
+        """
+        resp = self._send(client, raw_transaction)
+        tracked = confirmation.get_tracker(client).track(
+            resp["result"], self.commitment, last_valid_block_height
+        )
+        future = Future()
+        start = time.perf_counter()
+
+        def confirmed(tracked: Future):
+            sink = metrics.get_metrics()
+            sink.observe(
+                metrics.STAGE_DURATION,
+                time.perf_counter() - start,
+                stage="confirmation",
+            )
+            if tracked.cancelled():
+                future.cancel()
+            elif tracked.exception() is not None:
+                sink.increment(metrics.STAGE_ERRORS, stage="confirmation")
+                future.set_exception(tracked.exception())
+            else:
+                future.set_result(resp)
+
+        tracked.add_done_callback(confirmed)
+        return future
+
+    def _send(self, client: "Client", raw_transaction: bytes):
+        with metrics.stage("send"):
+            return client.send_raw_transaction(
+                raw_transaction,
+                opts=TxOpts(
+                    skip_confirmation=True, preflight_commitment=self.commitment
+                ),
+            )
+
+
+class SendHandle:
+    """
+    Transaction in flight, returned by FireAndForgetPolicy
+    """
+
+    def __init__(self, signature: str, future: Future):
+        self.signature = signature
+        self.future = future
+        self.broadcasts = 0
+        self._lock = threading.Lock()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> dict:
+        """
+        Block until the transaction is confirmed
+        :raise TransactionExpiredError: blockhash expired before it landed
+        :raise TransactionFailedError: transaction landed with an error
+        """
+        return self.future.result(timeout)
+
+    def _broadcasted(self):
+        with self._lock:
+            self.broadcasts += 1
+
+
+@dataclass
+class _InFlight:
+    handle: SendHandle
+    raw_transaction: bytes
+    targets: List["Client"]
+    # indexes of the targets a broadcast is running for
+    busy: Set[int] = field(default_factory=set)
+
+
+class FireAndForgetPolicy(ExecutionPolicy):
+    """
+    Latency-oriented policy: skips the preflight simulation and returns a
+    SendHandle right away. The same signed bytes are rebroadcast every
+    `rebroadcast_interval` seconds to the executor client and every extra
+    endpoint, until the transaction reaches `commitment` or its blockhash
+    expires.
+
+    One loop thread schedules the rebroadcasts of every transaction in
+    flight on a pool of `max_workers` threads, a target still busy with the
+    previous broadcast is skipped. close() stops both
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[str] = (),
+        rebroadcast_interval: float = 0.2,
+        commitment: Commitment = Confirmed,
+        config: Optional[FlashLoanConfig] = None,
+        max_workers: int = 8,
+    ):
+        """
+        :param endpoints: extra RPC urls to broadcast to
+        :param rebroadcast_interval: seconds between broadcasts
+        :param commitment: when to stop rebroadcasting
+        :param config: pool size and timeout of the extra endpoints, the
+            process-wide get_config() by default
+        :param max_workers: broadcasts running at once
+        """
+        self.rebroadcast_interval = rebroadcast_interval
+        self.commitment = commitment
+        from src.rpc import PooledClient
+
+        if endpoints:
+            config = config or get_config()
+        self.clients: List["Client"] = [
+            PooledClient(
+                endpoint, pool_size=config.rpc_pool_size, timeout=config.rpc_timeout
+            )
+            for endpoint in endpoints
+        ]
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="flash-loan-rebroadcast"
+        )
+        self._in_flight: List[_InFlight] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Transactions still being rebroadcast
+        """
+        with self._cond:
+            return sum(not entry.handle.done() for entry in self._in_flight)
+
+    def send(
+        self,
+        client: "Client",
+        transaction: Transaction,
+        raw_transaction: bytes,
+        last_valid_block_height: int,
+    ) -> SendHandle:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("FireAndForgetPolicy is closed")
+            signature = str(transaction.signature())
+            handle = SendHandle(
+                signature,
+                confirmation.get_tracker(client).track(
+                    signature, self.commitment, last_valid_block_height
+                ),
+            )
+            entry = _InFlight(handle, raw_transaction, [client, *self.clients])
+            if not self._in_flight:
+                # wake the idle loop, it rebroadcasts on its interval otherwise
+                self._cond.notify()
+            self._in_flight.append(entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="flash-loan-rebroadcast-loop", daemon=True
+                )
+                self._thread.start()
+            self._broadcast(entry)
+
+        return handle
+
+    def close(self):
+        """
+        Stop rebroadcasting and close the extra endpoint clients. Transactions
+        in flight keep being tracked, their handles still resolve
+        """
+        with self._cond:
+            self._closed = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._pool.shutdown(cancel_futures=True)
+        for client in self.clients:
+            client.close()
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                # idle until send() adds a transaction
+                self._cond.wait(self.rebroadcast_interval if self._in_flight else None)
+                if self._closed:
+                    break
+                self._in_flight = [
+                    entry for entry in self._in_flight if not entry.handle.done()
+                ]
+                for entry in self._in_flight:
+                    self._broadcast(entry)
+
+    def _broadcast(self, entry: _InFlight):
+        # called with self._cond held
+        for index, target in enumerate(entry.targets):
+            if index not in entry.busy:
+                try:
+                    self._pool.submit(self._send_to, entry, index)
+                except RuntimeError:
+                    # interpreter shutdown
+                    self._closed = True
+                    return
+                entry.busy.add(index)
+
+    def _send_to(self, entry: _InFlight, index: int):
+        opts = TxOpts(skip_confirmation=True, skip_preflight=True, max_retries=0)
+        try:
+            if not entry.handle.done():
+                with metrics.stage("send"):
+                    entry.targets[index].send_raw_transaction(
+                        entry.raw_transaction, opts=opts
+                    )
+                entry.handle._broadcasted()
+        except Exception as exc:
+            logger.debug(f"Broadcast of {entry.handle.signature} failed: {exc!r}")
+        finally:
+            with self._cond:
+                entry.busy.discard(index)
@@ -0,0 +1,165 @@
+from dataclasses import dataclass, field
+from typing import List, Mapping, Optional
+
+from solana.publickey import PublicKey
+
+from src.cache import ReserveCache
+from src.discovery import ReserveIndex
+from src.fees import BorrowTooSmallError, FeeEngine
+from src.reserve import Reserve
+
+
+@dataclass(frozen=True)
+class ReserveQuote:
+    """
+    Cost of borrowing `amount` from one reserve. The borrower repays
+    `amount + borrow_fee`, `texture_fee` is the Texture share of that fee and
+    costs nothing extra. `headroom` is the liquidity left after the loan,
+    negative when the reserve can't cover it
+    """
+
+    reserve: PublicKey
+    amount: int
+    available: int
+    borrow_fee: int
+    texture_fee: int
+
+    @property
+    def headroom(self) -> int:
+        return self.available - self.amount
+
+    @property
+    def covers(self) -> bool:
+        return self.headroom >= 0
+
+
+@dataclass(frozen=True)
+class Quote:
+    """
+    Candidates are ranked reserves that can cover the amount first, by
+    borrow fee, then the others by available liquidity. `plan` is the
+    cheapest way to borrow the amount: the best candidate, or a split over
+    several reserves when none covers it. It is empty when all reserves
+    together can't
+    """
+
+    amount: int
+    candidates: List[ReserveQuote]
+    plan: List[ReserveQuote] = field(default_factory=list)
+
+    @property
+    def best(self) -> Optional[ReserveQuote]:
+        if self.candidates and self.candidates[0].covers:
+            return self.candidates[0]
+        return None
+
+    @property
+    def total_fee(self) -> int:
+        """
+        Borrow fees of the plan, i.e. what the borrower pays on top of the amount
+        """
+        return sum(leg.borrow_fee for leg in self.plan)
+
+    @property
+    def shortfall(self) -> int:
+        return self.amount - sum(leg.amount for leg in self.plan)
+
+
+def quote(amount: int, reserves: Mapping[PublicKey, Optional[Reserve]]) -> Quote:
+    """
+    Rank reserves lending the same token for a flash loan of `amount`,
+    from already decoded reserve state. Reserves that would reject the
+    amount as too small (or are None) are left out
+    :param amount: amount to borrow in the smallest token units
+    :param reserves: reserve key -> decoded reserve
+    """
+    candidates = []
+    engines = {}
+    for reserve, reserve_acc in reserves.items():
+        if reserve_acc is None:
+            continue
+        engine = engines[reserve] = FeeEngine.from_reserve(reserve_acc)
+        try:
+            borrow_fee, texture_fee = engine.fees(amount)
+        except BorrowTooSmallError:
+            continue
+        candidates.append(
+            ReserveQuote(
+                reserve,
+                amount,
+                reserve_acc.liquidity_available_amount,
+                borrow_fee,
+                texture_fee,
+            )
+        )
+
+    candidates.sort(
+        key=lambda c: (0, c.borrow_fee, -c.available)
+        if c.covers
+        else (1, -c.available, c.borrow_fee)
+    )
+    if candidates and candidates[0].covers:
+        return Quote(amount, candidates, [candidates[0]])
+    return Quote(amount, candidates, _split(amount, candidates, engines))
+
+
+def _split(amount, candidates: List[ReserveQuote], engines) -> List[ReserveQuote]:
+    """
+    Fill the reserves with the lowest borrow fee rate first. Fees are linear in the
+    amount apart from the minimum fees, so greedy is optimal up to them.
+    Empty reserves and parts too small to borrow get no leg
+    """
+    by_rate = sorted(
+        candidates,
+        key=lambda c: (engines[c.reserve].flash_loan_fee_wad, -c.available),
+    )
+    if sum(c.available for c in by_rate) < amount:
+        return []
+
+    plan, left = [], amount
+    for candidate in by_rate:
+        if not left:
+            break
+        part = min(left, candidate.available)
+        if part <= 0:
+            continue
+        try:
+            borrow_fee, texture_fee = engines[candidate.reserve].fees(part)
+        except BorrowTooSmallError:
+            continue
+        plan.append(
+            ReserveQuote(
+                candidate.reserve, part, candidate.available, borrow_fee, texture_fee
+            )
+        )
+        left -= part
+    return plan if not left else []
+
+
+class QuoteRouter:
+    """
+    Quotes a mint from the reserves a ReserveIndex knows for it, decoded
+    through a ReserveCache, so repeated quotes cost no RPC calls until
+    cache entries expire
+    """
+
+    def __init__(
+        self, index: Optional[ReserveIndex] = None, cache: Optional[ReserveCache] = None
+    ):
+        self.index = index or ReserveIndex()
+        self.cache = cache or ReserveCache()
+
+    def quote(
+        self,
+        mint: PublicKey,
+        amount: int,
+        lending_market: Optional[PublicKey] = None,
+        current_slot: Optional[int] = None,
+    ) -> Quote:
+        """
+        :param mint: token to borrow
+        :param amount: amount to borrow in the smallest token units
+        :param lending_market: only quote reserves of this market
+        """
+        reserves = self.index.by_mint(mint, lending_market)
+        return quote(amount, self.cache.fetch_many(reserves, current_slot))
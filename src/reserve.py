@@ -0,0 +1,85 @@
+import struct
+
+PUBKEY_SIZE = 32
+
+_U8 = struct.Struct("<B")
+_U64 = struct.Struct("<Q")
+
+
+def _int_field(offset: int, fmt: struct.Struct) -> property:
+    unpack_from = fmt.unpack_from
+
+    def getter(self) -> int:
+        return unpack_from(self._buf, offset)[0]
+
+    return property(getter)
+
+
+def _pubkey_field(offset: int) -> property:
+    end = offset + PUBKEY_SIZE
+
+    def getter(self) -> memoryview:
+        return self._buf[offset:end]
+
+    return property(getter)
+
+
+class Reserve:
+    """
+    Read-only view over raw reserve account data, byte-for-byte equivalent to
+    RESERVE_LAYOUT but without building the borsh_construct Container tree.
+
+    Fields are decoded lazily at fixed offsets on every access. Pubkeys are
+    returned as 32-byte memoryview slices of the account data, wrap them with
+    PublicKey(...) or bytes(...) when needed. Padding fields are not exposed.
+    """
+
+    __slots__ = ("_buf",)
+
+    SIZE = 360
+
+    version = _int_field(0, _U8)
+    last_update = _int_field(8, _U64)
+    lending_market = _pubkey_field(16)
+
+    liquidity_mint_pubkey = _pubkey_field(48)
+    liquidity_mint_decimals = _int_field(80, _U64)
+    liquidity_supply_pubkey = _pubkey_field(88)
+    liquidity_available_amount = _int_field(120, _U64)
+
+    lp_tokens_mint_pubkey = _pubkey_field(128)
+    lp_tokens_mint_total_supply = _int_field(160, _U64)
+    lp_tokens_supply_pubkey = _pubkey_field(168)
+
+    flash_loan_fee_wad = _int_field(200, _U64)
+    texture_fee_percentage = _int_field(208, _U8)
+    deposit_limit = _int_field(216, _U64)
+    fee_receiver = _pubkey_field(224)
+
+    def __init__(self, data: bytes):
+        buf = memoryview(data).cast("B")
+        if len(buf) < self.SIZE:
+            raise ValueError(
+                f"Reserve data should be at least {self.SIZE} bytes, got {len(buf)}"
+            )
+        self._buf = buf
+
+    @classmethod
+    def parse(cls, data: bytes) -> "Reserve":
+        """
+        Same entry point as RESERVE_LAYOUT.parse, so Reserve can be passed
+        as a schema to Account.get_info
+        """
+        return cls(data)
+
+    @property
+    def raw(self) -> memoryview:
+        return self._buf[: self.SIZE]
+
+    def __repr__(self) -> str:
+        return (
+            f"Reserve(version={self.version}, last_update={self.last_update}, "
+            f"available_amount={self.liquidity_available_amount}, "
+            f"flash_loan_fee_wad={self.flash_loan_fee_wad}, "
+            f"texture_fee_percentage={self.texture_fee_percentage})"
+        )
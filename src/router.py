@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Any, Callable, List, Optional, Sequence
+
+from solana.rpc.providers.http import HTTPProvider
+from solana.rpc.types import RPCMethod, RPCResponse
+
+logger = logging.getLogger(__name__)
+
+SEND_METHODS = frozenset({"sendTransaction"})
+# JSON-RPC errors meaning the node itself is unhealthy or lagging behind the
+# cluster (not that the request is wrong): block not available, node
+# unhealthy, block status not available yet, min context slot not reached
+NODE_HEALTH_ERROR_CODES = frozenset({-32004, -32005, -32014, -32016})
+
+
+class NodeUnhealthyError(Exception):
+    """
+    The endpoint answered with a node health error
+    """
+
+    def __init__(self, resp: RPCResponse):
+        super().__init__(resp["error"])
+        self.resp = resp
+
+
+class EndpointHealth:
+    """
+    Latency / error rate of one endpoint, smoothed with an exponentially
+    weighted moving average, and its circuit breaker state
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown: float = 5,
+        max_cooldown: float = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.endpoint = endpoint
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.requests = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        The circuit is open, i.e. the endpoint is skipped while cooling down
+        """
+        return self.clock() < self.open_until
+
+    @property
+    def score(self) -> float:
+        """
+        Lower is better. Endpoints without samples score 0, so they get tried
+        """
+        return self.latency * (1 + 10 * self.error_rate)
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._sample(latency, 0)
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+
+    def record_failure(self, latency: float):
+        with self._lock:
+            self._sample(latency, 1)
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                trips = self.consecutive_failures - self.failure_threshold
+                cooldown = min(self.cooldown * 2**trips, self.max_cooldown)
+                self.open_until = self.clock() + cooldown
+                logger.warning(
+                    f"RPC endpoint {self.endpoint} is failing, "
+                    f"skipping it for {cooldown:.1f}s"
+                )
+
+    def _sample(self, latency: float, error: int):
+        if self.requests == 0:
+            self.latency, self.error_rate = latency, float(error)
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+            self.error_rate += self.alpha * (error - self.error_rate)
+        self.requests += 1
+
+
+class RoutedHTTPProvider(HTTPProvider):
+    """
+    Routes requests over several validator endpoints.
+
+    Reads go to the healthy endpoint with the best score and fail over to the
+    next one when it raises (connection error, timeout, http error status) or
+    answers with a node health error (NODE_HEALTH_ERROR_CODES, e.g. node
+    behind). When every endpoint is unhealthy the last error response is
+    returned.
+    Transaction sends are fanned out to the `send_fanout` best endpoints at
+    once and the first successful response wins. Endpoints are skipped while
+    their circuit breaker is open; when every circuit is open all of them are
+    tried anyway.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[HTTPProvider],
+        send_fanout: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+        **health_kwargs,
+    ):
+        """
+        :param providers: one provider per endpoint
+        :param send_fanout: number of endpoints a transaction is sent to
+        :param health_kwargs: EndpointHealth settings
+        """
+        if not providers:
+            raise ValueError("At least one endpoint is required")
+
+        super().__init__(providers[0].endpoint_uri, timeout=providers[0].timeout)
+        self.providers = list(providers)
+        self.send_fanout = send_fanout
+        self.clock = clock
+        self.health = [
+            EndpointHealth(provider.endpoint_uri, clock=clock, **health_kwargs)
+            for provider in self.providers
+        ]
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.providers), thread_name_prefix="rpc-router"
+        )
+
+    def ranked(self) -> List[int]:
+        """
+        :return: endpoint indexes, best first
+        """
+        indexes = range(len(self.providers))
+        healthy = [i for i in indexes if not self.health[i].is_open]
+        if not healthy:
+            return sorted(indexes, key=lambda i: self.health[i].open_until)
+        return sorted(healthy, key=lambda i: self.health[i].score)
+
+    def make_request(self, method: RPCMethod, *params: Any) -> RPCResponse:
+        if method in SEND_METHODS:
+            return self._fan_out(method, *params)
+
+        error: Optional[Exception] = None
+        for index in self.ranked():
+            try:
+                return self._request(index, method, *params)
+            except Exception as exc:
+                error = exc
+        return self._raise(error)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for provider in self.providers:
+            if hasattr(provider, "close"):
+                provider.close()
+
+    def _fan_out(self, method: RPCMethod, *params: Any) -> RPCResponse:
+        pending = {
+            self._executor.submit(self._request, index, method, *params)
+            for index in self.ranked()[: self.send_fanout]
+        }
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+        return self._raise(error)
+
+    def _request(self, index: int, method: RPCMethod, *params: Any) -> RPCResponse:
+        start = self.clock()
+        try:
+            resp = self.providers[index].make_request(method, *params)
+        except Exception:
+            self.health[index].record_failure(self.clock() - start)
+            raise
+        error = resp.get("error")
+        if isinstance(error, dict) and error.get("code") in NODE_HEALTH_ERROR_CODES:
+            self.health[index].record_failure(self.clock() - start)
+            raise NodeUnhealthyError(resp)
+        self.health[index].record_success(self.clock() - start)
+        return resp
+
+    @staticmethod
+    def _raise(error: BaseException) -> RPCResponse:
+        # node health errors are handed back as the response they came in
+        if isinstance(error, NodeUnhealthyError):
+            return error.resp
+        raise error
@@ -0,0 +1,246 @@
+import atexit
+import threading
+import weakref
+from typing import Any, Dict, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+from solana.exceptions import SolanaRpcException, handle_exceptions
+from solana.rpc.api import Client
+from solana.rpc.commitment import Commitment
+from solana.rpc.providers.http import HTTPProvider
+from solana.rpc.types import RPCMethod, RPCResponse
+
+from config import FlashLoanConfig, get_config
+from src.router import RoutedHTTPProvider
+from src.scheduler import RateLimitedError, RequestScheduler, parse_retry_after
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """
+    HTTP provider which keeps its connections alive in a requests.Session
+    instead of opening a new one for every request. Requests are admitted by
+    the endpoint's RequestScheduler
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        pool_size: int = 10,
+        timeout: float = 10,
+        extra_headers: Optional[Dict[str, str]] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        super().__init__(endpoint, extra_headers=extra_headers, timeout=timeout)
+        self.scheduler = scheduler or RequestScheduler()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def make_request(self, method: RPCMethod, *params: Any) -> RPCResponse:
+        return self.scheduler.run(method, params, lambda: self._post(method, params))
+
+    @handle_exceptions(SolanaRpcException, requests.exceptions.RequestException)
+    def _post(self, method: RPCMethod, params: Sequence[Any]) -> RPCResponse:
+        request_kwargs = self._before_request(
+            method=method, params=params, is_async=False
+        )
+        raw_response = self.session.post(**request_kwargs, timeout=self.timeout)
+        if raw_response.status_code == 429:
+            raise RateLimitedError(
+                parse_retry_after(raw_response.headers.get("Retry-After"))
+            )
+        return self._after_request(raw_response=raw_response, method=method)
+
+    def close(self):
+        self.session.close()
+
+
+class PooledClient(Client):
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        pool_size: int = 10,
+        timeout: float = 10,
+        commitment: Optional[Commitment] = None,
+        endpoints: Sequence[str] = (),
+        rate_limit: Optional[float] = None,
+    ):
+        """
+        :param endpoint: validator url
+        :param endpoints: several validator urls, requests are routed over
+            them by a RoutedHTTPProvider (endpoint is then ignored)
+        :param rate_limit: requests per second allowed per endpoint, unlimited
+            by default
+        """
+        super().__init__(endpoint, commitment, timeout=timeout)
+        self.pool_size = pool_size
+        if len(endpoints) > 1:
+            # a rate limited endpoint fails over to the next one right away
+            self._provider = RoutedHTTPProvider(
+                [
+                    PooledHTTPProvider(
+                        url,
+                        pool_size=pool_size,
+                        timeout=timeout,
+                        scheduler=RequestScheduler(rate_limit, max_retries=0),
+                    )
+                    for url in endpoints
+                ]
+            )
+        else:
+            self._provider = PooledHTTPProvider(
+                endpoints[0] if endpoints else endpoint,
+                pool_size=pool_size,
+                timeout=timeout,
+                scheduler=RequestScheduler(rate_limit),
+            )
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        """
+        Request scheduler of the endpoint, None when requests are routed
+        (every routed endpoint has its own)
+        """
+        return getattr(self._provider, "scheduler", None)
+
+    @property
+    def router(self) -> Optional[RoutedHTTPProvider]:
+        if isinstance(self._provider, RoutedHTTPProvider):
+            return self._provider
+        return None
+
+    def close(self):
+        self._provider.close()
+
+
+_lock = threading.Lock()
+_client: Optional[PooledClient] = None
+_settings: Dict[str, Any] = {}
+# clients of explicit configs (FlashLoanExecutor(config=...)), a client is
+# closed and dropped once its config is garbage collected
+_config_clients: "weakref.WeakKeyDictionary[FlashLoanConfig, PooledClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def configure(
+    endpoint: Optional[str] = None,
+    pool_size: Optional[int] = None,
+    timeout: Optional[float] = None,
+    endpoints: Optional[Sequence[str]] = None,
+    rate_limit: Optional[float] = None,
+):
+    """
+    Override the settings of the shared client, omitted ones fall back to the
+    config. The current client (if any) is closed, the next get_client() call
+    builds a new one
+    :param endpoint: validator url, cfg.validator by default
+    :param pool_size: max keep-alive connections, cfg.rpc_pool_size by default
+    :param timeout: per-request timeout in seconds, cfg.rpc_timeout by default
+    :param endpoints: several validator urls to route over, cfg.validators by
+        default (ignored when endpoint is given)
+    :param rate_limit: requests per second per endpoint, cfg.rpc_rate_limit by
+        default
+    :return:
+    """
+    overrides = dict(
+        endpoint=endpoint,
+        pool_size=pool_size,
+        timeout=timeout,
+        endpoints=endpoints,
+        rate_limit=rate_limit,
+    )
+    with _lock:
+        _settings.clear()
+        _settings.update({k: v for k, v in overrides.items() if v is not None})
+    _close_shared()
+
+
+def _setting(name: str, config_field: str):
+    # the config is only read for settings configure() didn't override
+    if name in _settings:
+        return _settings[name]
+    return getattr(get_config(), config_field)
+
+
+def _config_client(config: FlashLoanConfig) -> PooledClient:
+    with _lock:
+        client = _config_clients.get(config)
+        if client is None:
+            client = _config_clients[config] = PooledClient(
+                config.validator,
+                pool_size=config.rpc_pool_size,
+                timeout=config.rpc_timeout,
+                endpoints=config.validators,
+                rate_limit=config.rpc_rate_limit,
+            )
+            weakref.finalize(config, client.close)
+        return client
+
+
+def get_client(config: Optional[FlashLoanConfig] = None) -> PooledClient:
+    """
+    Process-wide RPC client, all SDK calls go through it and reuse its
+    warm connections
+    :param config: explicit config, its own client is built from it (once)
+        and configure() overrides don't apply
+    """
+    global _client
+
+    if config is not None:
+        return _config_client(config)
+
+    client = _client
+    if client is not None:
+        return client
+
+    with _lock:
+        if _client is None:
+            if "endpoint" in _settings:
+                endpoints = ()
+            else:
+                endpoints = _setting("endpoints", "validators")
+            _client = PooledClient(
+                _setting("endpoint", "validator"),
+                pool_size=_setting("pool_size", "rpc_pool_size"),
+                timeout=_setting("timeout", "rpc_timeout"),
+                endpoints=endpoints,
+                rate_limit=_setting("rate_limit", "rpc_rate_limit"),
+            )
+        return _client
+
+
+def is_shared(client) -> bool:
+    """
+    Whether client is the shared client, without building it
+    """
+    return client is not None and client is _client
+
+
+def _close_shared():
+    global _client
+
+    with _lock:
+        client, _client = _client, None
+
+    if client is not None:
+        client.close()
+
+
+def close():
+    """
+    Close the shared client connections and the clients of explicit configs.
+    Safe to call several times
+    """
+    _close_shared()
+    with _lock:
+        clients = list(_config_clients.values())
+        _config_clients.clear()
+
+    for client in clients:
+        client.close()
+
+
+atexit.register(close)
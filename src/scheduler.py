@@ -0,0 +1,225 @@
+import email.utils
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.backoff import jittered_backoff
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """
+    Lower values are admitted first when requests wait for the budget
+    """
+
+    SEND = 0
+    CONFIRM = 1
+    READ = 2
+
+
+METHOD_PRIORITIES: Dict[str, Priority] = {
+    "sendTransaction": Priority.SEND,
+    "getLatestBlockhash": Priority.CONFIRM,
+    "getBlockHeight": Priority.CONFIRM,
+    "getSignatureStatuses": Priority.CONFIRM,
+}
+
+# every call of these has an effect, so identical ones are never coalesced
+UNCOALESCED = frozenset({"sendTransaction", "requestAirdrop"})
+
+
+class RateLimitedError(Exception):
+    """
+    The endpoint answered 429 Too Many Requests
+    """
+
+    def __init__(self, retry_after: Optional[float] = None):
+        message = "RPC rate limit reached"
+        if retry_after is not None:
+            message += f", retry after {retry_after:g}s"
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(
+    value: Optional[str], now: Callable[[], float] = time.time
+) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, given in seconds or as an
+    HTTP date. None when it is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - now(), 0.0)
+
+
+class TokenBucket:
+    """
+    Request budget: `rate` tokens per second, at most `burst` saved up.
+    rate=None means no budget, only pauses (from Retry-After) hold
+    requests back
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate is not None and rate <= 0:
+            raise ValueError("rate should be positive")
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 1, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.paused_until = 0.0
+        self._updated = clock()
+
+    def wait_time(self) -> float:
+        """
+        Seconds until a request may be made, 0 when it may be made now
+        """
+        now = self.clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.rate is None:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate is not None:
+            self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """
+        Hold every request back for `seconds`
+        """
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class RequestScheduler:
+    """
+    Admits the requests of one endpoint.
+
+    Requests take a token from the endpoint's budget; while they wait for
+    one, sends go before confirmation polls, which go before reads (see
+    METHOD_PRIORITIES). Identical reads made while one of them is in flight
+    share its response. A 429 response pauses the whole endpoint for its
+    Retry-After and the request is retried, up to max_retries times.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_retries: int = 3,
+        max_retry_after: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param rate: requests per second, unlimited by default
+        :param burst: requests that may be made at once, rate by default
+        :param max_retries: retries of a rate limited request
+        :param max_retry_after: longer Retry-After waits fail right away
+        """
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.coalesced = 0
+        self.throttled = 0
+
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+
+    def run(self, method: str, params: Sequence[Any], call: Callable[[], Any]) -> Any:
+        """
+        Make the request with `call` once it is admitted
+        :param method: JSON-RPC method, decides priority and coalescing
+        :param params: request params, identical reads are coalesced
+        :raise RateLimitedError: still rate limited after max_retries
+        """
+        if method in UNCOALESCED:
+            return self._run(method, call)
+
+        key = (method, json.dumps(params, sort_keys=True, default=str))
+        with self._cond:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._run(method, call)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._cond:
+                del self._inflight[key]
+
+    def _run(self, method: str, call: Callable[[], Any]) -> Any:
+        priority = METHOD_PRIORITIES.get(method, Priority.READ)
+        for attempt in range(self.max_retries + 1):
+            self._acquire(priority)
+            try:
+                return call()
+            except RateLimitedError as exc:
+                delay = exc.retry_after
+                if delay is None:
+                    delay = jittered_backoff(attempt)
+                with self._cond:
+                    self.throttled += 1
+                    self.bucket.pause(min(delay, self.max_retry_after))
+                    self._cond.notify_all()
+                if attempt == self.max_retries or delay > self.max_retry_after:
+                    raise
+                logger.warning(f"{method} was rate limited, retrying in {delay:g}s")
+
+    def _acquire(self, priority: Priority):
+        with self._cond:
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    delay = None
+                    if self._waiting[0] == ticket:
+                        delay = self.bucket.wait_time()
+                        if delay <= 0:
+                            heapq.heappop(self._waiting)
+                            self.bucket.take()
+                            self._cond.notify_all()
+                            return
+                    self._cond.wait(delay)
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
@@ -0,0 +1,228 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+from solana.publickey import PublicKey
+
+from src.cache import ReserveCache
+from src.helpers import fetch_multiple_accounts
+from src.reserve import Reserve
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TXRSNAP\0"
+VERSION = 2
+
+# magic, version, record count, unix time the snapshot was written at
+_HEADER = struct.Struct("<8sIId")
+# reserve pubkey, slot the data was read at, raw reserve data
+_RECORD = struct.Struct(f"<32sQ{Reserve.SIZE}s")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class SnapshotRecord(NamedTuple):
+    reserve: PublicKey
+    slot: int
+    data: bytes
+
+
+class Snapshot(NamedTuple):
+    written_at: float
+    records: List[SnapshotRecord]
+
+
+def write(
+    path: str, records: Iterable[SnapshotRecord], written_at: Optional[float] = None
+) -> int:
+    """
+    Atomically replace the snapshot at `path`: records are written to a
+    temporary file next to it, which is fsynced and renamed over it
+    :param written_at: unix time stored in the header, now by default
+    :return: number of records written
+    """
+    records = list(records)
+    written_at = time.time() if written_at is None else written_at
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(records), written_at))
+            for record in records:
+                f.write(
+                    _RECORD.pack(bytes(record.reserve), record.slot, bytes(record.data))
+                )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(records)
+
+
+def read(path: str) -> Snapshot:
+    """
+    :raise SnapshotError: not a snapshot, unknown version or truncated file
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            raise SnapshotError(f"{path} is not a reserve snapshot")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            magic, version, count, written_at = _HEADER.unpack_from(buf)
+            if magic != MAGIC:
+                raise SnapshotError(f"{path} is not a reserve snapshot")
+            if version != VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {version}")
+            if size != _HEADER.size + count * _RECORD.size:
+                raise SnapshotError(f"{path} is truncated")
+
+            records = []
+            for offset in range(_HEADER.size, size, _RECORD.size):
+                key, slot, data = _RECORD.unpack_from(buf, offset)
+                records.append(SnapshotRecord(PublicKey(key), slot, data))
+            return Snapshot(written_at, records)
+
+
+class ReserveSnapshot:
+    """
+    On-disk copy of the raw reserve accounts of a ReserveCache, for a cold
+    start without fetches.
+
+    load() fills the cache from the snapshot file, reconcile() refetches the
+    loaded reserves so the chain state replaces the snapshot, and the thread
+    started by start() writes the cache back every `interval` seconds (and
+    once more on stop())
+    """
+
+    def __init__(self, path: str, cache: ReserveCache, interval: float = 30):
+        self.path = path
+        self.cache = cache
+        self.interval = interval
+        self.loaded: List[PublicKey] = []
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self) -> List[PublicKey]:
+        """
+        Put every reserve of the snapshot into the cache, at its snapshot slot
+        and as fetched when the snapshot was written, so the cache ttl counts
+        from then. A missing or unreadable snapshot loads nothing
+        :return: loaded reserves
+        """
+        try:
+            written_at, records = read(self.path)
+        except FileNotFoundError:
+            written_at, records = 0.0, []
+        except SnapshotError as exc:
+            logger.warning(f"Ignoring reserve snapshot: {exc}")
+            written_at, records = 0.0, []
+
+        age = max(time.time() - written_at, 0.0)
+        for record in records:
+            self.cache.put(record.reserve, Reserve(record.data), record.slot, age=age)
+        self.loaded = [record.reserve for record in records]
+        return self.loaded
+
+    def save(self) -> int:
+        """
+        Write the cached reserves to the snapshot file. An empty cache doesn't
+        overwrite it
+        :return: number of reserves written
+        """
+        records = [
+            SnapshotRecord(reserve, entry.slot, entry.data.raw)
+            for reserve, entry in self.cache.items()
+        ]
+        if not records:
+            return 0
+        with self._lock:
+            return write(self.path, records)
+
+    def reconcile(
+        self, reserves: Optional[Sequence[PublicKey]] = None
+    ) -> List[PublicKey]:
+        """
+        Refetch reserves (the loaded ones by default) with getMultipleAccounts.
+        Newer chain state replaces the cached one, closed accounts are dropped
+        :return: reserves whose data differs from the cached one
+        """
+        reserves = self.loaded if reserves is None else reserves
+        changed = []
+        for reserve, (data, slot) in fetch_multiple_accounts(
+            reserves, self.cache.config
+        ).items():
+            cached = self.cache.get(reserve)
+            if data is None:
+                self.cache.invalidate(reserve)
+                changed.append(reserve)
+                continue
+            fresh = Reserve(data)
+            if cached is None or bytes(cached.data.raw) != bytes(fresh.raw):
+                changed.append(reserve)
+            self.cache.put(reserve, fresh, slot)
+        return changed
+
+    def restore(self) -> "Future[List[PublicKey]]":
+        """
+        load() now and reconcile() in a background thread
+        :return: future of the reconcile() result
+        """
+        self.load()
+        future: "Future[List[PublicKey]]" = Future()
+
+        def run():
+            try:
+                future.set_result(self.reconcile())
+            except Exception as exc:
+                logger.warning(f"Reserve snapshot reconcile failed: {exc!r}")
+                future.set_exception(exc)
+
+        threading.Thread(target=run, name="snapshot-reconcile", daemon=True).start()
+        return future
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="snapshot-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the writer thread and write a last snapshot
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stopped.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.save()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.save()
+            except Exception as exc:
+                logger.warning(f"Reserve snapshot write failed: {exc!r}")
@@ -0,0 +1,59 @@
+import struct
+from typing import Tuple
+
+from solana.transaction import TransactionInstruction
+
+from src.entities import FlashBorrowParams, FlashRepayParams
+from src.layout import CONTRACT_LAYOUT
+
+_AMOUNT = struct.Struct("<Q")
+
+
+def _data_prefix(instruction_name: str) -> bytes:
+    """
+    Instruction data without the trailing u64 amount
+    """
+    instruction = getattr(CONTRACT_LAYOUT.enum, instruction_name)
+    data = CONTRACT_LAYOUT.build(instruction(amount=0))
+    return data[: -_AMOUNT.size]
+
+
+class FlashLoanTemplate:
+    """
+    FlashBorrow/FlashRepay instruction pair compiled once for a fixed
+    reserve/market/destination. Only the u64 amount differs between loans,
+    so instructions() packs it behind the precompiled instruction tag and
+    reuses the account metas (shared between calls, treat them as read-only)
+    """
+
+    __slots__ = ("program_id", "_borrow_keys", "_repay_keys")
+
+    BORROW_PREFIX = _data_prefix("FlashBorrow")
+    REPAY_PREFIX = _data_prefix("FlashRepay")
+
+    def __init__(self, borrow: FlashBorrowParams, repay: FlashRepayParams):
+        self.program_id = borrow.program_id
+        self._borrow_keys = borrow.as_account_keys()
+        self._repay_keys = repay.as_account_keys()
+
+    def instructions(
+        self, amount: int
+    ) -> Tuple[TransactionInstruction, TransactionInstruction]:
+        """
+        FlashBorrow and FlashRepay instructions for the amount
+        :param amount: amount to borrow, without fees
+        :return: (borrow instruction, repay instruction)
+        """
+        packed = _AMOUNT.pack(amount)
+        return (
+            TransactionInstruction(
+                keys=self._borrow_keys,
+                program_id=self.program_id,
+                data=self.BORROW_PREFIX + packed,
+            ),
+            TransactionInstruction(
+                keys=self._repay_keys,
+                program_id=self.program_id,
+                data=self.REPAY_PREFIX + packed,
+            ),
+        )
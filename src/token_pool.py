@@ -0,0 +1,407 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Union
+
+import spl.token.instructions as spl_token
+from solana import system_program
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+from solana.rpc.api import Client
+from solana.rpc.commitment import Finalized
+from solana.rpc.types import TxOpts
+from solana.transaction import AccountMeta, Transaction, TransactionInstruction
+from spl.token import constants as spl_constants
+from spl.token.client import Token
+
+from src import blockhash, confirmation, metrics, rpc
+from src.blockhash import BlockhashProvider
+
+logger = logging.getLogger(__name__)
+
+# SPL Token program SyncNative instruction index
+SYNC_NATIVE = 17
+
+# a new account costs a signature, its key and three instructions, so only a
+# few fit in one 1232-byte transaction
+ACCOUNTS_PER_TRANSACTION = 4
+# top ups and closes only add instructions over existing keys
+UPDATES_PER_TRANSACTION = 16
+
+
+def sync_native(account: PublicKey) -> TransactionInstruction:
+    """
+    Update the token amount of a native (wSOL) account to its lamport balance
+    """
+    return TransactionInstruction(
+        keys=[AccountMeta(account, is_signer=False, is_writable=True)],
+        program_id=spl_constants.TOKEN_PROGRAM_ID,
+        data=bytes([SYNC_NATIVE]),
+    )
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+@dataclass
+class PooledAccount:
+    keypair: Keypair
+    # token amount the pool expects the account to hold
+    balance: int = 0
+
+    @property
+    def public_key(self) -> PublicKey:
+        return self.keypair.public_key
+
+
+class TokenAccountPool:
+    """
+    Pre-created token accounts of one owner, leased to flash loans as
+    repayment accounts.
+
+    Accounts are created, topped up and closed in batched transactions, so a
+    loan in the steady state needs no setup transaction: lease an account,
+    borrow into and repay from it, release it with the fees spent, and call
+    refill() from time to time. Wrapped SOL accounts are topped up with a
+    lamport transfer + sync_native, other mints with a token transfer from
+    `funding_account`.
+    """
+
+    def __init__(
+        self,
+        owner: Keypair,
+        payer: Optional[Keypair] = None,
+        mint: PublicKey = spl_constants.WRAPPED_SOL_MINT,
+        funding_account: Optional[PublicKey] = None,
+        min_balance: int = 0,
+        target_balance: int = 0,
+        grow: bool = True,
+        client: Optional[Client] = None,
+        blockhash_provider: Optional[BlockhashProvider] = None,
+    ):
+        """
+        :param owner: owner of the pooled accounts, signs closes and token top ups
+        :param payer: pays fees, rent and wSOL top ups, the owner by default
+        :param mint: token mint, wrapped SOL by default
+        :param funding_account: owner's token account non-native top ups come from
+        :param min_balance: accounts below it are topped up by refill()
+        :param target_balance: balance new and topped up accounts get
+        :param grow: create an account when none is idle instead of raising
+        """
+        if mint != spl_constants.WRAPPED_SOL_MINT and funding_account is None:
+            raise ValueError("funding_account is required for non-native mints")
+
+        self.owner = owner
+        self.payer = payer or owner
+        self.mint = mint
+        self.funding_account = funding_account
+        self.min_balance = min_balance
+        self.target_balance = target_balance
+        self.grow = grow
+        self._client = client
+        self._blockhash_provider = blockhash_provider
+
+        self.accounts: Dict[PublicKey, PooledAccount] = {}
+        self._idle: Deque[PooledAccount] = deque()
+        self._lock = threading.Lock()
+        self._rent: Optional[int] = None
+
+    @property
+    def client(self) -> Client:
+        return self._client or rpc.get_client()
+
+    @property
+    def is_native(self) -> bool:
+        return self.mint == spl_constants.WRAPPED_SOL_MINT
+
+    @property
+    def idle(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def provision(self, count: int) -> List[PooledAccount]:
+        """
+        Create and fund `count` new idle accounts. When a transaction fails
+        the accounts of the others are still added before its error is raised
+        """
+        return self._create(count, idle=True)
+
+    def lease(self) -> PooledAccount:
+        """
+        Take an idle account, give it back with release()
+        :raise PoolExhaustedError: no idle account and the pool can't grow
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.popleft()
+        if not self.grow:
+            raise PoolExhaustedError("No idle token account")
+
+        (account,) = self._create(1)
+        return account
+
+    def release(self, account: PooledAccount, spent: int = 0):
+        """
+        :param account: leased account
+        :param spent: tokens the loan used up, e.g. the flash loan fees
+        """
+        with self._lock:
+            account.balance -= spent
+            self._idle.append(account)
+
+    @contextmanager
+    def leased(self) -> Iterator[PooledAccount]:
+        """
+        Lease an account for the duration of the block. Set
+        `account.balance` inside it to record what the loan spent
+        """
+        account = self.lease()
+        try:
+            yield account
+        finally:
+            self.release(account)
+
+    def refill(self) -> List[PooledAccount]:
+        """
+        Top idle accounts below min_balance up to target_balance
+        :return: the topped up accounts
+        """
+        with self._lock:
+            accounts = [a for a in self._idle if a.balance < self.min_balance]
+        self.top_up(accounts)
+        return accounts
+
+    def top_up(self, accounts: Sequence[PooledAccount]):
+        """
+        Bring the accounts back to target_balance in batched transactions.
+        Idle accounts can't be leased while they are topped up. When a
+        transaction fails the balances of the others are still updated before
+        its error is raised
+        """
+        accounts = [a for a in accounts if a.balance < self.target_balance]
+        with self._lock:
+            idle = {account.public_key for account in self._idle}
+            topping_up = [a for a in accounts if a.public_key in idle]
+            for account in topping_up:
+                self._idle.remove(account)
+
+        try:
+            transactions = []
+            for chunk in _chunks(accounts, UPDATES_PER_TRANSACTION):
+                tnx = Transaction(fee_payer=self.payer.public_key)
+                for account in chunk:
+                    tnx.add(*self._top_up_instructions(account))
+                transactions.append((tnx, [] if self.is_native else [self.owner]))
+            errors = self._send_each(transactions)
+
+            with self._lock:
+                for chunk, error in zip(
+                    _chunks(accounts, UPDATES_PER_TRANSACTION), errors
+                ):
+                    if error is None:
+                        for account in chunk:
+                            account.balance = self.target_balance
+        finally:
+            with self._lock:
+                self._idle.extend(topping_up)
+        _raise_first(errors)
+
+    def reclaim(self, accounts: Optional[Sequence[PooledAccount]] = None):
+        """
+        Close idle accounts (all of them by default), their rent and wrapped
+        SOL go back to the payer. Non-native accounts must be empty
+        """
+        with self._lock:
+            # taken out of the idle queue first, so they can't be leased
+            # while they are being closed
+            idle = {account.public_key for account in self._idle}
+            accounts = [
+                account
+                for account in (list(self._idle) if accounts is None else accounts)
+                if account.public_key in idle
+            ]
+            for account in accounts:
+                self._idle.remove(account)
+
+        transactions = []
+        for chunk in _chunks(accounts, UPDATES_PER_TRANSACTION):
+            tnx = Transaction(fee_payer=self.payer.public_key)
+            for account in chunk:
+                tnx.add(
+                    spl_token.close_account(
+                        spl_token.CloseAccountParams(
+                            program_id=spl_constants.TOKEN_PROGRAM_ID,
+                            account=account.public_key,
+                            dest=self.payer.public_key,
+                            owner=self.owner.public_key,
+                        )
+                    )
+                )
+            transactions.append((tnx, [self.owner]))
+        try:
+            errors = self._send_each(transactions)
+        except Exception:
+            with self._lock:
+                self._idle.extend(accounts)
+            raise
+
+        # only the accounts of failed transactions are still open
+        chunks = _chunks(accounts, UPDATES_PER_TRANSACTION)
+        with self._lock:
+            for chunk, error in zip(chunks, errors):
+                for account in chunk:
+                    if error is None:
+                        del self.accounts[account.public_key]
+                    else:
+                        self._idle.append(account)
+        _raise_first(errors)
+
+    def _create(self, count: int, idle: bool = False) -> List[PooledAccount]:
+        """
+        :param idle: add the created accounts to the idle queue
+        :raise: the first failure, after the accounts of the transactions
+            that landed are added to the pool
+        """
+        accounts = [PooledAccount(Keypair(), self.target_balance) for _ in range(count)]
+        transactions = []
+        for chunk in _chunks(accounts, ACCOUNTS_PER_TRANSACTION):
+            tnx = Transaction(fee_payer=self.payer.public_key)
+            for account in chunk:
+                tnx.add(*self._create_instructions(account))
+            signers = [account.keypair for account in chunk]
+            if not self.is_native and self.target_balance:
+                signers.append(self.owner)
+            transactions.append((tnx, signers))
+        errors = self._send_each(transactions)
+
+        created = []
+        for chunk, error in zip(_chunks(accounts, ACCOUNTS_PER_TRANSACTION), errors):
+            if error is None:
+                created.extend(chunk)
+        with self._lock:
+            for account in created:
+                self.accounts[account.public_key] = account
+            if idle:
+                self._idle.extend(created)
+        _raise_first(errors)
+        return created
+
+    def _rent_exempt_balance(self) -> int:
+        if self._rent is None:
+            self._rent = Token.get_min_balance_rent_for_exempt_for_account(self.client)
+        return self._rent
+
+    def _create_instructions(self, account: PooledAccount):
+        lamports = self._rent_exempt_balance()
+        if self.is_native:
+            lamports += self.target_balance
+        yield system_program.create_account(
+            system_program.CreateAccountParams(
+                from_pubkey=self.payer.public_key,
+                new_account_pubkey=account.public_key,
+                lamports=lamports,
+                space=spl_constants.ACCOUNT_LEN,
+                program_id=spl_constants.TOKEN_PROGRAM_ID,
+            )
+        )
+        yield spl_token.initialize_account(
+            spl_token.InitializeAccountParams(
+                program_id=spl_constants.TOKEN_PROGRAM_ID,
+                account=account.public_key,
+                mint=self.mint,
+                owner=self.owner.public_key,
+            )
+        )
+        if not self.is_native and self.target_balance:
+            yield self._token_transfer(account, self.target_balance)
+
+    def _top_up_instructions(self, account: PooledAccount):
+        amount = self.target_balance - account.balance
+        if not self.is_native:
+            yield self._token_transfer(account, amount)
+            return
+        yield system_program.transfer(
+            system_program.TransferParams(
+                from_pubkey=self.payer.public_key,
+                to_pubkey=account.public_key,
+                lamports=amount,
+            )
+        )
+        yield sync_native(account.public_key)
+
+    def _token_transfer(self, account: PooledAccount, amount: int):
+        return spl_token.transfer(
+            spl_token.TransferParams(
+                program_id=spl_constants.TOKEN_PROGRAM_ID,
+                source=self.funding_account,
+                dest=account.public_key,
+                owner=self.owner.public_key,
+                amount=amount,
+            )
+        )
+
+    def _send_each(self, transactions) -> List[Optional[Exception]]:
+        """
+        Send the transactions back to back, then wait for all of them
+        :return: per transaction error, None for the finalized ones
+        """
+        if not transactions:
+            return []
+
+        provider = self._blockhash_provider or blockhash.get_provider(self._client)
+        recent_blockhash = provider.get()
+        tracker = confirmation.get_tracker(self._client)
+        futures: List[Union[Future, Exception]] = []
+        for tnx, signers in transactions:
+            tnx.recent_blockhash = recent_blockhash.blockhash
+            signers = {self.payer.public_key: self.payer, **_by_key(signers)}
+            try:
+                with metrics.stage("signing"):
+                    tnx.sign(*signers.values())
+                with metrics.stage("send"):
+                    resp = self.client.send_raw_transaction(
+                        tnx.serialize(),
+                        opts=TxOpts(
+                            skip_confirmation=True, preflight_commitment=Finalized
+                        ),
+                    )
+            except Exception as exc:
+                futures.append(exc)
+                continue
+            futures.append(
+                tracker.track(
+                    resp["result"], Finalized, recent_blockhash.last_valid_block_height
+                )
+            )
+
+        errors: List[Optional[Exception]] = []
+        for future in futures:
+            if isinstance(future, Exception):
+                errors.append(future)
+                continue
+            try:
+                with metrics.stage("confirmation"):
+                    future.result()
+            except Exception as exc:
+                errors.append(exc)
+            else:
+                errors.append(None)
+        return errors
+
+
+def _raise_first(errors: Sequence[Optional[Exception]]):
+    for error in errors:
+        if error is not None:
+            raise error
+
+
+def _by_key(signers: Sequence[Keypair]) -> Dict[PublicKey, Keypair]:
+    return {signer.public_key: signer for signer in signers}
+
+
+def _chunks(items: Sequence, size: int) -> List[Sequence]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
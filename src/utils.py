@@ -1,46 +1,47 @@
 import functools
 import time
 
-from solana.rpc.api import Client
+from solana.rpc.commitment import Finalized
 
-from config import cfg
+from src import confirmation, metrics
+from src.backoff import jittered_backoff
+from src.scheduler import RateLimitedError
+
+SEND_ATTEMPTS = 3
+CONFIRMATION_TIMEOUT = 90
 
 
 def wait_transaction_finalized(fn):
+    """
+    Retry the request with jittered exponential backoff, then wait until the
+    returned signature is finalized (at most CONFIRMATION_TIMEOUT seconds)
+    """
+
     @functools.wraps(fn)
     def wrap(self, *args, **kwargs):
         resp = None
-        sleep = 5
-        for i in range(3):
+        for attempt in range(SEND_ATTEMPTS):
             try:
                 resp = fn(self, *args, **kwargs)
-            except Exception:
-                time.sleep(sleep)
-                sleep += 5
+            except RateLimitedError:
+                # the endpoint is paused for its Retry-After already, the
+                # next attempt waits for it
+                resp = None
                 continue
-            if resp.get("error"):
-                time.sleep(sleep)
-                sleep += 5
-                continue
-
-            break
+            except Exception:
+                resp = None
+            if resp is not None and not resp.get("error"):
+                break
+            if attempt + 1 < SEND_ATTEMPTS:
+                time.sleep(jittered_backoff(attempt))
 
-        if resp.get("error"):
+        if resp is None or resp.get("error"):
             raise Exception("Request limit is reached")
 
-        signature = resp["result"]
-
-        client = Client(cfg.validator)
-
-        while True:
-            status_data = client.get_signature_statuses([signature])["result"]["value"][
-                0
-            ]
-
-            if status_data and status_data["confirmationStatus"] == "finalized":
-                break
-
-            time.sleep(1)
+        with metrics.stage("confirmation"):
+            confirmation.get_tracker(self.client).wait(
+                resp["result"], Finalized, timeout=CONFIRMATION_TIMEOUT
+            )
 
         return resp
 
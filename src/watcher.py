@@ -0,0 +1,197 @@
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Set
+
+from solana.publickey import PublicKey
+from solana.rpc.commitment import Commitment, Confirmed
+from solana.rpc.responses import AccountNotification
+from solana.rpc.websocket_api import connect
+from solana.utils.helpers import decode_byte_string
+from websockets.exceptions import WebSocketException
+
+from config import FlashLoanConfig, get_config
+from src.cache import ReserveCache
+from src.reserve import Reserve
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReserveUpdate:
+    reserve: PublicKey
+    data: Reserve
+    slot: int
+
+
+def ws_endpoint(http_endpoint: str) -> str:
+    """
+    Websocket url of a validator given its http url
+    """
+    if http_endpoint.startswith("https://"):
+        return "wss://" + http_endpoint[len("https://") :]
+    if http_endpoint.startswith("http://"):
+        return "ws://" + http_endpoint[len("http://") :]
+    return http_endpoint
+
+
+class ReserveWatcher:
+    """
+    Keeps reserves up to date from accountSubscribe notifications.
+
+    Every update is stored in `store` (a ReserveCache, so stale slots never
+    overwrite newer state), passed to the registered callbacks and pushed to
+    every updates() iterator. The connection is re-established and all
+    reserves are resubscribed when it drops.
+    """
+
+    def __init__(
+        self,
+        reserves: Iterable[PublicKey],
+        endpoint: Optional[str] = None,
+        store: Optional[ReserveCache] = None,
+        commitment: Commitment = Confirmed,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30,
+        config: Optional[FlashLoanConfig] = None,
+    ):
+        """
+        :param endpoint: websocket url, cfg.ws_validator (or the websocket
+            url of cfg.validator) by default
+        :param config: explicit config, the process-wide get_config() by default
+        """
+        self.reserves: List[PublicKey] = list(dict.fromkeys(reserves))
+        if endpoint is None:
+            config = config or get_config()
+            endpoint = config.ws_validator or ws_endpoint(config.validator)
+        self.endpoint = endpoint
+        self.store = store or ReserveCache(max_size=max(len(self.reserves), 1))
+        self.commitment = commitment
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connections = 0
+
+        self._callbacks: List[Callable[[ReserveUpdate], object]] = []
+        self._queues: Set[asyncio.Queue] = set()
+        self._subscribed: Optional[asyncio.Event] = None
+        self._stopped = False
+        self._ws = None
+
+    def add_callback(self, callback: Callable[[ReserveUpdate], object]):
+        """
+        Register a plain function or a coroutine function called on every update
+        """
+        self._callbacks.append(callback)
+
+    def updates(self) -> AsyncIterator[ReserveUpdate]:
+        """
+        Iterate over updates received from the moment of this call, ends when
+        the watcher stops
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.add(queue)
+        return self.__drain(queue)
+
+    async def __drain(self, queue: asyncio.Queue) -> AsyncIterator[ReserveUpdate]:
+        try:
+            while True:
+                update = await queue.get()
+                if update is None:
+                    return
+                yield update
+        finally:
+            self._queues.discard(queue)
+
+    @property
+    def subscribed(self) -> asyncio.Event:
+        """
+        Set while all reserves are subscribed on a live connection
+        """
+        # created lazily to bind to the running loop
+        if self._subscribed is None:
+            self._subscribed = asyncio.Event()
+        return self._subscribed
+
+    async def run(self):
+        """
+        Watch until stop() is called, reconnecting with exponential backoff.
+        updates() iterators end when it returns or raises
+        """
+        try:
+            await self._run()
+        finally:
+            for queue in self._queues:
+                queue.put_nowait(None)
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped:
+            try:
+                async with connect(self.endpoint) as ws:
+                    self._ws = ws
+                    self.connections += 1
+                    for reserve in self.reserves:
+                        await ws.account_subscribe(reserve, self.commitment, "base64")
+                    delay = self.reconnect_delay
+                    await self._listen(ws)
+            except (WebSocketException, OSError, asyncio.TimeoutError) as exc:
+                # handshake failures (e.g. the node answering 429 or 503),
+                # open timeouts and dropped connections are all retried
+                if self._stopped:
+                    break
+                logger.warning(f"Reserve watcher connection lost: {exc!r}")
+            finally:
+                self._ws = None
+                self.subscribed.clear()
+
+            if not self._stopped:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def _listen(self, ws):
+        async for message in ws:
+            messages = message if isinstance(message, list) else [message]
+            for msg in messages:
+                if isinstance(msg, AccountNotification):
+                    await self._on_notification(ws, msg)
+                elif len(ws.subscriptions) == len(self.reserves):
+                    self.subscribed.set()
+
+    async def _on_notification(self, ws, msg: AccountNotification):
+        request = ws.subscriptions.get(msg.subscription)
+        if request is None:
+            return
+
+        reserve = PublicKey(request["params"][0])
+        slot = msg.result.context.slot
+        try:
+            data = Reserve(decode_byte_string(msg.result.value.data[0]))
+        except Exception as exc:
+            # closed account or data that isn't a reserve (any more)
+            logger.warning(f"Undecodable reserve {reserve} at slot {slot}: {exc!r}")
+            cached = self.store.get(reserve)
+            if cached is not None and cached.slot <= slot:
+                self.store.invalidate(reserve)
+            return
+        entry = self.store.put(reserve, data, slot)
+        if entry.data is not data:
+            # older than what we already have
+            return
+
+        update = ReserveUpdate(reserve=reserve, data=data, slot=slot)
+        for queue in self._queues:
+            queue.put_nowait(update)
+        for callback in self._callbacks:
+            # a failing subscriber must not end the feed for the others
+            try:
+                result = callback(update)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as exc:
+                logger.warning(f"Reserve watcher callback failed: {exc!r}")
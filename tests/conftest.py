@@ -0,0 +1,49 @@
+import pytest
+from betterconf.exceptions import VariableNotFoundError
+
+from config import FlashLoanConfig, set_config
+from src import blockhash, rpc
+from tests.factories import flash_loan_config
+from tests.fake_rpc import FakeRpcServer, Validator
+
+
+def pytest_configure(config):
+    # the suite runs offline, VALIDATOR / FLASH_LOAN_PROGRAM are not needed
+    set_config(flash_loan_config())
+
+
+@pytest.fixture
+def live_config() -> FlashLoanConfig:
+    """
+    Config read from the environment (and .env), for tests against a real
+    cluster, skipped when the cluster isn't configured
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    try:
+        return FlashLoanConfig()
+    except VariableNotFoundError as exc:
+        pytest.skip(str(exc))
+
+
+@pytest.fixture
+def rpc_server():
+    """
+    Fake validator the shared RPC client points to for the duration of a test
+    """
+    with FakeRpcServer() as server:
+        rpc.configure(endpoint=server.url)
+        yield server
+        blockhash.close()
+        rpc.configure()
+
+
+@pytest.fixture
+def validator(rpc_server) -> Validator:
+    """
+    rpc_server answering the transaction endpoints, see Validator
+    """
+    validator = Validator()
+    rpc_server.handlers.update(validator.handlers())
+    return validator
@@ -0,0 +1,152 @@
+import base64
+from typing import NamedTuple, Optional, Sequence
+
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+from solana.transaction import TransactionInstruction
+
+from config import FlashLoanConfig
+from src.entities import FlashBorrowParams, FlashRepayParams
+from src.layout import RESERVE_LAYOUT
+from src.template import FlashLoanTemplate
+
+# program the offline suites build instructions for
+PROGRAM_ID = PublicKey("F1aShdFVv12jar3oM2fi6SDqbefSnnCVRzaxbPH3you7")
+
+
+def flash_loan_config(**overrides) -> FlashLoanConfig:
+    """
+    Explicit config, so nothing is read from the environment. The validator
+    is unreachable, tests point the shared client to a FakeRpcServer
+    """
+    values = dict(
+        validator="http://127.0.0.1:1",
+        reserve=Keypair().public_key,
+        program_id=PROGRAM_ID,
+    )
+    values.update(overrides)
+    return FlashLoanConfig(**values)
+
+
+def reserve_bytes(
+    available_amount: int = 10**12,
+    flash_loan_fee_wad: int = 3 * 10**15,
+    texture_fee_percentage: int = 20,
+    lending_market: bytes = None,
+    mint: bytes = None,
+) -> bytes:
+    def key(value=None):
+        return list(value or bytes(Keypair().public_key))
+
+    return RESERVE_LAYOUT.build(
+        dict(
+            version=1,
+            padding=[0] * 7,
+            last_update=1,
+            lending_market=key(lending_market),
+            liquidity=dict(
+                mint_pubkey=key(mint),
+                mint_decimals=9,
+                supply_pubkey=key(),
+                available_amount=available_amount,
+            ),
+            lp_tokens_info=dict(
+                mint_pubkey=key(),
+                mint_total_supply=10**12,
+                supply_pubkey=key(),
+            ),
+            config=dict(
+                fees=dict(
+                    flash_loan_fee_wad=flash_loan_fee_wad,
+                    texture_fee_percentage=texture_fee_percentage,
+                    padding=[0] * 7,
+                ),
+                deposit_limit=10**15,
+                fee_receiver=key(),
+                future_padding1=[0] * 32,
+                future_padding2=[0] * 32,
+            ),
+            future_padding=[0] * 5,
+        )
+    )
+
+
+def account_info(data: bytes, slot: int = 1) -> dict:
+    return {
+        "context": {"slot": slot},
+        "value": {
+            "data": [base64.b64encode(data).decode(), "base64"],
+            "executable": False,
+            "lamports": 1,
+            "owner": str(Keypair().public_key),
+            "rentEpoch": 0,
+        },
+    }
+
+
+class FlashLoanAccounts(NamedTuple):
+    supply: PublicKey
+    native_account: PublicKey
+    reserve: PublicKey
+    market: PublicKey
+    fee_receiver: PublicKey
+
+
+def flash_loan_accounts() -> FlashLoanAccounts:
+    return FlashLoanAccounts(*(Keypair().public_key for _ in range(5)))
+
+
+def flash_loan_bundle(
+    executor,
+    authority: PublicKey,
+    amount: int = 100,
+    accounts: Optional[FlashLoanAccounts] = None,
+    between: Sequence[TransactionInstruction] = (),
+):
+    """
+    Append a FlashBorrow / FlashRepay pair to the executor, with `between`
+    (e.g. swaps) in the middle
+    :return: the executor
+    """
+    accounts = accounts or flash_loan_accounts()
+    executor.flash_borrow(
+        source_liquidity=accounts.supply,
+        destination_liquidity=accounts.native_account,
+        reserve=accounts.reserve,
+        lending_market=accounts.market,
+        amount=amount,
+    ).add_instructions(*between)
+    return executor.flash_repay(
+        source_liquidity=accounts.native_account,
+        destination_liquidity=accounts.supply,
+        reserve=accounts.reserve,
+        reserve_liquidity_fee_receiver=accounts.fee_receiver,
+        lending_market=accounts.market,
+        user_transfer_authority=authority,
+        amount=amount,
+    )
+
+
+def flash_loan_template(
+    authority: PublicKey,
+    accounts: Optional[FlashLoanAccounts] = None,
+    program_id: PublicKey = PROGRAM_ID,
+) -> FlashLoanTemplate:
+    accounts = accounts or flash_loan_accounts()
+    return FlashLoanTemplate(
+        FlashBorrowParams(
+            source_liquidity=accounts.supply,
+            destination_liquidity=accounts.native_account,
+            reserve=accounts.reserve,
+            lending_market=accounts.market,
+            program_id=program_id,
+        ),
+        FlashRepayParams(
+            source_liquidity=accounts.native_account,
+            destination_liquidity=accounts.supply,
+            reserve=accounts.reserve,
+            reserve_liquidity_fee_receiver=accounts.fee_receiver,
+            lending_market=accounts.market,
+            user_transfer_authority=authority,
+        ),
+    )
@@ -0,0 +1,176 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from solana.keypair import Keypair
+
+
+class Reply(Exception):
+    """
+    Raise from a method handler to answer with a custom http status/headers
+    or with a JSON-RPC error instead of a result
+    """
+
+    def __init__(
+        self,
+        status: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        error: Optional[dict] = None,
+    ):
+        super().__init__(status)
+        self.status = status
+        self.headers = headers or {}
+        self.error = error
+
+
+class FakeRpcServer:
+    """
+    Local JSON-RPC stand-in for a validator. Handlers are registered per
+    method and get the request params, their return value becomes the result
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Callable[..., Any]]] = None):
+        self.handlers: Dict[str, Callable[..., Any]] = dict(handlers or {})
+        self.calls: List[Tuple[str, list]] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def calls_to(self, method: str) -> List[list]:
+        return [params for name, params in self.calls if name == method]
+
+    def start(self) -> "FakeRpcServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeRpcServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _dispatch(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params", [])
+        with self._lock:
+            self.calls.append((method, params))
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            response["result"] = self.handlers[method](*params)
+        except KeyError:
+            response["error"] = {"code": -32601, "message": "Method not found"}
+        return response
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, don't let them wait
+            # for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, headers = 200, {}
+                try:
+                    if isinstance(body, list):
+                        payload = [server._dispatch(request) for request in body]
+                    else:
+                        payload = server._dispatch(body)
+                except Reply as reply:
+                    status, headers = reply.status, reply.headers
+                    payload = {"jsonrpc": "2.0", "id": None}
+                    if reply.error is not None:
+                        payload["error"] = reply.error
+                self._respond(status, headers, json.dumps(payload).encode())
+
+            def do_GET(self):
+                self._respond(200, {}, b"ok")
+
+            def _respond(self, status: int, headers: Dict[str, str], data: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class Validator:
+    """
+    Handlers of the endpoints a transaction goes through: getLatestBlockhash,
+    sendTransaction, getBlockHeight and getSignatureStatuses. Sent
+    transactions (base64) and the signatures returned for them are recorded,
+    statuses are finalized while `confirmed` is set and unknown otherwise
+    """
+
+    def __init__(
+        self,
+        block_height: int = 10,
+        last_valid_block_height: int = 100,
+        confirmed: bool = True,
+    ):
+        self.block_height = block_height
+        self.last_valid_block_height = last_valid_block_height
+        self.confirmed = threading.Event()
+        if confirmed:
+            self.confirmed.set()
+        self.sent: List[str] = []
+        self.signatures: List[str] = []
+        self._lock = threading.Lock()
+
+    def handlers(self) -> Dict[str, Callable[..., Any]]:
+        return dict(
+            getLatestBlockhash=self.latest_blockhash,
+            sendTransaction=self.send_transaction,
+            getBlockHeight=lambda *_: self.block_height,
+            getSignatureStatuses=self.signature_statuses,
+        )
+
+    def latest_blockhash(self, *_) -> dict:
+        return {
+            "context": {"slot": 1},
+            "value": {
+                "blockhash": str(Keypair().public_key),
+                "lastValidBlockHeight": self.last_valid_block_height,
+            },
+        }
+
+    def send_transaction(self, raw: str, *_) -> str:
+        signature = str(Keypair().public_key)
+        with self._lock:
+            self.sent.append(raw)
+            self.signatures.append(signature)
+        return signature
+
+    def signature_statuses(self, signatures: List[str], *_) -> dict:
+        status = {"confirmationStatus": "finalized", "err": None}
+        return {
+            "context": {"slot": 1},
+            "value": [status if self.confirmed.is_set() else None for _ in signatures],
+        }
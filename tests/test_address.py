@@ -0,0 +1,51 @@
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+
+from src.address import (
+    ProgramAddressCache,
+    find_lending_market_authority,
+    pda_cache,
+    preload_lending_market_authorities,
+)
+from src.entities import FlashBorrowParams
+
+
+def test_memoized_derivation_matches_search():
+    cache = ProgramAddressCache()
+    seeds, program_id = [bytes(Keypair().public_key)], Keypair().public_key
+
+    first = cache.find_program_address(seeds, program_id)
+    second = cache.find_program_address(seeds, program_id)
+
+    assert first == second == PublicKey.find_program_address(seeds, program_id)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_is_bounded():
+    cache = ProgramAddressCache(max_size=2)
+    program_id = Keypair().public_key
+    for _ in range(3):
+        cache.find_program_address([bytes(Keypair().public_key)], program_id)
+
+    assert len(cache) == 2
+
+
+def test_preloaded_authority_is_a_hit():
+    market, program_id = Keypair().public_key, Keypair().public_key
+    preload_lending_market_authorities([str(market)], program_id)
+    hits, misses = pda_cache.hits, pda_cache.misses
+
+    params = FlashBorrowParams(
+        source_liquidity=Keypair().public_key,
+        destination_liquidity=Keypair().public_key,
+        reserve=Keypair().public_key,
+        lending_market=market,
+        program_id=program_id,
+    )
+    params.as_account_keys()
+    params.as_account_keys()
+
+    assert (pda_cache.hits - hits, pda_cache.misses - misses) == (2, 0)
+    assert find_lending_market_authority(market, program_id) == (
+        PublicKey.find_program_address([bytes(market)], program_id)[0]
+    )
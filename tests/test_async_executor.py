@@ -0,0 +1,58 @@
+import asyncio
+
+from solana.keypair import Keypair
+from solana.transaction import Transaction
+
+from src.async_executor import AsyncFlashLoanExecutor
+from tests.factories import flash_loan_bundle
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sent = []
+        self.blockhash = str(Keypair().public_key)
+
+    async def get_latest_blockhash(self, commitment=None):
+        return {
+            "result": {
+                "value": {"blockhash": self.blockhash, "lastValidBlockHeight": 100}
+            }
+        }
+
+    def parse_recent_blockhash(self, resp):
+        return resp["result"]["value"]["blockhash"]
+
+    async def send_raw_transaction(self, raw_transaction, opts=None):
+        self.sent.append(Transaction.deserialize(raw_transaction))
+        return {"result": str(len(self.sent))}
+
+    async def confirm_transaction(self, signature, commitment, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # give the other bundles a chance to be sent while this one confirms
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+
+def test_execute_keeps_bundles_in_flight():
+    client = FakeAsyncClient()
+    executor = AsyncFlashLoanExecutor(client=client)
+    authority = Keypair()
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                flash_loan_bundle(executor, authority.public_key).execute(
+                    fee_payer=authority.public_key, signers=[authority]
+                )
+                for _ in range(10)
+            )
+        )
+
+    responses = asyncio.run(run())
+
+    assert len(responses) == 10
+    assert client.max_in_flight == 10
+    assert all(len(tx.instructions) == 2 for tx in client.sent)
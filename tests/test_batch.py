@@ -0,0 +1,159 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+from solana.keypair import Keypair
+from solana.transaction import AccountMeta, TransactionInstruction
+
+from src import batch
+from src.executor import FlashLoanExecutor
+from src.message import TransactionTooLargeError
+from tests.factories import flash_loan_template
+
+
+def _oversized():
+    return [
+        TransactionInstruction(
+            keys=[AccountMeta(Keypair().public_key, False, True) for _ in range(10)],
+            program_id=Keypair().public_key,
+            data=bytes(100),
+        )
+        for _ in range(5)
+    ]
+
+
+def test_execute_many(validator):
+    authority = Keypair()
+    bundles = [
+        flash_loan_template(authority.public_key).instructions(100 + i)
+        for i in range(20)
+    ]
+    bundles.insert(5, _oversized())
+
+    results = FlashLoanExecutor().execute_many(
+        bundles, fee_payer=authority.public_key, signers=[authority, authority]
+    )
+
+    assert [result.index for result in results] == list(range(21))
+    assert isinstance(results[5].error, TransactionTooLargeError)
+    ok = [result for result in results if result.ok]
+    assert len(ok) == 20 == len(validator.sent)
+    assert len({result.signature for result in ok}) == 20
+    assert all(result.result["result"] for result in ok)
+
+
+def test_send_errors_are_reported_per_transaction(validator):
+    authority = Keypair()
+    executor = FlashLoanExecutor()
+
+    def submit(client, transaction, raw, last_valid_block_height):
+        if transaction.instructions[0].data[-8:] == (7).to_bytes(8, "little"):
+            raise RuntimeError("rejected")
+        future = Future()
+        if transaction.instructions[0].data[-8:] == (3).to_bytes(8, "little"):
+            future.set_exception(RuntimeError("expired"))
+        else:
+            future.set_result("sent")
+        return future
+
+    executor.policy.submit = submit
+    bundles = [
+        flash_loan_template(authority.public_key).instructions(i + 1) for i in range(10)
+    ]
+
+    results = executor.execute_many(
+        bundles, fee_payer=authority.public_key, signers=[authority]
+    )
+
+    assert [result.ok for result in results] == [i not in (2, 6) for i in range(10)]
+    assert str(results[2].error) == "expired"
+    assert str(results[6].error) == "rejected"
+    assert results[0].result == "sent"
+
+
+def test_senders_do_not_wait_for_confirmations(validator):
+    validator.confirmed.clear()
+    authority = Keypair()
+    bundles = [
+        flash_loan_template(authority.public_key).instructions(i + 1) for i in range(10)
+    ]
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        running = pool.submit(
+            FlashLoanExecutor().execute_many,
+            bundles,
+            fee_payer=authority.public_key,
+            signers=[authority],
+            send_workers=1,
+        )
+        deadline = time.monotonic() + 5
+        while len(validator.sent) < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # one sender got everything out while nothing was confirmed yet
+        all_sent_unconfirmed = len(validator.sent) == 10 and not running.done()
+        validator.confirmed.set()
+        results = running.result(10)
+
+    assert all_sent_unconfirmed
+    assert all(result.ok for result in results)
+
+
+def test_pending_instructions_are_not_discarded(rpc_server):
+    authority = Keypair()
+    executor = FlashLoanExecutor().flash_loan(
+        flash_loan_template(authority.public_key), 100
+    )
+
+    with pytest.raises(ValueError):
+        executor.execute_many(
+            [flash_loan_template(authority.public_key).instructions(1)],
+            fee_payer=authority.public_key,
+            signers=[authority],
+        )
+
+    assert len(executor.instructions) == 2
+    assert rpc_server.calls == []
+
+
+def test_queue_bounds_signed_transactions(monkeypatch):
+    authority = Keypair()
+    executor = FlashLoanExecutor()
+    signed, gate = [], threading.Event()
+    sign = batch.sign_and_serialize
+
+    def counting_sign(transaction, signers):
+        signed.append(transaction)
+        return sign(transaction, signers)
+
+    def submit(transaction, raw):
+        gate.wait(5)
+        future = Future()
+        future.set_result(None)
+        return future
+
+    monkeypatch.setattr(batch, "sign_and_serialize", counting_sign)
+    transactions = []
+    for i in range(50):
+        executor.flash_loan(flash_loan_template(authority.public_key), i + 1)
+        transaction = executor._build_transaction(authority.public_key, [authority])
+        transaction.recent_blockhash = str(Keypair().public_key)
+        transactions.append(transaction)
+    results = [batch.BatchResult(i) for i in range(50)]
+
+    runner = threading.Thread(
+        target=batch.run,
+        args=(transactions, [authority], submit, results),
+        kwargs=dict(
+            sign_pool=ThreadPoolExecutor(max_workers=1), send_workers=1, queue_size=2
+        ),
+    )
+    runner.start()
+    time.sleep(0.3)
+    # one in the sender, two queued and up to two being signed or put
+    in_flight = len(signed)
+    gate.set()
+    runner.join(10)
+
+    assert in_flight <= 5
+    assert all(result.ok for result in results)
@@ -0,0 +1,69 @@
+import itertools
+import time
+
+from solana.keypair import Keypair
+
+from src.blockhash import BlockhashProvider
+from src.executor import FlashLoanExecutor
+
+
+def _latest_blockhash(counter):
+    def handler(*_):
+        return {
+            "context": {"slot": 1},
+            "value": {
+                "blockhash": str(Keypair().public_key),
+                "lastValidBlockHeight": next(counter),
+            },
+        }
+
+    return handler
+
+
+def test_get_is_served_from_cache(rpc_server):
+    rpc_server.handlers.update(getLatestBlockhash=_latest_blockhash(itertools.count()))
+
+    with BlockhashProvider(refresh_interval=60) as provider:
+        first = provider.get()
+        assert provider.get() == first
+
+    assert len(rpc_server.calls_to("getLatestBlockhash")) == 1
+
+
+def test_refreshes_in_background(rpc_server):
+    rpc_server.handlers.update(getLatestBlockhash=_latest_blockhash(itertools.count()))
+
+    with BlockhashProvider(refresh_interval=0.01) as provider:
+        first = provider.get()
+        deadline = time.monotonic() + 5
+        while provider.get() == first and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert provider.get().last_valid_block_height > first.last_valid_block_height
+
+
+def test_stale_blockhash_is_fetched_inline(rpc_server):
+    rpc_server.handlers.update(getLatestBlockhash=_latest_blockhash(itertools.count()))
+    now = [0.0]
+
+    with BlockhashProvider(refresh_interval=60, max_age=30, clock=lambda: now[0]) as p:
+        first = p.get()
+        now[0] = 31
+        assert p.get() != first
+
+
+def test_execute_uses_provider(rpc_server, validator):
+    authority = Keypair()
+
+    with BlockhashProvider(refresh_interval=60) as provider:
+        for _ in range(3):
+            FlashLoanExecutor(blockhash_provider=provider).flash_borrow(
+                source_liquidity=Keypair().public_key,
+                destination_liquidity=Keypair().public_key,
+                reserve=Keypair().public_key,
+                lending_market=Keypair().public_key,
+                amount=100,
+            ).execute(fee_payer=authority.public_key, signers=[authority])
+
+    assert len(rpc_server.calls_to("getLatestBlockhash")) == 1
+    assert len(rpc_server.calls_to("sendTransaction")) == 3
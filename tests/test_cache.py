@@ -0,0 +1,93 @@
+from solana.keypair import Keypair
+
+from src.cache import ReserveCache
+from src.helpers import available_liquidity, calculate_flash_loan_fees
+from src.reserve import Reserve
+from tests.factories import account_info, reserve_bytes
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fetch_once_then_quote_without_rpc(rpc_server):
+    data = reserve_bytes(available_amount=500)
+    rpc_server.handlers["getAccountInfo"] = lambda *_: account_info(data, slot=7)
+    reserve = Keypair().public_key
+    cache = ReserveCache()
+
+    reserve_acc = cache.fetch(reserve)
+    assert cache.fetch(reserve) is reserve_acc
+    assert cache.get(reserve).slot == 7
+
+    assert available_liquidity(reserve, reserve_acc=reserve_acc) == 500
+    assert calculate_flash_loan_fees(reserve, 10**6, reserve_acc=reserve_acc) == (
+        3000,
+        600,
+    )
+    assert len(rpc_server.calls_to("getAccountInfo")) == 1
+
+
+def test_ttl_and_slot_age_eviction():
+    clock = FakeClock()
+    cache = ReserveCache(ttl=2, max_slot_age=10, clock=clock)
+    reserve = Keypair().public_key
+    data = Reserve(reserve_bytes())
+
+    cache.put(reserve, data, slot=100)
+    assert cache.get(reserve, current_slot=110) is not None
+    assert cache.get(reserve, current_slot=111) is None
+
+    cache.put(reserve, data, slot=100)
+    clock.now = 3
+    assert cache.get(reserve) is None
+
+
+def test_lru_bound_and_invalidation():
+    cache = ReserveCache(max_size=2)
+    first, second, third = (Keypair().public_key for _ in range(3))
+    data = Reserve(reserve_bytes())
+
+    cache.put(first, data, slot=1)
+    cache.put(second, data, slot=1)
+    cache.get(first)
+    cache.put(third, data, slot=1)
+
+    assert first in cache and third in cache and second not in cache
+
+    cache.invalidate(first)
+    assert first not in cache
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_older_slot_does_not_overwrite():
+    cache = ReserveCache()
+    reserve = Keypair().public_key
+    new = Reserve(reserve_bytes(available_amount=2))
+    old = Reserve(reserve_bytes(available_amount=1))
+
+    cache.put(reserve, new, slot=20)
+    cache.put(reserve, old, slot=10)
+
+    assert cache.get(reserve).data is new
+
+
+def test_fetch_many_only_requests_misses(rpc_server):
+    rpc_server.handlers["getMultipleAccounts"] = lambda keys, _opts: {
+        "context": {"slot": 5},
+        "value": [account_info(reserve_bytes())["value"] for _ in keys],
+    }
+    cached, missed = Keypair().public_key, Keypair().public_key
+    cache = ReserveCache()
+    cache.put(cached, Reserve(reserve_bytes()), slot=1)
+
+    reserves = cache.fetch_many([cached, missed])
+
+    assert set(reserves) == {cached, missed}
+    assert rpc_server.calls_to("getMultipleAccounts")[0][0] == [str(missed)]
+    assert cache.get(missed).slot == 5
@@ -0,0 +1,133 @@
+import gc
+
+import pytest
+from betterconf.exceptions import VariableNotFoundError
+from solana.keypair import Keypair
+
+import config
+from config import FlashLoanConfig, get_config, set_config
+from src import blockhash, confirmation, rpc
+from src.executor import FlashLoanExecutor
+from src.helpers import Account
+from src.reserve import Reserve
+from tests.factories import (
+    PROGRAM_ID,
+    account_info,
+    flash_loan_config,
+    reserve_bytes,
+)
+from tests.fake_rpc import FakeRpcServer, Validator
+
+
+def test_config_is_built_once_and_can_be_replaced():
+    default = get_config()
+    assert get_config() is default is config.cfg
+
+    explicit = flash_loan_config(program_id=Keypair().public_key)
+    set_config(explicit)
+    try:
+        assert config.cfg is explicit
+        assert FlashLoanExecutor.MAIN_PROGRAM_ID == explicit.program_id
+    finally:
+        set_config(default)
+    assert get_config() is default
+
+
+def test_config_is_read_from_the_environment(monkeypatch):
+    program_id = Keypair().public_key
+    monkeypatch.setenv("VALIDATOR", "http://127.0.0.1:2")
+    monkeypatch.setenv("RESERVE", str(Keypair().public_key))
+    monkeypatch.setenv("FLASH_LOAN_PROGRAM", str(program_id))
+
+    default = get_config()
+    set_config(None)
+    try:
+        assert isinstance(get_config(), FlashLoanConfig)
+        assert get_config().validator == "http://127.0.0.1:2"
+        assert FlashLoanExecutor.MAIN_PROGRAM_ID == program_id
+    finally:
+        set_config(default)
+
+
+def test_explicit_values_beat_the_environment(monkeypatch):
+    monkeypatch.setenv("VALIDATOR", "http://env")
+    monkeypatch.setenv("RESERVE", str(Keypair().public_key))
+    monkeypatch.setenv("FLASH_LOAN_PROGRAM", str(Keypair().public_key))
+
+    explicit = flash_loan_config(validator="http://explicit")
+
+    assert explicit.validator == "http://explicit"
+    assert explicit.program_id == PROGRAM_ID
+    # the explicit values don't become the defaults of later configs
+    assert FlashLoanConfig().validator == "http://env"
+    monkeypatch.delenv("VALIDATOR")
+    with pytest.raises(VariableNotFoundError):
+        FlashLoanConfig()
+    with pytest.raises(TypeError):
+        FlashLoanConfig(validatr="http://typo")
+
+
+def test_explicit_config_builds_its_own_client(rpc_server):
+    validator = Validator()
+    handlers = dict(
+        getAccountInfo=lambda *_: account_info(reserve_bytes()),
+        **validator.handlers(),
+    )
+    with FakeRpcServer(handlers) as server:
+        explicit = flash_loan_config(validator=server.url)
+        executor = FlashLoanExecutor(config=explicit)
+        authority = Keypair()
+        resp = executor.flash_borrow(
+            source_liquidity=Keypair().public_key,
+            destination_liquidity=Keypair().public_key,
+            reserve=Keypair().public_key,
+            lending_market=Keypair().public_key,
+            amount=100,
+        ).execute(fee_payer=authority.public_key, signers=[authority])
+
+        account = Account(public_key=Keypair().public_key, config=explicit)
+        reserve, _ = account.get_info_with_slot(Reserve)
+        rpc.close()
+
+    assert executor.MAIN_PROGRAM_ID == explicit.program_id
+    assert resp["result"] == validator.signatures[0]
+    assert account.validator == server.url
+    assert reserve.liquidity_available_amount == 10**12
+    # nothing went to the shared client
+    assert rpc_server.calls == []
+    assert {name for name, _ in server.calls} >= {
+        "getLatestBlockhash",
+        "sendTransaction",
+        "getSignatureStatuses",
+        "getAccountInfo",
+    }
+
+
+def test_explicit_config_resources_are_dropped_with_it():
+    validator = Validator()
+    with FakeRpcServer(validator.handlers()) as server:
+        executor = FlashLoanExecutor(config=flash_loan_config(validator=server.url))
+        authority = Keypair()
+        executor.flash_borrow(
+            source_liquidity=Keypair().public_key,
+            destination_liquidity=Keypair().public_key,
+            reserve=Keypair().public_key,
+            lending_market=Keypair().public_key,
+            amount=100,
+        ).execute(fee_payer=authority.public_key, signers=[authority])
+        client = rpc.get_client(executor.config)
+        provider = blockhash.get_provider(client)
+        tracker = confirmation.get_tracker(client)
+        threads = [provider._thread, tracker._thread]
+        assert all(thread.is_alive() for thread in threads if thread is not None)
+
+        del executor, client
+        gc.collect()
+
+        assert len(rpc._config_clients) == 0
+        assert len(blockhash._client_providers) == 0
+        assert len(confirmation._client_trackers) == 0
+        for thread in threads:
+            if thread is not None:
+                thread.join(5)
+                assert not thread.is_alive()
@@ -0,0 +1,147 @@
+import concurrent.futures
+import time
+
+import pytest
+from solana.keypair import Keypair
+from solana.rpc.commitment import Confirmed, Finalized
+
+from src import confirmation
+from src.backoff import jittered_backoff
+from src.confirmation import (
+    ConfirmationTracker,
+    TransactionExpiredError,
+    TransactionFailedError,
+)
+
+
+def _signature() -> str:
+    return str(Keypair().public_key)
+
+
+def _statuses(table):
+    def handler(signatures, *_):
+        return {
+            "context": {"slot": 1},
+            "value": [table.get(signature) for signature in signatures],
+        }
+
+    return handler
+
+
+def test_batches_signature_statuses(rpc_server):
+    signatures = [_signature() for _ in range(300)]
+    table = {
+        sig: {"confirmationStatus": "finalized", "err": None} for sig in signatures
+    }
+    rpc_server.handlers.update(getSignatureStatuses=_statuses(table))
+    tracker = ConfirmationTracker(min_interval=0.01)
+
+    futures = [tracker.track(signature) for signature in signatures]
+    concurrent.futures.wait(futures, timeout=5)
+    tracker.stop()
+
+    calls = rpc_server.calls_to("getSignatureStatuses")
+    assert all(future.done() for future in futures)
+    assert all(len(params[0]) <= 256 for params in calls)
+    # the first poll may race the tracking loop, the rest is batched
+    assert len(calls) <= 3
+    assert tracker.pending == 0
+
+
+def test_commitment_target(rpc_server):
+    signature = _signature()
+    table = {signature: {"confirmationStatus": "confirmed", "err": None}}
+    rpc_server.handlers.update(getSignatureStatuses=_statuses(table))
+    tracker = ConfirmationTracker(min_interval=0.01)
+
+    confirmed = tracker.track(signature, Confirmed)
+    finalized = tracker.track(signature, Finalized)
+    status = confirmed.result(5)
+    tracker.stop()
+
+    assert status["confirmationStatus"] == "confirmed"
+    assert not finalized.done()
+    assert tracker.pending == 1
+
+
+def test_expires_after_last_valid_block_height(rpc_server):
+    rpc_server.handlers.update(
+        getSignatureStatuses=_statuses({}), getBlockHeight=lambda *_: 101
+    )
+    tracker = ConfirmationTracker(min_interval=0.01)
+
+    with pytest.raises(TransactionExpiredError):
+        tracker.wait(_signature(), last_valid_block_height=100, timeout=5)
+    tracker.stop()
+
+
+def test_failed_transaction(rpc_server):
+    signature = _signature()
+    table = {signature: {"confirmationStatus": "processed", "err": {"Custom": 1}}}
+    rpc_server.handlers.update(getSignatureStatuses=_statuses(table))
+    tracker = ConfirmationTracker(min_interval=0.01)
+
+    with pytest.raises(TransactionFailedError) as exc:
+        tracker.wait(signature, timeout=5)
+    tracker.stop()
+
+    assert exc.value.err == {"Custom": 1}
+
+
+def test_wait_timeout(rpc_server):
+    rpc_server.handlers.update(getSignatureStatuses=_statuses({}))
+    tracker = ConfirmationTracker(min_interval=0.01, max_interval=0.02)
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        tracker.wait(_signature(), timeout=0.2)
+    assert tracker.pending == 0
+
+    # let a poll that was already running finish
+    time.sleep(0.05)
+    calls = tracker.rpc_calls
+    time.sleep(0.1)
+    tracker.stop()
+
+    assert calls > 1
+    # the timed out signature is not polled anymore
+    assert tracker.rpc_calls == calls
+
+
+def test_cancelled_future_is_dropped(rpc_server):
+    rpc_server.handlers.update(getSignatureStatuses=_statuses({}))
+    tracker = ConfirmationTracker(min_interval=10)
+
+    kept = tracker.track(_signature())
+    cancelled = tracker.track(_signature())
+    assert tracker.pending == 2
+
+    assert cancelled.cancel()
+    tracker.stop()
+
+    assert tracker.pending == 1
+    assert not kept.done()
+
+
+def test_backoff_is_capped_for_any_attempt():
+    assert jittered_backoff(1030, base=0.4, maximum=4, jitter=0) == 4
+    assert jittered_backoff(10**6, base=0.4, maximum=4, jitter=0) == 4
+
+
+def test_tracker_survives_backoff_errors(rpc_server, monkeypatch):
+    signature = _signature()
+    table = {}
+    rpc_server.handlers.update(getSignatureStatuses=_statuses(table))
+
+    def failing_backoff(*_, **__):
+        raise OverflowError("(34, 'Numerical result out of range')")
+
+    monkeypatch.setattr(confirmation, "jittered_backoff", failing_backoff)
+    tracker = ConfirmationTracker(max_interval=0.01)
+    future = tracker.track(signature)
+    deadline = time.monotonic() + 5
+    while tracker.rpc_calls < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    table[signature] = {"confirmationStatus": "finalized", "err": None}
+
+    assert future.result(5)["confirmationStatus"] == "finalized"
+    tracker.stop()
@@ -0,0 +1,120 @@
+import pytest
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+
+from src.discovery import (
+    LENDING_MARKET_OFFSET,
+    MINT_OFFSET,
+    ReserveIndex,
+    ReserveKeys,
+    find_reserves,
+)
+from src.reserve import Reserve
+from tests.factories import account_info, reserve_bytes
+
+
+def _key():
+    return Keypair().public_key
+
+
+def _serve(rpc_server, accounts):
+    """
+    getProgramAccounts applying the dataSize / memcmp filters and dataSlice
+    """
+
+    def get_program_accounts(program_id, options):
+        matches = []
+        for key, data in accounts.items():
+            for f in options.get("filters", []):
+                if "dataSize" in f and len(data) != f["dataSize"]:
+                    break
+                if "memcmp" in f:
+                    offset, value = f["memcmp"]["offset"], f["memcmp"]["bytes"]
+                    if data[offset : offset + 32] != bytes(PublicKey(value)):
+                        break
+            else:
+                data_slice = options["dataSlice"]
+                start = data_slice["offset"]
+                sliced = data[start : start + data_slice["length"]]
+                matches.append(
+                    {"pubkey": str(key), "account": account_info(sliced)["value"]}
+                )
+        return matches
+
+    rpc_server.handlers["getProgramAccounts"] = get_program_accounts
+
+
+def _reserve(market, mint):
+    return reserve_bytes(lending_market=bytes(market), mint=bytes(mint))
+
+
+def test_offsets_match_layout():
+    market, mint = _key(), _key()
+    reserve = Reserve(_reserve(market, mint))
+
+    assert bytes(reserve.raw[LENDING_MARKET_OFFSET:][:32]) == bytes(market)
+    assert bytes(reserve.raw[MINT_OFFSET:][:32]) == bytes(mint)
+
+
+def test_find_reserves_filters_on_the_validator(rpc_server):
+    markets, mints = [_key(), _key()], [_key(), _key()]
+    accounts = {_key(): _reserve(market, mint) for market in markets for mint in mints}
+    accounts[_key()] = bytes(100)
+    _serve(rpc_server, accounts)
+
+    assert len(find_reserves()) == 4
+    expected = [
+        key
+        for key, data in accounts.items()
+        if data[16:48] == bytes(markets[0]) and data[48:80] == bytes(mints[1])
+    ]
+    assert find_reserves(lending_market=markets[0], mint=mints[1]) == [
+        ReserveKeys(expected[0], markets[0], mints[1])
+    ]
+
+    (_, options) = rpc_server.calls_to("getProgramAccounts")[-1]
+    assert options["dataSlice"] == {"offset": 16, "length": 64}
+    assert {"dataSize": 360} in options["filters"]
+
+
+def test_index_resolves_mints_with_one_scan_each(rpc_server):
+    markets, mints = [_key(), _key()], [_key(), _key(), _key()]
+    accounts = {}
+    for market in markets:
+        for mint in mints[:2]:
+            accounts[_key()] = _reserve(market, mint)
+    only = _key()
+    accounts[only] = _reserve(markets[0], mints[2])
+    _serve(rpc_server, accounts)
+    index = ReserveIndex()
+
+    assert index.resolve(mints[2]) == only
+    assert index.resolve(mints[2]) == only
+    assert len(rpc_server.calls_to("getProgramAccounts")) == 1
+
+    with pytest.raises(LookupError):
+        index.resolve(mints[0])
+    reserve = index.resolve(mints[0], lending_market=markets[1])
+    assert index.get(reserve) == ReserveKeys(reserve, markets[1], mints[0])
+    assert len(rpc_server.calls_to("getProgramAccounts")) == 2
+
+    with pytest.raises(LookupError):
+        index.resolve(_key())
+
+
+def test_refresh_indexes_everything_and_drops_closed_reserves(rpc_server):
+    market, mint = _key(), _key()
+    first, second = _key(), _key()
+    accounts = {first: _reserve(market, mint), second: _reserve(market, _key())}
+    _serve(rpc_server, accounts)
+    index = ReserveIndex()
+
+    assert index.refresh() == 2
+    assert index.by_market(market) == sorted([first, second], key=bytes)
+    assert index.by_mint(mint) == [first]
+    calls = len(rpc_server.calls_to("getProgramAccounts"))
+
+    del accounts[first]
+    assert index.refresh(market) == 1
+    assert first not in index and index.by_mint(mint) == []
+    assert len(rpc_server.calls_to("getProgramAccounts")) == calls + 1
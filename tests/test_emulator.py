@@ -0,0 +1,140 @@
+from solana.keypair import Keypair
+from solana.publickey import PublicKey
+from solana.transaction import AccountMeta, Transaction, TransactionInstruction
+
+from src.emulator import FlashLoanEmulator
+from src.entities import FlashBorrowParams, FlashRepayParams
+from src.fees import flash_loan_fees
+from src.reserve import Reserve
+from src.template import FlashLoanTemplate
+from tests.factories import PROGRAM_ID, reserve_bytes
+
+
+class Setup:
+    def __init__(self, available=10**9):
+        self.market = Keypair().public_key
+        self.reserve_key = Keypair().public_key
+        self.reserve = Reserve(
+            reserve_bytes(available_amount=available, lending_market=bytes(self.market))
+        )
+        self.supply = PublicKey(self.reserve.liquidity_supply_pubkey)
+        self.fee_receiver = PublicKey(self.reserve.fee_receiver)
+        self.authority = Keypair().public_key
+        self.account = Keypair().public_key
+
+    def template(self, **repay):
+        accounts = dict(
+            source_liquidity=self.account,
+            destination_liquidity=self.supply,
+            reserve=self.reserve_key,
+            reserve_liquidity_fee_receiver=self.fee_receiver,
+            lending_market=self.market,
+            user_transfer_authority=self.authority,
+        )
+        accounts.update(repay)
+        return FlashLoanTemplate(
+            FlashBorrowParams(
+                source_liquidity=self.supply,
+                destination_liquidity=self.account,
+                reserve=self.reserve_key,
+                lending_market=self.market,
+                program_id=PROGRAM_ID,
+            ),
+            FlashRepayParams(**accounts),
+        )
+
+    def emulator(self, balance):
+        return FlashLoanEmulator(
+            {self.reserve_key: self.reserve}, {self.account: balance}, PROGRAM_ID
+        )
+
+
+def test_valid_bundle_moves_amount_and_fee():
+    setup = Setup()
+    fee, _ = flash_loan_fees(setup.reserve, 10**6)
+    borrow, repay = setup.template().instructions(10**6)
+    swap = TransactionInstruction(
+        keys=[], program_id=Keypair().public_key, data=b"\x01"
+    )
+    transaction = Transaction(fee_payer=setup.authority).add(borrow, swap, repay)
+
+    result = setup.emulator(fee).emulate(transaction, signers=[setup.authority])
+
+    assert result, result.errors
+    assert result.balances[setup.account] == 0
+    assert result.balances[setup.supply] == 10**9
+    assert result.balances[setup.fee_receiver] == fee
+
+
+def test_unfunded_repay_fails():
+    setup = Setup()
+    fee, _ = flash_loan_fees(setup.reserve, 10**6)
+
+    result = setup.emulator(fee - 1).emulate(setup.template().instructions(10**6))
+
+    assert not result
+    assert result.errors == [
+        f"instruction 1: repay source holds {10**6 + fee - 1}, "
+        f"needs {10**6 + fee} (amount + fee)"
+    ]
+
+
+def test_pairs_must_match():
+    setup = Setup()
+    emulator = setup.emulator(10**9)
+    template = setup.template()
+    borrow, _ = template.instructions(100)
+    _, repay = template.instructions(99)
+
+    assert emulator.emulate([borrow, repay]).errors == [
+        "instruction 1: FlashRepay amount 99 doesn't match FlashBorrow amount 100"
+    ]
+    assert emulator.emulate([borrow]).errors == [
+        "instruction 0: FlashBorrow of 100 is never repaid"
+    ]
+    assert emulator.emulate([repay]).errors == [
+        "instruction 0: FlashRepay without a preceding FlashBorrow"
+    ]
+    assert emulator.emulate([borrow, borrow, repay, repay]).errors == [
+        "instruction 1: reserve is already flash borrowed"
+    ]
+
+
+def test_liquidity_accounts_and_flags_are_checked():
+    setup = Setup(available=1000)
+    emulator = setup.emulator(10**9)
+
+    assert emulator.emulate(setup.template().instructions(1001)).errors == [
+        "instruction 0: FlashBorrow of 1001 exceeds available liquidity 1000"
+    ]
+
+    wrong_receiver = setup.template(reserve_liquidity_fee_receiver=setup.account)
+    assert emulator.emulate(wrong_receiver.instructions(100)).errors == [
+        "instruction 1: wrong reserve fee receiver"
+    ]
+
+    borrow, repay = setup.template().instructions(100)
+    keys = list(repay.keys)
+    keys[5] = AccountMeta(setup.authority, is_signer=False, is_writable=False)
+    unsigned = TransactionInstruction(keys, repay.program_id, repay.data)
+    assert emulator.emulate([borrow, unsigned]).errors == [
+        f"instruction 1: account 5 ({setup.authority}) must sign"
+    ]
+    assert emulator.emulate([borrow, repay], signers=[]).errors == [
+        f"instruction 1: missing signature of {setup.authority}"
+    ]
+
+    other = Setup()
+    assert emulator.emulate(other.template().instructions(100)).errors == [
+        f"instruction 0: unknown reserve {other.reserve_key}"
+    ]
+
+
+def test_state_is_not_changed():
+    setup = Setup()
+    emulator = setup.emulator(10**9)
+    instructions = setup.template().instructions(10**6)
+
+    assert emulator.emulate(instructions)
+    assert emulator.emulate(instructions)
+    assert emulator.balances[setup.account] == 10**9
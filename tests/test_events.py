@@ -0,0 +1,54 @@
+import logging
+
+from solana.keypair import Keypair
+
+from src import executor as executor_module
+from src.events import EventLog
+from src.executor import BaseFlashLoanExecutor
+
+
+def test_payload_is_not_built_when_level_is_disabled():
+    logger = logging.getLogger("tests.events.disabled")
+    logger.setLevel(logging.INFO)
+    events = EventLog(logger)
+    calls = []
+
+    events.emit("event", lambda: calls.append(1) or {})
+
+    assert calls == []
+    assert not events.is_enabled()
+
+
+def test_disable_is_a_no_op_even_for_enabled_logger(caplog):
+    logger = logging.getLogger("tests.events.noop")
+    events = EventLog(logger)
+    events.disable()
+    calls = []
+
+    with caplog.at_level(logging.DEBUG, logger=logger.name):
+        events.emit("event", lambda: calls.append(1) or {})
+
+    assert calls == []
+    assert caplog.records == []
+
+
+def test_executor_emits_structured_events(caplog):
+    authority = Keypair()
+    executor = BaseFlashLoanExecutor()
+
+    with caplog.at_level(logging.DEBUG, logger=executor_module.logger.name):
+        executor.flash_borrow(
+            source_liquidity=Keypair().public_key,
+            destination_liquidity=Keypair().public_key,
+            reserve=Keypair().public_key,
+            lending_market=Keypair().public_key,
+            amount=100,
+        )._build_transaction(authority.public_key, [authority])
+
+    assert [record.event for record in caplog.records] == [
+        "append_instruction",
+        "execute",
+    ]
+    assert caplog.records[0].payload["data"] == {"amount": 100}
+    assert caplog.records[1].payload["signers"] == [authority.public_key]
+    assert '"amount": 100' in caplog.records[0].getMessage()
@@ -0,0 +1,137 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from src.fees import WAD, BorrowTooSmallError, FeeEngine, bulk_flash_loan_fees
+from src.helpers import calculate_flash_loan_fees
+from src.reserve import Reserve
+from tests.factories import reserve_bytes
+
+U64_MAX = 2**64 - 1
+
+
+def _round(value: Fraction) -> int:
+    # the program rounds half up
+    return int(value + Fraction(1, 2))
+
+
+def reference_fees(fee_wad: int, pct: int, amount: int):
+    """
+    Straightforward model of the on-chain calculation with exact fractions
+    """
+    if fee_wad == 0 or amount == 0:
+        return 0, 0
+    minimum = 2 if pct else 1
+    borrow_fee = max(Fraction(amount * fee_wad, WAD), Fraction(minimum))
+    if borrow_fee >= amount:
+        return None
+    # Decimal * Rate truncates to 18 decimals
+    texture_fee = Fraction(borrow_fee * WAD * pct // 100, WAD)
+    return _round(borrow_fee), max(_round(texture_fee), 1) if pct else 0
+
+
+def _random_cases(seed: int, count: int = 2000):
+    rng = random.Random(seed)
+    for _ in range(count):
+        fee_wad = rng.choice(
+            [0, 1, 10**12, 3 * 10**15, 9 * 10**15, rng.randrange(WAD), WAD]
+        )
+        pct = rng.choice([0, 1, 20, 50, 100, rng.randrange(101)])
+        amount = rng.choice(
+            [
+                0,
+                1,
+                2,
+                3,
+                rng.randrange(1000),
+                rng.randrange(10**12),
+                rng.randrange(U64_MAX),
+            ]
+        )
+        yield fee_wad, pct, amount
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_scalar_matches_reference(seed):
+    for fee_wad, pct, amount in _random_cases(seed):
+        expected = reference_fees(fee_wad, pct, amount)
+        engine = FeeEngine(fee_wad, pct)
+        if expected is None:
+            with pytest.raises(BorrowTooSmallError):
+                engine.fees(amount)
+        else:
+            assert engine.fees(amount) == expected, (fee_wad, pct, amount)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bulk_matches_scalar(seed):
+    rng = random.Random(seed)
+    fee_wad, pct = rng.randrange(10**16), rng.randrange(101)
+    engine = FeeEngine(fee_wad, pct)
+    amounts = [amount for _, _, amount in _random_cases(seed, 500)]
+
+    fees = engine.bulk(amounts)
+
+    for i, amount in enumerate(amounts):
+        try:
+            expected = engine.fees(amount)
+        except BorrowTooSmallError:
+            assert not fees.valid[i]
+            assert (fees.borrow_fees[i], fees.texture_fees[i]) == (0, 0)
+        else:
+            assert fees.valid[i]
+            assert (fees.borrow_fees[i], fees.texture_fees[i]) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_matches_python(seed):
+    np = pytest.importorskip("numpy")
+    rng = random.Random(seed)
+    for fee_wad, pct in ((3 * 10**15, 20), (rng.randrange(WAD), rng.randrange(101))):
+        engine = FeeEngine(fee_wad, pct)
+        amounts = [rng.randrange(10**12) for _ in range(500)] + [0, 1, 2, 3]
+
+        # the second run is too large for uint64 math and falls back
+        for batch in (amounts, amounts + [10**19]):
+            expected = engine.bulk(batch)
+            fees = engine.bulk(np.array(batch, dtype=np.uint64))
+
+            assert fees.borrow_fees.tolist() == expected.borrow_fees
+            assert fees.texture_fees.tolist() == expected.texture_fees
+            assert fees.valid.tolist() == expected.valid
+
+
+def test_rounds_half_up():
+    # 0.5% of 100 is exactly 0.5
+    engine = FeeEngine(5 * 10**15, 0)
+
+    assert engine.fees(300) == (2, 0)
+    assert engine.fees(500) == (3, 0)
+
+
+def test_minimum_fees():
+    engine = FeeEngine(3 * 10**15, 20)
+
+    assert engine.fees(10) == (2, 1)
+    with pytest.raises(BorrowTooSmallError):
+        engine.fees(2)
+
+
+def test_large_amounts_are_exact():
+    amount = U64_MAX
+    borrow_fee, texture_fee = FeeEngine(3 * 10**15, 20).fees(amount)
+
+    assert borrow_fee == _round(Fraction(amount * 3, 1000))
+    assert texture_fee == _round(Fraction(amount * 3 * 20, 1000 * 100))
+
+
+def test_helpers_use_engine():
+    reserve = Reserve(reserve_bytes(flash_loan_fee_wad=3 * 10**15))
+    amounts = [10**6, 10**9]
+
+    fees = bulk_flash_loan_fees(reserve, amounts)
+
+    assert [calculate_flash_loan_fees(None, a, reserve) for a in amounts] == list(
+        zip(fees.borrow_fees, fees.texture_fees)
+    )
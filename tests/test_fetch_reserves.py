@@ -0,0 +1,52 @@
+import pytest
+from solana.keypair import Keypair
+
+from src.helpers import MAX_MULTIPLE_ACCOUNTS, fetch_reserves
+from tests.factories import account_info, reserve_bytes
+
+
+@pytest.fixture
+def accounts(rpc_server):
+    """
+    Reserve data served by the fake validator, keys missing from it are
+    reported as non-existent accounts
+    """
+    data = {}
+
+    def get_multiple_accounts(keys, _opts):
+        assert len(keys) <= MAX_MULTIPLE_ACCOUNTS
+        return {
+            "context": {"slot": 1},
+            "value": [
+                account_info(data[key])["value"] if key in data else None
+                for key in keys
+            ],
+        }
+
+    rpc_server.handlers["getMultipleAccounts"] = get_multiple_accounts
+    return data
+
+
+def test_fetch_reserves_in_chunks(rpc_server, accounts):
+    keys = [Keypair().public_key for _ in range(250)]
+    for i, key in enumerate(keys):
+        accounts[str(key)] = reserve_bytes(available_amount=i)
+
+    reserves = fetch_reserves(keys)
+
+    assert len(rpc_server.calls_to("getMultipleAccounts")) == 3
+    assert [reserves[key].liquidity_available_amount for key in keys] == list(
+        range(250)
+    )
+
+
+def test_fetch_reserves_reports_missing(accounts):
+    present, missing = Keypair().public_key, Keypair().public_key
+    accounts[str(present)] = reserve_bytes()
+
+    reserves = fetch_reserves([present, missing])
+
+    assert reserves[present] is not None
+    assert reserves[missing] is None
+    with pytest.raises(ValueError, match=str(missing)):
+        fetch_reserves([present, missing], strict=True)
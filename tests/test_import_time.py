@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cumulative `python -X importtime` budget of the SDK entry points, about
+# three times what they take with the RPC stack deferred
+IMPORT_BUDGET_US = 300_000
+
+# loaded on the first RPC call / get_config(), never at import
+DEFERRED = ("requests", "httpx", "solana.rpc.api", "dotenv", "numpy")
+
+CONFIG_VARIABLES = ("VALIDATOR", "RESERVE", "FLASH_LOAN_PROGRAM")
+
+
+def _import_times(statement: str) -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in CONFIG_VARIABLES}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_needs_no_config_and_defers_heavy_modules():
+    times = _import_times("import src.executor, src.helpers, src.quote")
+
+    assert [name for name in DEFERRED if name in times] == []
+    assert times["src.executor"] + times["src.helpers"] < IMPORT_BUDGET_US
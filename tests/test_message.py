@@ -0,0 +1,200 @@
+import struct
+
+import pytest
+from solana.keypair import Keypair
+from solana.transaction import AccountMeta, Transaction, TransactionInstruction
+from solders.pubkey import Pubkey
+
+from src.compute_budget import COMPUTE_BUDGET_PROGRAM_ID
+from src.executor import BaseFlashLoanExecutor, FlashLoanExecutor
+from src.message import (
+    PACKET_DATA_SIZE,
+    AddressLookupTable,
+    TransactionTooLargeError,
+    VersionedTransaction,
+    compile_message,
+    encode_length,
+)
+from tests.factories import flash_loan_accounts, flash_loan_bundle
+
+
+def _bundle(executor, authority, swaps=0):
+    accounts = flash_loan_accounts()
+    swap_program = Keypair().public_key
+    swap_instructions = [
+        TransactionInstruction(
+            keys=[
+                AccountMeta(accounts.native_account, is_signer=False, is_writable=True),
+                AccountMeta(Keypair().public_key, is_signer=False, is_writable=True),
+                AccountMeta(Keypair().public_key, is_signer=False, is_writable=False),
+            ],
+            program_id=swap_program,
+            data=bytes(16),
+        )
+        for _ in range(swaps)
+    ]
+    return flash_loan_bundle(
+        executor, authority.public_key, accounts=accounts, between=swap_instructions
+    )
+
+
+def test_encode_length():
+    assert encode_length(0) == b"\x00"
+    assert encode_length(127) == b"\x7f"
+    assert encode_length(128) == b"\x80\x01"
+    assert encode_length(16383) == b"\xff\x7f"
+
+
+def test_legacy_estimate_matches_serialized_size():
+    authority = Keypair()
+    executor = _bundle(BaseFlashLoanExecutor(), authority, swaps=2)
+    executor.set_compute_budget(units=400_000, micro_lamports=1000)
+
+    estimated = executor.estimate(authority.public_key).transaction_size()
+    transaction = executor._build_transaction(authority.public_key, [authority])
+    transaction.recent_blockhash = str(Keypair().public_key)
+    transaction.sign(authority)
+
+    assert len(transaction.serialize()) == estimated
+
+
+def test_compute_budget_instructions_come_first():
+    authority = Keypair()
+    executor = _bundle(BaseFlashLoanExecutor(), authority)
+    executor.set_compute_budget(units=200_000, micro_lamports=5)
+
+    transaction = executor._build_transaction(authority.public_key, [authority])
+
+    limit, price = transaction.instructions[:2]
+    assert limit.program_id == price.program_id == COMPUTE_BUDGET_PROGRAM_ID
+    assert limit.data == bytes([2]) + struct.pack("<I", 200_000)
+    assert price.data == bytes([3]) + struct.pack("<Q", 5)
+    assert len(transaction.instructions) == 4
+
+
+def test_inner_instructions_keep_their_order():
+    authority = Keypair()
+    executor = _bundle(BaseFlashLoanExecutor(), authority, swaps=3)
+
+    transaction = executor._build_transaction(authority.public_key, [authority])
+
+    programs = [ix.program_id for ix in transaction.instructions]
+    assert programs[0] == programs[-1] == executor.MAIN_PROGRAM_ID
+    assert len(set(programs[1:-1])) == 1
+
+
+def test_v0_transaction_loads_accounts_from_lookup_table():
+    authority = Keypair()
+    executor = _bundle(BaseFlashLoanExecutor(), authority, swaps=8)
+    legacy_size = executor.estimate(authority.public_key).transaction_size()
+    message = executor.estimate(authority.public_key)
+    accounts = [k for k in message.static_keys if k != authority.public_key]
+    table = AddressLookupTable(Keypair().public_key, accounts)
+
+    executor.use_lookup_tables(table)
+    v0 = executor.estimate(authority.public_key)
+    transaction = executor._build_transaction(authority.public_key, [authority])
+    transaction.recent_blockhash = str(Keypair().public_key)
+    transaction.sign(authority)
+    raw = transaction.serialize()
+
+    assert isinstance(transaction, VersionedTransaction)
+    assert len(raw) == v0.transaction_size() < legacy_size
+    assert v0.account_count == message.account_count
+    # signature count, signature, then the v0 prefix
+    assert raw[0] == 1 and raw[65] == 0x80
+    signature = transaction.signature()
+    assert signature.verify(
+        Pubkey(bytes(authority.public_key)), transaction.serialize_message()
+    )
+    # invoked programs can't be loaded from a table
+    static = set(v0.static_keys)
+    assert executor.MAIN_PROGRAM_ID in static
+
+
+def test_lookup_indexes():
+    payer, writable, readonly, program = (Keypair().public_key for _ in range(4))
+    table = AddressLookupTable(Keypair().public_key, [readonly, program, writable])
+    instruction = TransactionInstruction(
+        keys=[
+            AccountMeta(readonly, is_signer=False, is_writable=False),
+            AccountMeta(writable, is_signer=False, is_writable=True),
+        ],
+        program_id=program,
+        data=b"",
+    )
+
+    message = compile_message(payer, [instruction], [table], version=0)
+
+    assert message.static_keys == [payer, program]
+    (lookup,) = message.lookups
+    assert lookup.writable_indexes == (2,) and lookup.readonly_indexes == (0,)
+    # loaded writable accounts come right after the static keys
+    assert message.instructions[0].accounts == (3, 2)
+
+
+def test_oversized_bundle_is_rejected_before_rpc(rpc_server):
+    authority = Keypair()
+    executor = _bundle(FlashLoanExecutor(), authority, swaps=20)
+
+    assert executor.estimate(authority.public_key).transaction_size() > PACKET_DATA_SIZE
+    with pytest.raises(TransactionTooLargeError):
+        executor.execute(fee_payer=authority.public_key, signers=[authority])
+
+    assert rpc_server.calls == []
+
+
+def test_account_limit():
+    payer = Keypair().public_key
+    keys = [Keypair().public_key for _ in range(70)]
+    table = AddressLookupTable(Keypair().public_key, keys)
+    instruction = TransactionInstruction(
+        keys=[AccountMeta(key, is_signer=False, is_writable=False) for key in keys],
+        program_id=Keypair().public_key,
+        data=b"",
+    )
+
+    message = compile_message(payer, [instruction], [table], version=0)
+
+    assert message.transaction_size() < PACKET_DATA_SIZE
+    with pytest.raises(TransactionTooLargeError, match="accounts"):
+        message.check_size()
+
+
+def test_legacy_message_rejects_lookup_tables():
+    with pytest.raises(ValueError):
+        compile_message(
+            Keypair().public_key,
+            [],
+            [AddressLookupTable(Keypair().public_key, [])],
+        )
+
+
+def test_v0_signers_must_match():
+    payer = Keypair()
+    transaction = VersionedTransaction(payer.public_key, [])
+    transaction.recent_blockhash = str(Keypair().public_key)
+
+    with pytest.raises(ValueError):
+        transaction.sign(payer, Keypair())
+    with pytest.raises(AttributeError):
+        transaction.serialize()
+
+    transaction.sign(payer)
+    assert len(transaction.serialize()) == transaction.message.transaction_size()
+
+
+def test_solana_py_size_is_the_same_for_legacy():
+    payer = Keypair()
+    instruction = TransactionInstruction(
+        keys=[AccountMeta(Keypair().public_key, is_signer=False, is_writable=True)],
+        program_id=Keypair().public_key,
+        data=bytes(10),
+    )
+    transaction = Transaction(fee_payer=payer.public_key).add(instruction)
+    transaction.recent_blockhash = str(Keypair().public_key)
+    transaction.sign(payer)
+
+    message = compile_message(payer.public_key, [instruction])
+
+    assert len(transaction.serialize()) == message.transaction_size()
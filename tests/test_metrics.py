@@ -0,0 +1,64 @@
+import pytest
+from solana.keypair import Keypair
+
+from src import metrics
+from src.executor import FlashLoanExecutor
+from src.metrics import STAGE_DURATION, STAGE_ERRORS, InMemoryMetrics
+
+
+@pytest.fixture
+def recorder():
+    previous = metrics.get_metrics()
+    recorder = InMemoryMetrics()
+    metrics.set_metrics(recorder)
+    yield recorder
+    metrics.set_metrics(previous)
+
+
+def test_prometheus_export():
+    recorder = InMemoryMetrics(buckets=(0.1, 1))
+    recorder.observe("latency_seconds", 0.05, stage="send")
+    recorder.observe("latency_seconds", 0.5, stage="send")
+    recorder.observe("latency_seconds", 5, stage="send")
+    recorder.increment("errors_total", stage='a"b')
+
+    assert recorder.to_prometheus().splitlines() == [
+        "# TYPE flash_loan_latency_seconds histogram",
+        'flash_loan_latency_seconds_bucket{stage="send",le="0.1"} 1',
+        'flash_loan_latency_seconds_bucket{stage="send",le="1.0"} 2',
+        'flash_loan_latency_seconds_bucket{stage="send",le="+Inf"} 3',
+        'flash_loan_latency_seconds_sum{stage="send"} 5.55',
+        'flash_loan_latency_seconds_count{stage="send"} 3',
+        "# TYPE flash_loan_errors_total counter",
+        'flash_loan_errors_total{stage="a\\"b"} 1',
+    ]
+
+
+def test_stage_counts_errors(recorder):
+    with pytest.raises(ValueError):
+        with metrics.stage("send"):
+            raise ValueError
+
+    assert recorder.counter(STAGE_ERRORS, stage="send") == 1
+    assert recorder.histogram(STAGE_DURATION, stage="send").count == 1
+
+
+def test_execute_stages(validator, recorder):
+    authority = Keypair()
+
+    FlashLoanExecutor().flash_borrow(
+        source_liquidity=Keypair().public_key,
+        destination_liquidity=Keypair().public_key,
+        reserve=Keypair().public_key,
+        lending_market=Keypair().public_key,
+        amount=100,
+    ).execute(fee_payer=authority.public_key, signers=[authority])
+
+    for stage in (
+        "instruction_build",
+        "blockhash_fetch",
+        "signing",
+        "send",
+        "confirmation",
+    ):
+        assert recorder.histogram(STAGE_DURATION, stage=stage).count == 1, stage
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+from solana.keypair import Keypair
+from solana.rpc.core import RPCException
+
+from src import confirmation
+from src.blockhash import BlockhashProvider
+from src.executor import FlashLoanExecutor
+from src.policy import FireAndForgetPolicy, SafePolicy
+from tests.fake_rpc import FakeRpcServer, Reply, Validator
+
+
+def _execute(executor):
+    authority = Keypair()
+    return executor.flash_borrow(
+        source_liquidity=Keypair().public_key,
+        destination_liquidity=Keypair().public_key,
+        reserve=Keypair().public_key,
+        lending_market=Keypair().public_key,
+        amount=100,
+    ).execute(fee_payer=authority.public_key, signers=[authority])
+
+
+def test_safe_policy_is_default(rpc_server, validator):
+    executor = FlashLoanExecutor()
+
+    assert isinstance(executor.policy, SafePolicy)
+    assert _execute(executor)["result"] == validator.signatures[0]
+    (params,) = rpc_server.calls_to("sendTransaction")
+    assert params[1]["skipPreflight"] is False
+
+
+def test_failed_execute_keeps_instructions(rpc_server, validator):
+    def rejected(*_):
+        raise Reply(error={"code": -32002, "message": "Transaction simulation failed"})
+
+    rpc_server.handlers["sendTransaction"] = rejected
+    executor = FlashLoanExecutor()
+
+    with pytest.raises(RPCException):
+        _execute(executor)
+    assert len(executor.instructions) == 1
+
+    rpc_server.handlers.update(validator.handlers())
+    authority = Keypair()
+    executor.execute(fee_payer=authority.public_key, signers=[authority])
+    assert executor.instructions == []
+    assert len(validator.sent) == 1
+
+
+def test_fire_and_forget_rebroadcasts_until_confirmed(rpc_server):
+    validator = Validator(confirmed=False)
+    rpc_server.handlers.update(validator.handlers())
+
+    with FakeRpcServer(validator.handlers()) as extra:
+        policy = FireAndForgetPolicy([extra.url], rebroadcast_interval=0.01)
+        with BlockhashProvider(refresh_interval=60) as provider:
+            handle = _execute(FlashLoanExecutor(provider, policy))
+
+            assert not handle.done()
+            deadline = time.monotonic() + 5
+            while (
+                len(extra.calls_to("sendTransaction")) < 3
+                and time.monotonic() < deadline
+            ):
+                time.sleep(0.01)
+            validator.confirmed.set()
+            status = handle.result(5)
+        policy.close()
+
+    assert status["confirmationStatus"] == "finalized"
+    assert len(rpc_server.calls_to("sendTransaction")) >= 3
+    for params in rpc_server.calls_to("sendTransaction") + extra.calls_to(
+        "sendTransaction"
+    ):
+        assert params[1]["skipPreflight"] is True
+    # the same signed bytes every time
+    sent = {params[0] for params in rpc_server.calls_to("sendTransaction")}
+    assert sent == {params[0] for params in extra.calls_to("sendTransaction")}
+    assert len(sent) == 1
+
+
+def test_fire_and_forget_uses_a_bounded_pool(rpc_server):
+    validator = Validator(confirmed=False)
+    rpc_server.handlers.update(validator.handlers())
+
+    policy = FireAndForgetPolicy(rebroadcast_interval=0.01, max_workers=2)
+    with BlockhashProvider(refresh_interval=60) as provider:
+        executor = FlashLoanExecutor(provider, policy)
+        handles = [_execute(executor) for _ in range(20)]
+        time.sleep(0.1)
+        rebroadcasters = [
+            thread
+            for thread in threading.enumerate()
+            if thread.name.startswith("flash-loan-rebroadcast")
+        ]
+        # the loop thread and two broadcasters
+        assert len(rebroadcasters) <= 3
+        assert policy.in_flight == 20
+
+        validator.confirmed.set()
+        for handle in handles:
+            handle.result(5)
+    policy.close()
+
+    assert policy.in_flight == 0
+    broadcasts = len(rpc_server.calls_to("sendTransaction"))
+    time.sleep(0.05)
+    assert len(rpc_server.calls_to("sendTransaction")) == broadcasts
+    pending = confirmation.get_tracker().pending
+    with pytest.raises(RuntimeError):
+        _execute(executor)
+    assert confirmation.get_tracker().pending == pending
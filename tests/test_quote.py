@@ -0,0 +1,131 @@
+from solana.keypair import Keypair
+
+from src.discovery import ReserveIndex
+from src.fees import flash_loan_fees
+from src.quote import QuoteRouter, quote
+from src.reserve import Reserve
+from tests.factories import account_info, reserve_bytes
+
+
+def _reserve(available, fee_wad=3 * 10**15, texture=20):
+    return Reserve(
+        reserve_bytes(
+            available_amount=available,
+            flash_loan_fee_wad=fee_wad,
+            texture_fee_percentage=texture,
+        )
+    )
+
+
+def test_covering_reserves_ranked_by_fee():
+    cheap, dear, small = (Keypair().public_key for _ in range(3))
+    reserves = {
+        dear: _reserve(10**9, fee_wad=5 * 10**15),
+        small: _reserve(10**3, fee_wad=10**15),
+        cheap: _reserve(10**9),
+        Keypair().public_key: None,
+    }
+
+    result = quote(10**6, reserves)
+
+    assert [c.reserve for c in result.candidates] == [cheap, dear, small]
+    assert result.best.reserve == cheap
+    assert (result.best.borrow_fee, result.best.texture_fee) == flash_loan_fees(
+        reserves[cheap], 10**6
+    )
+    assert result.best.headroom == 10**9 - 10**6
+    assert result.candidates[2].headroom == 10**3 - 10**6
+    assert not result.candidates[2].covers
+    assert result.plan == [result.best] and result.shortfall == 0
+
+
+def test_texture_fee_is_not_paid_on_top():
+    shared, kept = Keypair().public_key, Keypair().public_key
+    reserves = {
+        # 0.3% borrow fee, half of it goes to Texture
+        shared: _reserve(10**10, fee_wad=3 * 10**15, texture=50),
+        # 0.4% borrow fee, no Texture share
+        kept: _reserve(10**10, fee_wad=4 * 10**15, texture=0),
+    }
+
+    result = quote(10**9, reserves)
+
+    assert result.best.reserve == shared
+    assert result.total_fee == result.best.borrow_fee == 3 * 10**6
+    assert result.best.texture_fee == 15 * 10**5
+
+    split = quote(15 * 10**9, reserves)
+    assert [leg.reserve for leg in split.plan] == [shared, kept]
+
+
+def test_split_when_no_reserve_covers_the_amount():
+    cheap, dear, tiny = (Keypair().public_key for _ in range(3))
+    reserves = {
+        dear: _reserve(600, fee_wad=5 * 10**15),
+        cheap: _reserve(500),
+        tiny: _reserve(1),
+    }
+
+    result = quote(1000, reserves)
+
+    assert result.best is None
+    assert [(leg.reserve, leg.amount) for leg in result.plan] == [
+        (cheap, 500),
+        (dear, 500),
+    ]
+    assert result.total_fee == sum(
+        flash_loan_fees(reserves[leg.reserve], leg.amount)[0] for leg in result.plan
+    )
+
+    too_much = quote(2000, reserves)
+    assert too_much.plan == [] and too_much.shortfall == 2000
+
+
+def test_split_skips_empty_reserves():
+    empty, cheap, dear = (Keypair().public_key for _ in range(3))
+    reserves = {
+        # cheapest rate, but nothing to lend
+        empty: _reserve(0, fee_wad=10**15),
+        cheap: _reserve(600),
+        dear: _reserve(600, fee_wad=5 * 10**15),
+    }
+
+    result = quote(1000, reserves)
+
+    assert [(leg.reserve, leg.amount) for leg in result.plan] == [
+        (cheap, 600),
+        (dear, 400),
+    ]
+    assert all(leg.amount > 0 for leg in result.plan)
+
+
+def test_too_small_amounts_are_left_out():
+    reserve = Keypair().public_key
+    assert quote(2, {reserve: _reserve(10**9)}).candidates == []
+
+
+def test_router_quotes_from_the_index_and_cache(rpc_server):
+    mint, market = Keypair().public_key, Keypair().public_key
+    small, large = Keypair().public_key, Keypair().public_key
+    reserves = {str(small): _reserve(10**9), str(large): _reserve(10**10)}
+    data = {key: bytes(market) + bytes(mint) for key in reserves}
+    rpc_server.handlers.update(
+        getProgramAccounts=lambda *_: [
+            {"pubkey": key, "account": account_info(value)["value"]}
+            for key, value in data.items()
+        ],
+        getMultipleAccounts=lambda keys, *_: {
+            "context": {"slot": 1},
+            "value": [account_info(bytes(reserves[key].raw))["value"] for key in keys],
+        },
+    )
+    router = QuoteRouter(ReserveIndex())
+
+    first = router.quote(mint, 10**6)
+    second = router.quote(mint, 2 * 10**6, lending_market=market)
+
+    # same fees, the deeper reserve wins
+    assert first.best.reserve == large
+    assert second.best.amount == 2 * 10**6
+    assert len(rpc_server.calls_to("getProgramAccounts")) == 1
+    assert len(rpc_server.calls_to("getMultipleAccounts")) == 1
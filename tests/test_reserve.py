@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from solana.publickey import PublicKey
+
+from src.layout import RESERVE_LAYOUT
+from src.reserve import Reserve
+from tests.factories import reserve_bytes
+
+FIELDS = {
+    "version": ("version",),
+    "last_update": ("last_update",),
+    "lending_market": ("lending_market",),
+    "liquidity_mint_pubkey": ("liquidity", "mint_pubkey"),
+    "liquidity_mint_decimals": ("liquidity", "mint_decimals"),
+    "liquidity_supply_pubkey": ("liquidity", "supply_pubkey"),
+    "liquidity_available_amount": ("liquidity", "available_amount"),
+    "lp_tokens_mint_pubkey": ("lp_tokens_info", "mint_pubkey"),
+    "lp_tokens_mint_total_supply": ("lp_tokens_info", "mint_total_supply"),
+    "lp_tokens_supply_pubkey": ("lp_tokens_info", "supply_pubkey"),
+    "flash_loan_fee_wad": ("config", "fees", "flash_loan_fee_wad"),
+    "texture_fee_percentage": ("config", "fees", "texture_fee_percentage"),
+    "deposit_limit": ("config", "deposit_limit"),
+    "fee_receiver": ("config", "fee_receiver"),
+}
+
+
+def test_size_matches_layout():
+    assert Reserve.SIZE == RESERVE_LAYOUT.sizeof() == len(reserve_bytes())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fields_match_layout(seed):
+    data = os.urandom(Reserve.SIZE) if seed else reserve_bytes()
+    parsed = RESERVE_LAYOUT.parse(data)
+    reserve = Reserve(data)
+
+    for attr, path in FIELDS.items():
+        expected = parsed
+        for name in path:
+            expected = expected[name]
+        value = getattr(reserve, attr)
+        if isinstance(expected, list):
+            assert bytes(value) == bytes(expected), attr
+        else:
+            assert value == expected, attr
+
+
+def test_pubkeys_are_views():
+    data = reserve_bytes()
+    reserve = Reserve(data)
+
+    assert len(reserve.fee_receiver) == 32
+    assert bytes(PublicKey(reserve.lending_market)) == data[16:48]
+    assert reserve.raw.obj is data
+
+
+def test_short_data_is_rejected():
+    with pytest.raises(ValueError):
+        Reserve(bytes(Reserve.SIZE - 1))
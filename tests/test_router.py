@@ -0,0 +1,165 @@
+import time
+
+import pytest
+from solana.exceptions import SolanaRpcException
+
+from src import rpc
+from src.router import EndpointHealth
+from tests.fake_rpc import FakeRpcServer, Reply
+
+
+def _slow(seconds, result):
+    def handler(*_):
+        time.sleep(seconds)
+        return result
+
+    return handler
+
+
+def _failing(*_):
+    raise Reply(status=503)
+
+
+def _behind(*_):
+    raise Reply(error={"code": -32005, "message": "Node is behind by 42 slots"})
+
+
+def _rejected(*_):
+    raise Reply(error={"code": -32002, "message": "Transaction simulation failed"})
+
+
+@pytest.fixture
+def servers():
+    servers = [FakeRpcServer().start() for _ in range(3)]
+    rpc.configure(endpoints=[server.url for server in servers], timeout=2)
+    yield servers
+    rpc.configure()
+    for server in servers:
+        server.stop()
+
+
+def test_reads_go_to_fastest_endpoint(servers):
+    slow, fast, slower = servers
+    slow.handlers["getSlot"] = _slow(0.05, 1)
+    fast.handlers["getSlot"] = _slow(0, 2)
+    slower.handlers["getSlot"] = _slow(0.1, 3)
+    client = rpc.get_client()
+
+    results = [client.get_slot()["result"] for _ in range(10)]
+
+    # every endpoint is sampled once, then the fastest one takes the traffic
+    assert results[:3] == [1, 2, 3]
+    assert results[3:] == [2] * 7
+
+
+def test_failover(servers):
+    broken, healthy, _ = servers
+    broken.handlers["getSlot"] = _failing
+    healthy.handlers["getSlot"] = lambda *_: 42
+    servers[2].handlers["getSlot"] = _failing
+    client = rpc.get_client()
+
+    for _ in range(10):
+        assert client.get_slot()["result"] == 42
+
+    health = client.router.health
+    assert health[1].error_rate == 0
+    assert health[0].error_rate > 0 and health[2].error_rate > 0
+    # failing endpoints are ranked behind the healthy one
+    assert len(broken.calls_to("getSlot")) < 10
+
+
+def test_open_circuits_are_skipped(servers):
+    for server in servers:
+        server.handlers["getSlot"] = _failing
+    client = rpc.get_client()
+    router = client.router
+
+    for _ in range(3):
+        with pytest.raises(SolanaRpcException):
+            client.get_slot()
+    assert all(health.is_open for health in router.health)
+
+    servers[1].handlers["getSlot"] = lambda *_: 42
+    router.health[1].open_until = 0
+
+    assert client.get_slot()["result"] == 42
+    assert len(servers[0].calls_to("getSlot")) == 3
+    assert len(servers[1].calls_to("getSlot")) == 4
+
+
+def test_all_endpoints_failing(servers):
+    for server in servers:
+        server.handlers["getSlot"] = _failing
+
+    with pytest.raises(SolanaRpcException):
+        rpc.get_client().get_slot()
+
+    assert all(len(server.calls_to("getSlot")) == 1 for server in servers)
+
+
+def test_node_health_errors_are_failures(servers):
+    behind, healthy, _ = servers
+    behind.handlers["getSlot"] = _behind
+    healthy.handlers["getSlot"] = lambda *_: 42
+    servers[2].handlers["getSlot"] = _behind
+    client = rpc.get_client()
+    router = client.router
+
+    for _ in range(5):
+        assert client.get_slot()["result"] == 42
+
+    assert router.health[0].error_rate > 0 and router.health[2].error_rate > 0
+    assert router.health[1].error_rate == 0
+
+    healthy.handlers["getSlot"] = _behind
+    for health in router.health:
+        health.open_until = 0
+    for _ in range(3):
+        resp = client._provider.make_request("getSlot")
+    # the error response is returned once no endpoint is left to fail over to
+    assert resp["error"]["code"] == -32005
+    assert all(health.is_open for health in router.health)
+
+
+def test_request_errors_are_not_node_failures(servers):
+    for server in servers:
+        server.handlers["sendTransaction"] = _rejected
+
+    resp = rpc.get_client()._provider.make_request("sendTransaction", "raw")
+
+    assert resp["error"]["code"] == -32002
+    assert all(health.error_rate == 0 for health in rpc.get_client().router.health)
+
+
+def test_send_fans_out(servers):
+    servers[0].handlers["sendTransaction"] = _failing
+    servers[1].handlers["sendTransaction"] = _slow(0.05, "signature")
+    servers[2].handlers["sendTransaction"] = _slow(0.05, "signature")
+
+    resp = rpc.get_client()._provider.make_request("sendTransaction", "raw")
+
+    assert resp["result"] == "signature"
+    for server in servers:
+        assert server.calls_to("sendTransaction") == [["raw"]]
+
+
+def test_circuit_cools_down():
+    now = [0.0]
+    health = EndpointHealth(
+        "url", failure_threshold=2, cooldown=5, clock=lambda: now[0]
+    )
+
+    health.record_failure(0.1)
+    assert not health.is_open
+    health.record_failure(0.1)
+    assert health.is_open
+
+    now[0] = 6
+    assert not health.is_open
+    health.record_failure(0.1)
+    # the cooldown doubles while the endpoint keeps failing
+    assert health.open_until == 16
+    health.record_success(0.1)
+    assert not health.is_open
+    assert health.consecutive_failures == 0
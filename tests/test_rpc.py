@@ -0,0 +1,33 @@
+from src import rpc
+
+
+def test_shared_client_reuses_connection(rpc_server):
+    rpc_server.handlers["getSlot"] = lambda *_: 42
+
+    for _ in range(5):
+        assert rpc.get_client().get_slot()["result"] == 42
+
+    assert rpc.get_client() is rpc.get_client()
+    assert len(rpc_server.calls_to("getSlot")) == 5
+    assert rpc_server.connections == 1
+
+
+def test_close_drops_shared_client(rpc_server):
+    rpc_server.handlers["getSlot"] = lambda *_: 42
+    client = rpc.get_client()
+    client.get_slot()
+
+    rpc.close()
+    rpc.close()
+
+    assert rpc.get_client() is not client
+    assert rpc.get_client().get_slot()["result"] == 42
+    assert rpc_server.connections == 2
+
+
+def test_configure_pool_size_and_timeout(rpc_server):
+    rpc.configure(endpoint=rpc_server.url, pool_size=3, timeout=1.5)
+
+    provider = rpc.get_client()._provider
+    assert provider.timeout == 1.5
+    assert provider.session.get_adapter(rpc_server.url)._pool_maxsize == 3
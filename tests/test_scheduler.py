@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from src.rpc import PooledClient
+from src.scheduler import (
+    RateLimitedError,
+    RequestScheduler,
+    TokenBucket,
+    parse_retry_after,
+)
+from tests.fake_rpc import FakeRpcServer, Reply
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+    for _ in range(2):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() == pytest.approx(0.5)
+
+    clock.now = 0.5
+    assert bucket.wait_time() == 0
+    bucket.pause(3)
+    assert bucket.wait_time() == pytest.approx(3)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2
+    assert (
+        parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=lambda: 1445412480) == 10
+    )
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_sends_preempt_waiting_reads():
+    scheduler = RequestScheduler(rate=10, burst=1)
+    order = []
+
+    def request(method):
+        scheduler.run(method, [method], lambda: order.append(method))
+
+    request("getAccountInfo")  # spends the only token
+    read = threading.Thread(target=request, args=("getMultipleAccounts",))
+    read.start()
+    time.sleep(0.02)
+    send = threading.Thread(target=request, args=("sendTransaction",))
+    send.start()
+    read.join(5)
+    send.join(5)
+
+    assert order == ["getAccountInfo", "sendTransaction", "getMultipleAccounts"]
+
+
+def test_identical_reads_are_coalesced():
+    scheduler = RequestScheduler()
+    calls, release = [], threading.Event()
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return {"result": len(calls)}
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(scheduler.run("getAccountInfo", ["a"], call))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while scheduler.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1 and scheduler.coalesced == 4
+    assert results == [{"result": 1}] * 5
+    assert scheduler.run("sendTransaction", ["a"], call) == {"result": 2}
+
+
+def test_429_retry_after_is_honored():
+    attempts = []
+
+    def get_block_height(*_):
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise Reply(status=429, headers={"Retry-After": "0.2"})
+        return 42
+
+    with FakeRpcServer({"getBlockHeight": get_block_height}) as server:
+        client = PooledClient(server.url)
+        assert client.get_block_height()["result"] == 42
+        client.close()
+
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.2
+
+
+def test_rate_limited_after_retries():
+    def throttled(*_):
+        raise Reply(status=429, headers={"Retry-After": "0"})
+
+    with FakeRpcServer({"getBlockHeight": throttled}) as server:
+        client = PooledClient(server.url)
+        client.scheduler.max_retries = 2
+        with pytest.raises(RateLimitedError):
+            client.get_block_height()
+        client.close()
+
+        assert len(server.calls_to("getBlockHeight")) == 3
+
+
+def test_rate_limit_budget():
+    with FakeRpcServer({"getBlockHeight": lambda *_: 1}) as server:
+        client = PooledClient(server.url, rate_limit=20)
+        start = time.monotonic()
+        # a burst of 20, then 20 per second
+        for _ in range(25):
+            client.get_block_height()
+        elapsed = time.monotonic() - start
+        client.close()
+
+    assert elapsed >= 0.24
+
+
+def test_routed_endpoints_fail_over_when_rate_limited():
+    def throttled(*_):
+        raise Reply(status=429, headers={"Retry-After": "5"})
+
+    with FakeRpcServer({"getBlockHeight": throttled}) as limited, FakeRpcServer(
+        {"getBlockHeight": lambda *_: 7}
+    ) as other:
+        client = PooledClient(endpoints=[limited.url, other.url])
+        start = time.monotonic()
+        assert client.get_block_height()["result"] == 7
+        client.close()
+
+    assert time.monotonic() - start < 1
+    assert len(limited.calls_to("getBlockHeight")) <= 1
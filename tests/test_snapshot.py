@@ -0,0 +1,116 @@
+import time
+
+import pytest
+from solana.keypair import Keypair
+
+from src import snapshot
+from src.cache import ReserveCache
+from src.reserve import Reserve
+from src.snapshot import ReserveSnapshot, SnapshotError, SnapshotRecord
+from tests.factories import account_info, reserve_bytes
+
+
+def _cache(count=3, slot=5):
+    cache = ReserveCache()
+    for i in range(count):
+        cache.put(
+            Keypair().public_key, Reserve(reserve_bytes(available_amount=i)), slot
+        )
+    return cache
+
+
+def test_save_and_load_without_fetching(tmp_path, rpc_server):
+    path = str(tmp_path / "reserves.snapshot")
+    cache = _cache()
+    assert ReserveSnapshot(path, cache).save() == 3
+
+    restored = ReserveCache()
+    loaded = ReserveSnapshot(path, restored).load()
+
+    assert sorted(map(str, loaded)) == sorted(str(key) for key, _ in cache.items())
+    for reserve, entry in cache.items():
+        assert restored.get(reserve).slot == 5
+        assert bytes(restored.fetch(reserve).raw) == bytes(entry.data.raw)
+    assert rpc_server.calls == []
+
+
+def test_entries_age_from_the_write_time(tmp_path):
+    fresh, old = Keypair().public_key, Keypair().public_key
+    fresh_path, old_path = str(tmp_path / "fresh.snapshot"), str(tmp_path / "old")
+    snapshot.write(fresh_path, [SnapshotRecord(fresh, 1, reserve_bytes())])
+    snapshot.write(
+        old_path,
+        [SnapshotRecord(old, 1, reserve_bytes())],
+        written_at=time.time() - 3600,
+    )
+
+    assert snapshot.read(old_path).written_at < time.time() - 3599
+    restored = ReserveCache(ttl=60)
+    ReserveSnapshot(fresh_path, restored).load()
+    ReserveSnapshot(old_path, restored).load()
+
+    assert restored.get(fresh) is not None
+    # an hour old snapshot is past the ttl, the reserve is fetched again
+    assert restored.get(old) is None
+
+
+def test_write_is_atomic(tmp_path):
+    path = str(tmp_path / "reserves.snapshot")
+    record = SnapshotRecord(Keypair().public_key, 1, reserve_bytes())
+    snapshot.write(path, [record])
+
+    with pytest.raises(AttributeError):
+        snapshot.write(path, [record, None])
+
+    assert snapshot.read(path).records == [record]
+    assert [p.name for p in tmp_path.iterdir()] == ["reserves.snapshot"]
+
+
+def test_invalid_snapshots_load_nothing(tmp_path):
+    path = tmp_path / "reserves.snapshot"
+    assert ReserveSnapshot(str(path), ReserveCache()).load() == []
+
+    snapshot.write(
+        str(path), [SnapshotRecord(Keypair().public_key, 1, reserve_bytes())]
+    )
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(SnapshotError):
+        snapshot.read(str(path))
+    assert ReserveSnapshot(str(path), ReserveCache()).load() == []
+
+
+def test_restore_reconciles_with_chain(tmp_path, rpc_server):
+    path = str(tmp_path / "reserves.snapshot")
+    cache = _cache(count=3)
+    same, updated, closed = [key for key, _ in cache.items()]
+    ReserveSnapshot(path, cache).save()
+
+    chain = {
+        str(same): cache.get(same).data.raw,
+        str(updated): reserve_bytes(available_amount=42),
+    }
+    rpc_server.handlers["getMultipleAccounts"] = lambda keys, *_: {
+        "context": {"slot": 9},
+        "value": [
+            account_info(chain[key])["value"] if key in chain else None for key in keys
+        ],
+    }
+
+    restored = ReserveCache()
+    changed = ReserveSnapshot(path, restored).restore().result(timeout=5)
+
+    assert sorted(map(str, changed)) == sorted(map(str, [updated, closed]))
+    assert restored.get(updated).slot == 9
+    assert restored.get(updated).data.liquidity_available_amount == 42
+    assert restored.get(same).slot == 9
+    assert closed not in restored
+
+
+def test_writer_thread_saves_on_stop(tmp_path):
+    path = str(tmp_path / "reserves.snapshot")
+    cache = ReserveCache()
+
+    with ReserveSnapshot(path, cache, interval=60):
+        cache.put(Keypair().public_key, Reserve(reserve_bytes()), 3)
+
+    assert [record.slot for record in snapshot.read(path).records] == [3]
@@ -0,0 +1,52 @@
+from solana.keypair import Keypair
+
+from src.entities import FlashBorrowParams, FlashRepayParams
+from src.executor import BaseFlashLoanExecutor
+from src.template import FlashLoanTemplate
+
+
+def test_template_matches_builder():
+    supply, native_account, reserve, market, fee_receiver, authority = (
+        Keypair().public_key for _ in range(6)
+    )
+    executor = BaseFlashLoanExecutor()
+    template = FlashLoanTemplate(
+        FlashBorrowParams(
+            source_liquidity=supply,
+            destination_liquidity=native_account,
+            reserve=reserve,
+            lending_market=market,
+            program_id=executor.MAIN_PROGRAM_ID,
+        ),
+        FlashRepayParams(
+            source_liquidity=native_account,
+            destination_liquidity=supply,
+            reserve=reserve,
+            reserve_liquidity_fee_receiver=fee_receiver,
+            lending_market=market,
+            user_transfer_authority=authority,
+        ),
+    )
+
+    for amount in (0, 1, 100000000, 2**64 - 1):
+        executor.flash_borrow(
+            source_liquidity=supply,
+            destination_liquidity=native_account,
+            reserve=reserve,
+            lending_market=market,
+            amount=amount,
+        ).flash_repay(
+            source_liquidity=native_account,
+            destination_liquidity=supply,
+            reserve=reserve,
+            reserve_liquidity_fee_receiver=fee_receiver,
+            lending_market=market,
+            user_transfer_authority=authority,
+            amount=amount,
+        )
+        expected = executor._build_transaction(authority, []).instructions
+
+        executor.flash_loan(template, amount)
+        compiled = executor._build_transaction(authority, []).instructions
+
+        assert compiled == expected
@@ -0,0 +1,218 @@
+import base64
+
+import pytest
+from solana import system_program
+from solana.keypair import Keypair
+from solana.rpc.core import RPCException
+from solana.transaction import Transaction
+from spl.token import constants as spl_constants
+
+from src.token_pool import (
+    ACCOUNTS_PER_TRANSACTION,
+    SYNC_NATIVE,
+    UPDATES_PER_TRANSACTION,
+    PoolExhaustedError,
+    TokenAccountPool,
+)
+from tests.fake_rpc import Reply
+
+RENT = 2039280
+
+
+@pytest.fixture
+def sent(rpc_server, validator):
+    """
+    Transactions received by the fake validator, all confirmed right away
+    """
+    transactions = []
+
+    def send_transaction(raw, *_):
+        transactions.append(Transaction.deserialize(base64.b64decode(raw)))
+        return validator.send_transaction(raw)
+
+    rpc_server.handlers.update(
+        getMinimumBalanceForRentExemption=lambda *_: RENT,
+        sendTransaction=send_transaction,
+    )
+    return transactions
+
+
+def _token_instructions(transaction, index):
+    return [
+        ix
+        for ix in transaction.instructions
+        if ix.program_id == spl_constants.TOKEN_PROGRAM_ID and ix.data[0] == index
+    ]
+
+
+def test_provision_in_batches(sent):
+    pool = TokenAccountPool(Keypair(), target_balance=10**9)
+
+    accounts = pool.provision(10)
+
+    assert pool.idle == 10
+    assert len(sent) == -(-10 // ACCOUNTS_PER_TRANSACTION)
+    created = [
+        system_program.decode_create_account(ix)
+        for tx in sent
+        for ix in tx.instructions
+        if ix.program_id == system_program.SYS_PROGRAM_ID
+    ]
+    assert [c.new_account_pubkey for c in created] == [a.public_key for a in accounts]
+    # wrapped SOL is funded with the account lamports
+    assert all(c.lamports == RENT + 10**9 for c in created)
+    assert max(len(tx.serialize()) for tx in sent) <= 1232
+
+
+def test_steady_state_needs_no_transactions(sent):
+    pool = TokenAccountPool(Keypair(), target_balance=10**9, min_balance=10**8)
+    pool.provision(2)
+    setup = len(sent)
+
+    for _ in range(10):
+        account = pool.lease()
+        pool.release(account, spent=1000)
+
+    assert len(sent) == setup
+    assert pool.refill() == []
+
+
+def test_refill_tops_up_with_sync_native(sent):
+    pool = TokenAccountPool(Keypair(), target_balance=10**9, min_balance=10**9)
+    pool.provision(20)
+    setup = len(sent)
+    for _ in range(20):
+        pool.release(pool.lease(), spent=5000)
+
+    refilled = pool.refill()
+
+    assert len(refilled) == 20
+    top_ups = sent[setup:]
+    assert len(top_ups) == 2
+    assert sum(len(_token_instructions(tx, SYNC_NATIVE)) for tx in top_ups) == 20
+    transfers = [
+        system_program.decode_transfer(ix)
+        for tx in top_ups
+        for ix in tx.instructions
+        if ix.program_id == system_program.SYS_PROGRAM_ID
+    ]
+    assert {t.lamports for t in transfers} == {5000}
+    assert all(account.balance == 10**9 for account in refilled)
+
+
+def test_reclaim_closes_idle_accounts(sent):
+    owner = Keypair()
+    pool = TokenAccountPool(owner)
+    pool.provision(3)
+    leased = pool.lease()
+    setup = len(sent)
+
+    pool.reclaim()
+
+    (close,) = sent[setup:]
+    # CloseAccount
+    assert len(_token_instructions(close, 9)) == 2
+    assert list(pool.accounts) == [leased.public_key]
+    assert pool.idle == 0
+
+
+def test_lease_grows_or_raises(sent):
+    pool = TokenAccountPool(Keypair(), grow=False)
+    with pytest.raises(PoolExhaustedError):
+        pool.lease()
+
+    pool.grow = True
+    with pool.leased() as account:
+        assert account.public_key in pool.accounts
+    assert pool.idle == 1
+
+
+def test_non_native_mint_needs_funding_account():
+    with pytest.raises(ValueError):
+        TokenAccountPool(Keypair(), mint=Keypair().public_key)
+
+
+def test_reclaim_keeps_only_accounts_of_failed_closes(sent, rpc_server):
+    owner = Keypair()
+    pool = TokenAccountPool(owner)
+    pool.provision(UPDATES_PER_TRANSACTION * 3)
+    accepted = rpc_server.handlers["sendTransaction"]
+    closes = []
+
+    def send_transaction(raw, *_):
+        closes.append(raw)
+        if len(closes) == 2:
+            raise Reply(error={"code": -32002, "message": "simulation failed"})
+        return accepted(raw)
+
+    rpc_server.handlers["sendTransaction"] = send_transaction
+
+    with pytest.raises(RPCException):
+        pool.reclaim()
+
+    # the first and last chunks were closed, the second one is idle again
+    assert len(closes) == 3
+    assert pool.idle == UPDATES_PER_TRANSACTION
+    assert len(pool.accounts) == UPDATES_PER_TRANSACTION
+    second = Transaction.deserialize(base64.b64decode(closes[1]))
+    assert {ix.keys[0].pubkey for ix in _token_instructions(second, 9)} == set(
+        pool.accounts
+    )
+
+
+def _failing_second_send(rpc_server, during=None):
+    """
+    Reject the second sendTransaction from now on, call `during` on each one
+    :return: raw transactions received
+    """
+    accepted = rpc_server.handlers["sendTransaction"]
+    received = []
+
+    def send_transaction(raw, *_):
+        received.append(raw)
+        if during is not None:
+            during()
+        if len(received) == 2:
+            raise Reply(error={"code": -32002, "message": "simulation failed"})
+        return accepted(raw)
+
+    rpc_server.handlers["sendTransaction"] = send_transaction
+    return received
+
+
+def test_provision_keeps_accounts_of_landed_creates(sent, rpc_server):
+    pool = TokenAccountPool(Keypair(), target_balance=10**9)
+    received = _failing_second_send(rpc_server)
+
+    with pytest.raises(RPCException):
+        pool.provision(ACCOUNTS_PER_TRANSACTION * 3)
+
+    assert len(received) == 3
+    # the first and last transactions created their accounts
+    assert pool.idle == len(pool.accounts) == ACCOUNTS_PER_TRANSACTION * 2
+    failed = Transaction.deserialize(base64.b64decode(received[1]))
+    assert not {key.pubkey for ix in failed.instructions for key in ix.keys} & set(
+        pool.accounts
+    )
+
+
+def test_top_up_updates_landed_balances_only(sent, rpc_server):
+    pool = TokenAccountPool(Keypair(), target_balance=10**9, min_balance=10**9)
+    accounts = pool.provision(UPDATES_PER_TRANSACTION * 3)
+    for account in accounts:
+        pool.release(pool.lease(), spent=5000)
+    idle_while_sending = []
+    _failing_second_send(
+        rpc_server, during=lambda: idle_while_sending.append(pool.idle)
+    )
+
+    with pytest.raises(RPCException):
+        pool.refill()
+
+    # nothing could be leased mid-transfer, everything is idle again after
+    assert idle_while_sending == [0, 0, 0]
+    assert pool.idle == UPDATES_PER_TRANSACTION * 3
+    balances = [account.balance for account in accounts]
+    assert balances.count(10**9) == UPDATES_PER_TRANSACTION * 2
+    assert balances.count(10**9 - 5000) == UPDATES_PER_TRANSACTION
+    assert len(pool.refill()) == UPDATES_PER_TRANSACTION
@@ -0,0 +1,232 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+from solana.keypair import Keypair
+
+from src.watcher import ReserveWatcher, ws_endpoint
+from tests.factories import account_info, reserve_bytes
+
+
+class FakeWsServer:
+    """
+    Answers accountSubscribe requests and lets the test push notifications.
+    Connections can be dropped to exercise reconnects
+    """
+
+    def __init__(self, rejections: int = 0):
+        """
+        :param rejections: handshakes answered with 503 before accepting one
+        """
+        self.subscriptions = {}
+        self.connections = []
+        self.rejections = rejections
+        self._next_id = 1
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(
+            self._handle, "127.0.0.1", 0, process_request=self._process_request
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _process_request(self, _path, _headers):
+        if self.rejections:
+            self.rejections -= 1
+            return 503, [], b"unavailable"
+        return None
+
+    async def _handle(self, ws, _path=None):
+        self.connections.append(ws)
+        async for message in ws:
+            request = json.loads(message)
+            sub_id = self._next_id
+            self._next_id += 1
+            self.subscriptions[request["params"][0]] = (ws, sub_id)
+            await ws.send(
+                json.dumps({"jsonrpc": "2.0", "result": sub_id, "id": request["id"]})
+            )
+
+    async def notify(self, reserve, data: bytes, slot: int):
+        ws, sub_id = self.subscriptions[str(reserve)]
+        await ws.send(
+            json.dumps(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "accountNotification",
+                    "params": {
+                        "result": account_info(data, slot),
+                        "subscription": sub_id,
+                    },
+                }
+            )
+        )
+
+
+def test_ws_endpoint():
+    assert ws_endpoint("https://api.devnet.solana.com/") == (
+        "wss://api.devnet.solana.com/"
+    )
+    assert ws_endpoint("http://127.0.0.1:8899") == "ws://127.0.0.1:8899"
+
+
+def test_updates_callbacks_and_resubscribe():
+    reserves = [Keypair().public_key for _ in range(2)]
+
+    async def run():
+        async with FakeWsServer() as server:
+            watcher = ReserveWatcher(
+                reserves, endpoint=server.url, reconnect_delay=0.01
+            )
+            seen = []
+            watcher.add_callback(seen.append)
+            updates = watcher.updates()
+            task = asyncio.ensure_future(watcher.run())
+
+            await asyncio.wait_for(watcher.subscribed.wait(), 5)
+            await server.notify(reserves[0], reserve_bytes(available_amount=1), 10)
+            first = await asyncio.wait_for(updates.__anext__(), 5)
+
+            # drop the connection, the watcher has to come back and resubscribe
+            await server.connections[-1].close()
+            await asyncio.sleep(0.05)
+            await asyncio.wait_for(watcher.subscribed.wait(), 5)
+            await server.notify(reserves[1], reserve_bytes(available_amount=2), 11)
+            # stale update for the first reserve is ignored
+            await server.notify(reserves[0], reserve_bytes(available_amount=3), 9)
+            second = await asyncio.wait_for(updates.__anext__(), 5)
+
+            await watcher.stop()
+            await asyncio.wait_for(task, 5)
+            return watcher, seen, first, second
+
+    watcher, seen, first, second = asyncio.run(run())
+
+    assert (first.reserve, first.slot) == (reserves[0], 10)
+    assert (second.reserve, second.slot) == (reserves[1], 11)
+    assert [update.data.liquidity_available_amount for update in seen] == [1, 2]
+    assert watcher.connections == 2
+    assert watcher.store.get(reserves[0]).data.liquidity_available_amount == 1
+
+
+def test_retries_rejected_handshakes():
+    reserve = Keypair().public_key
+
+    async def run():
+        async with FakeWsServer(rejections=2) as server:
+            watcher = ReserveWatcher(
+                [reserve], endpoint=server.url, reconnect_delay=0.01
+            )
+            task = asyncio.ensure_future(watcher.run())
+
+            await asyncio.wait_for(watcher.subscribed.wait(), 5)
+
+            await watcher.stop()
+            await asyncio.wait_for(task, 5)
+            return watcher, server
+
+    watcher, server = asyncio.run(run())
+
+    assert server.rejections == 0
+    assert watcher.connections == 1
+
+
+def test_failing_callbacks_do_not_end_the_feed():
+    reserve = Keypair().public_key
+
+    def broken(_update):
+        raise RuntimeError("subscriber bug")
+
+    async def broken_async(_update):
+        raise RuntimeError("async subscriber bug")
+
+    async def run():
+        async with FakeWsServer() as server:
+            watcher = ReserveWatcher(
+                [reserve], endpoint=server.url, reconnect_delay=0.01
+            )
+            seen = []
+            watcher.add_callback(broken)
+            watcher.add_callback(broken_async)
+            watcher.add_callback(seen.append)
+            updates = watcher.updates()
+            task = asyncio.ensure_future(watcher.run())
+
+            await asyncio.wait_for(watcher.subscribed.wait(), 5)
+            for slot in (10, 11):
+                await server.notify(reserve, reserve_bytes(available_amount=slot), slot)
+                await asyncio.wait_for(updates.__anext__(), 5)
+
+            await watcher.stop()
+            await asyncio.wait_for(task, 5)
+            return watcher, seen
+
+    watcher, seen = asyncio.run(run())
+
+    assert [update.slot for update in seen] == [10, 11]
+    assert watcher.connections == 1
+
+
+def test_undecodable_notifications_are_skipped():
+    reserve = Keypair().public_key
+
+    async def run():
+        async with FakeWsServer() as server:
+            watcher = ReserveWatcher(
+                [reserve], endpoint=server.url, reconnect_delay=0.01
+            )
+            updates = watcher.updates()
+            task = asyncio.ensure_future(watcher.run())
+
+            await asyncio.wait_for(watcher.subscribed.wait(), 5)
+            await server.notify(reserve, reserve_bytes(available_amount=1), 10)
+            await asyncio.wait_for(updates.__anext__(), 5)
+            # the account is closed, its cached state is dropped
+            await server.notify(reserve, b"", 11)
+            while watcher.store.get(reserve) is not None:
+                await asyncio.sleep(0.01)
+            await server.notify(reserve, reserve_bytes(available_amount=2), 12)
+            update = await asyncio.wait_for(updates.__anext__(), 5)
+
+            await watcher.stop()
+            await asyncio.wait_for(task, 5)
+            return watcher, update
+
+    watcher, update = asyncio.run(asyncio.wait_for(run(), 10))
+
+    assert (update.slot, update.data.liquidity_available_amount) == (12, 2)
+    assert watcher.connections == 1
+
+
+def test_updates_end_when_the_watcher_fails():
+    reserve = Keypair().public_key
+
+    async def run():
+        async with FakeWsServer() as server:
+            watcher = ReserveWatcher(
+                [reserve], endpoint=server.url, reconnect_delay=0.01
+            )
+
+            async def broken_listen(_ws):
+                raise RuntimeError("bug")
+
+            watcher._listen = broken_listen
+            updates = watcher.updates()
+            task = asyncio.ensure_future(watcher.run())
+
+            received = [update async for update in updates]
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(task, 5)
+            return received
+
+    assert asyncio.run(asyncio.wait_for(run(), 10)) == []